@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Load the ML artifacts ahead of the first request (settings.ML_WARMUP)
+from core.warmup import warm_up  # noqa: E402
+warm_up()
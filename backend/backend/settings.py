@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'core',
     'userauth',
     'properties',
     'listproperties',
@@ -126,3 +128,111 @@ CSRF_TRUSTED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
+
+# ✅ ML serving
+# Per-worker memo of regression estimates / KNN query vectors in search_properties
+SEARCH_MEMO_SIZE = 4096
+SEARCH_MEMO_TTL = 3600  # seconds
+# Queries accepted by one /api/recommend_properties/batch/ call; each batch
+# is admitted to the inference pool (INFERENCE_EXECUTOR) as one request
+SEARCH_BATCH_MAX_QUERIES = 500
+
+# Response cache for /api/recommend_properties/ and /api/recommend/.
+# BACKEND: "local" (per-worker LRU), "django" (the CACHES alias below, shared
+# by all workers) or None to disable.
+RESPONSE_CACHE = {
+    "BACKEND": "local",
+    "ALIAS": "default",
+    "MAX_ENTRIES": 2048,
+    "TIMEOUT": 600,  # seconds
+}
+
+# Neighbor search used by both recommenders: "exact" (sklearn pairwise
+# distances), "blocked" (exact, NumPy, bounded memory) or "ivf" (approximate
+# inverted file; tune recall with nlist/nprobe). Compare them with
+# `python -m benchmarks.neighbors`.
+NEIGHBOR_BACKEND = "exact"
+NEIGHBOR_BACKEND_OPTIONS = {}
+
+# Numeric columns and KNN matrices are written here once per dataset/model
+# version as .npy files and memory-mapped read-only, so every worker process
+# shares one copy. None keeps them in each process's own memory.
+ARTIFACT_MMAP_DIR = BASE_DIR / "var" / "mmap"
+
+# When the web app starts (wsgi.py / asgi.py), load the ML artifacts:
+# "background" (thread, serve immediately), "sync" (before serving; use with
+# gunicorn --preload) or "off" (first use only). manage.py commands never do.
+ML_WARMUP = "background"
+
+# User-created rent listings in /api/recommend/ (listproperties/live.py):
+# searchable within POLL_INTERVAL seconds on every worker, folded into a
+# re-fitted index every COMPACT_INTERVAL seconds or MAX_DELTA listings.
+LIVE_LISTINGS = {
+    "ENABLED": True,
+    "POLL_INTERVAL": 2.0,
+    "COMPACT_INTERVAL": 300.0,
+    "MAX_DELTA": 1000,
+}
+
+# Recommendation corpora (`manage.py build_corpus`): the listing CSVs plus
+# ListingProperty rows as sharded columns and features. When a corpus is
+# built for the current CSV and encoders, the search and recommend endpoints
+# serve it instead of the CSV / df.pkl alone.
+CORPUS_DIR = BASE_DIR / "var" / "corpus"
+
+# search_properties, recommend_property and predict_residential_price are
+# async views: their model work runs on a bounded thread pool per process
+# (core/offload.py) so a burst of searches can't hold up login and the other
+# endpoints served by the same worker. At most MAX_PENDING requests are
+# admitted (running or queued) and none waits longer than QUEUE_TIMEOUT
+# seconds for a thread; the rest get 503 with Retry-After. Serve with an
+# ASGI server (e.g. `uvicorn backend.asgi:application`) to benefit; under
+# WSGI they still work, one request per thread. Compare with
+# `python -m benchmarks.serving`.
+INFERENCE_EXECUTOR = {
+    "WORKERS": 2,
+    "MAX_PENDING": 16,
+    "QUEUE_TIMEOUT": 2.0,  # seconds
+    "RETRY_AFTER": 1,      # seconds
+}
+
+# Concurrent search_properties / estimate-price requests are coalesced into
+# one batched encode + predict + neighbor search (core/batching.py): while a
+# batch is running, the first queued request waits up to WINDOW_MS for
+# others, up to MAX_BATCH per batch (at most INFERENCE_EXECUTOR's
+# MAX_PENDING, which caps how many can be queued). With nothing running a
+# request is dispatched at once. Batch sizes and the queueing delay this
+# adds are on /api/metrics/.
+MICRO_BATCHING = {
+    "ENABLED": True,
+    "WINDOW_MS": 2.0,
+    "MAX_BATCH": 16,
+}
+
+# Optional inference service (core/service.py). With MODE "service" the
+# search, recommend, estimate (single and batch) and random-properties
+# endpoints send their batches to `manage.py inference_service` over SOCKET
+# instead of running the models in every web worker, which then skip the
+# warm-up and never load the dataset or models (only the small city table
+# of the city comparison is still read in-process). Batches not
+# answered within TIMEOUT seconds get 503. "local" runs everything
+# in-process and needs no service (the default). Service mode refuses to
+# start or connect without an AUTHKEY shared by the service and the web
+# workers: messages on the socket are pickles.
+INFERENCE_SERVICE = {
+    "MODE": "local",
+    "SOCKET": BASE_DIR / "var" / "inference.sock",
+    "AUTHKEY": os.environ.get("INFERENCE_SERVICE_AUTHKEY"),  # shared secret, required in service mode
+    "TIMEOUT": 30.0,  # seconds
+}
+
+# Per-stage request timing (core/timing.py) for the search, estimate and
+# recommend endpoints: parsing, encoding, model predict, neighbor search,
+# filtering and serialization are timed separately. Each response carries a
+# Server-Timing header (shown in browser dev tools) and every stage feeds a
+# latency histogram on /api/metrics/. The header exposes stage names and
+# durations to clients; set HEADER False to keep them to /api/metrics/.
+REQUEST_TIMING = {
+    "ENABLED": True,
+    "HEADER": True,
+}
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
+from core.views import metrics, readiness
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics, name='metrics'),
+    path('api/ready/', readiness, name='readiness'),
     path('api/', include('userauth.urls')),
     path('', include('properties.urls')),
     path('', include('listproperties.urls')),
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the ML artifacts ahead of the first request (settings.ML_WARMUP)
+from core.warmup import warm_up  # noqa: E402
+warm_up()
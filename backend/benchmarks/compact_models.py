@@ -0,0 +1,102 @@
+"""
+Load cost of the properties models as pickles vs the compact format.
+
+    python -m benchmarks.compact_models
+    python -m benchmarks.compact_models --float32 --repeat 5
+
+Exports properties/ml into a temporary directory (properties/ml/compact is
+left alone), then loads every model the app serves in fresh interpreters,
+once per format, and reports load time, the RSS the loaded models added,
+whether scikit-learn got imported, and the first sale estimate's latency.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+from benchmarks.workers import memory_kib
+from core.compact import load_model
+from properties.export import EXPORT_FILES
+from properties.estimator import Estimator
+
+compact_dir = sys.argv[1]
+before = memory_kib()[0]
+t0 = time.perf_counter()
+models = {os.path.basename(p): load_model(p, compact_dir, mmap_mode="r") for p in EXPORT_FILES}
+t1 = time.perf_counter()
+record = {"city": "Mumbai", "location": "Andheri West", "property_type": "Apartment",
+          "bedrooms": 2, "area_sqft": 900, "amenities": "Gym, Parking"}
+Estimator(models["residential_sales_model.pkl"]).predict([record])
+t2 = time.perf_counter()
+print("RESULT " + json.dumps({
+    "load_seconds": t1 - t0,
+    "first_predict_ms": (t2 - t1) * 1000,
+    "rss_added_kib": memory_kib()[0] - before,
+    "sklearn_imported": "sklearn" in sys.modules,
+}))
+"""
+
+
+def run(backend_dir, compact_dir):
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, compact_dir],
+        cwd=backend_dir, capture_output=True, text=True, check=True,
+    )
+    return json.loads(next(l for l in proc.stdout.splitlines() if l.startswith("RESULT "))[7:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--float32", action="store_true", help="export the neighbor matrix as float32")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per format (median reported)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+    django.setup()
+    from core.compact import export_models
+    from properties.export import EXPORT_FILES
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        compact_dir = os.path.join(directory, "compact")
+        manifest = export_models(EXPORT_FILES, compact_dir, float32=args.float32)
+        sizes = {"compact": 0, "pickle": sum(s["size"] for s in manifest["sources"].values())}
+        for root, _, files in os.walk(os.path.join(compact_dir, manifest["path"])):
+            sizes["compact"] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+
+        # An empty directory has no manifest, so load_model falls back to joblib
+        formats = {"pickle": os.path.join(directory, "none"), "compact": compact_dir}
+        for name, path in formats.items():
+            runs = [run(backend_dir, path) for _ in range(args.repeat)]
+            results[name] = {
+                "bytes": sizes[name],
+                "load_seconds": statistics.median(r["load_seconds"] for r in runs),
+                "first_predict_ms": statistics.median(r["first_predict_ms"] for r in runs),
+                "rss_added_kib": statistics.median(r["rss_added_kib"] for r in runs),
+                "sklearn_imported": runs[0]["sklearn_imported"],
+            }
+
+    print(f"{'format':<9}{'KiB':>10}{'load ms':>10}{'first predict ms':>18}{'RSS added KiB':>15}  sklearn")
+    for name, r in results.items():
+        print(f"{name:<9}{r['bytes'] / 1024:>10.1f}{r['load_seconds'] * 1000:>10.1f}{r['first_predict_ms']:>18.2f}"
+              f"{r['rss_added_kib']:>15}  {'yes' if r['sklearn_imported'] else 'no'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
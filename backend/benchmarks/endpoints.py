@@ -0,0 +1,455 @@
+"""
+Latency, throughput and memory of every ML endpoint on synthetic data at
+10k / 100k / 1M listings.
+
+    python -m benchmarks.endpoints --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.endpoints --scales 10k,100k --requests 500 --concurrency 16
+    python -m benchmarks.endpoints --compare results/base.json results/new.json
+
+For each scale the backend's code is copied into a scratch tree (the
+repo's own CSVs and models are left alone) next to synthetic
+residential_data.csv, rents.csv and city_data.csv with that many sale and
+rent listings. The property snapshot and both apps' models are built
+there with the usual management commands, then a fresh interpreter in the
+copy loads every artifact and drives the endpoints through Django's
+ASGIHandler:
+
+- latency: --requests sequential requests per endpoint, micro-batching
+  off (a lone request would otherwise wait out the batch window)
+- throughput: --concurrency clients for --seconds, micro-batching as
+  configured; clients back off after a 503 like benchmarks.serving
+
+The response cache and search memo are off so every request reaches the
+models. Results (build times, artifact sizes, load time, RSS, latency
+percentiles and requests/s per endpoint and scale, plus the commit and
+library versions) are written as JSON with --output; --compare prints the
+change between two such files and exits 1 when p50 latency or throughput
+moved the wrong way by more than --threshold. Synthetic data is a pure
+function of --seed, --cities and --locations, so runs at different
+commits see the same listings. Training is dense in properties.train's
+KNN features: 1M rows needs a few GB of RAM, and --estimator linear
+trains much faster than the shipped forest.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from core.sample_data import AMENITIES, PROPERTY_TYPES, city_table, write_dataset
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Left out of the scratch tree; synthetic data and fresh models go there instead
+SKIPPED = {
+    "properties/data", "properties/ml", "listproperties/data", "listproperties/models",
+    "listproperties/city_data.csv", "var", "db.sqlite3",
+}
+
+# Synthetic CSVs (core.sample_data) -> where the app reads them
+DATA_FILES = {
+    "residential_data.csv": "properties/data/residential_data.csv",
+    "rents.csv": "listproperties/data/rents.csv",
+    "city_data.csv": "listproperties/city_data.csv",
+}
+
+# name -> (method, path, Workload method building one request)
+ENDPOINTS = {
+    "search_properties": ("POST", "/api/recommend_properties/", "search"),
+    "get_recommendations": ("POST", "/api/recommend/", "recommend"),
+    "predict_residential_price": ("POST", "/api/estimate-price/", "estimate"),
+    "get_random_properties": ("GET", "/api/random-properties/", "random"),
+    "move_meter_view": ("GET", "/api/move-meter/", "move_meter"),
+}
+
+
+def parse_scale(text):
+    """"10k" -> 10000, "1M" -> 1000000."""
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+# -------------------------------
+# Scratch tree
+# -------------------------------
+def _ignore(directory, names):
+    rel = os.path.relpath(directory, BACKEND_DIR)
+    return [
+        n for n in names
+        if n in ("__pycache__", ".pytest_cache") or os.path.normpath(os.path.join(rel, n)) in SKIPPED
+    ]
+
+
+def manage(tree, *args):
+    """Run a management command in `tree`; returns its wall time in seconds."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "manage.py", *args], cwd=tree, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"manage.py {' '.join(args)} failed:\n{proc.stdout[-2000:]}{proc.stderr[-4000:]}")
+    return round(time.perf_counter() - start, 3)
+
+
+def prepare(root, rows, cities, args):
+    """
+    Synthetic data (kept in `root` and reused when the parameters match)
+    plus a fresh copy of the code with models trained on it. Returns
+    (tree, build info).
+    """
+    data_dir = os.path.join(root, "data")
+    params = {"rows": rows, "cities": len(cities), "locations": args.locations, "seed": args.seed}
+    stamp = os.path.join(data_dir, "params.json")
+    info = {}
+    if not os.path.exists(stamp) or json.load(open(stamp)) != params:
+        start = time.perf_counter()
+        write_dataset(*(os.path.join(data_dir, name) for name in DATA_FILES), rows, cities, args.seed)
+        with open(stamp, "w") as f:
+            json.dump(params, f)
+        info["generate_seconds"] = round(time.perf_counter() - start, 3)
+
+    tree = os.path.join(root, "backend")
+    shutil.rmtree(tree, ignore_errors=True)
+    shutil.copytree(BACKEND_DIR, tree, ignore=_ignore)
+    for name, target in DATA_FILES.items():
+        os.makedirs(os.path.dirname(os.path.join(tree, target)), exist_ok=True)
+        shutil.copyfile(os.path.join(data_dir, name), os.path.join(tree, target))
+
+    steps = [
+        ("migrate", ["migrate", "--verbosity", "0"]),
+        ("build_property_snapshot", ["build_property_snapshot"]),
+        ("train_property_models", ["train_property_models", "--estimator", args.estimator, "--jobs", str(args.jobs)]),
+        ("train_recommender", ["train_recommender", "--jobs", str(args.jobs)]),
+    ]
+    if args.compact:
+        steps.append(("export_compact_models", ["export_compact_models"]))
+    info["build_seconds"] = {name: manage(tree, *command) for name, command in steps}
+    info["bytes"] = {
+        "csv": sum(os.path.getsize(os.path.join(data_dir, n)) for n in ("residential_data.csv", "rents.csv")),
+        "snapshot": directory_bytes(os.path.join(tree, "properties", "data", "snapshot")),
+        "properties_models": directory_bytes(os.path.join(tree, "properties", "ml")),
+        "recommender_models": directory_bytes(os.path.join(tree, "listproperties", "models")),
+    }
+    return tree, info
+
+
+# -------------------------------
+# Measurement (runs in the scratch tree)
+# -------------------------------
+class Workload:
+    """Random but valid requests over the synthetic cities and localities."""
+
+    def __init__(self, cities, seed):
+        self.cities = cities
+        self.names = sorted(cities)
+        self.rng = random.Random(seed)
+
+    def _listing(self):
+        rng = self.rng
+        city = rng.choice(self.names)
+        # Mostly localities of the city (exact matches), some from elsewhere (KNN fallback)
+        location = rng.choice(self.cities[rng.choice(self.names) if rng.random() < 0.2 else city]["locations"])
+        bedrooms = rng.randint(1, 5)
+        area = rng.randint(300, 800) * bedrooms
+        price = area * self.cities[city]["Housing_Cost_per_sqft"] * rng.uniform(0.6, 1.6)
+        amenities = rng.sample(AMENITIES, rng.randint(1, 3))
+        return city, location, rng.choice(list(PROPERTY_TYPES)), bedrooms, area, price, amenities
+
+    def search(self):
+        city, location, kind, bedrooms, area, price, amenities = self._listing()
+        body = {"city": city, "location": location, "property_type": kind, "bedrooms": bedrooms,
+                "area_sqft": area, "amenities": ",".join(amenities)}
+        if self.rng.random() < 0.5:
+            body["max_price"] = str(int(price))
+        return json.dumps(body).encode(), b""
+
+    def recommend(self):
+        city, location, kind, bedrooms, area, price, amenities = self._listing()
+        return json.dumps({"City": city, "Location": location, "Property Type": kind, "Bedrooms": bedrooms,
+                           "Area (sqft)": area, "Price (INR)": round(price * 0.003), "amenities": amenities}).encode(), b""
+
+    def estimate(self):
+        city, location, kind, bedrooms, area, _, amenities = self._listing()
+        return json.dumps({"listing_type": self.rng.choice(["sale", "rent"]), "city": city, "location": location,
+                           "property_type": kind, "bedrooms": bedrooms, "area_sqft": area,
+                           "amenities": ",".join(amenities)}).encode(), b""
+
+    def random(self):
+        return b"", b""
+
+    def move_meter(self):
+        from_city, to_city = self.rng.sample(self.names, 2)
+        return b"", urlencode({"from_city": from_city, "to_city": to_city}).encode()
+
+
+def summarize(seconds, statuses, elapsed=None):
+    values = sorted(seconds)
+    result = {
+        "requests": len(values),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+    if values:
+        pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 3)
+        result.update({
+            "mean_ms": round(statistics.fmean(values) * 1000, 3),
+            "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99),
+            "max_ms": round(values[-1] * 1000, 3),
+        })
+    if elapsed:
+        result["requests_per_second"] = round(len(values) / elapsed, 2)
+        result["ok_per_second"] = round(statuses.get(200, 0) / elapsed, 2)
+    return result
+
+
+async def sequential(app, method, path, build, count):
+    from benchmarks.serving import asgi_call
+    seconds, statuses = [], {}
+    for _ in range(count):
+        body, query = build()
+        start = time.perf_counter()
+        status = await asgi_call(app, method, path, body, query)
+        seconds.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    return seconds, statuses
+
+
+async def concurrent(app, method, path, build, clients, duration):
+    from benchmarks.serving import BACKOFF, asgi_call
+    seconds, statuses = [], {}
+    deadline = time.monotonic() + duration
+
+    async def client():
+        while time.monotonic() < deadline:
+            body, query = build()
+            start = time.perf_counter()
+            status = await asgi_call(app, method, path, body, query)
+            seconds.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 503:
+                await asyncio.sleep(BACKOFF)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return seconds, statuses, time.perf_counter() - start
+
+
+def measure(config):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+    from django.conf import settings
+    django.setup()
+    # Every request must reach the models
+    settings.RESPONSE_CACHE = {**getattr(settings, "RESPONSE_CACHE", {}), "BACKEND": None}
+    settings.SEARCH_MEMO_SIZE = 0
+    from django.core.handlers.asgi import ASGIHandler
+    from django.urls import get_resolver
+    from benchmarks.workers import memory_kib
+    from core.artifacts import registry
+    from core.batching import BATCHERS
+
+    get_resolver().url_patterns
+    rss_before = memory_kib()[0]
+    start = time.perf_counter()
+    registry.preload()
+    load = {
+        "seconds": round(time.perf_counter() - start, 3),
+        "rss_kib_before": rss_before,
+        "rss_kib_after": memory_kib()[0],
+        "artifacts": {
+            name: {"load_seconds": a["load_seconds"], "size_bytes": a["size_bytes"], "error": a["error"]}
+            for name, a in registry.stats().items()
+        },
+    }
+
+    app = ASGIHandler()
+    workload = Workload(config["cities"], config["seed"])
+    configs = {name: dict(batcher.config) for name, batcher in BATCHERS.items()}
+    endpoints = {}
+    for name in config["endpoints"]:
+        method, path, builder = ENDPOINTS[name]
+        build = getattr(workload, builder)
+
+        for batcher in BATCHERS.values():
+            batcher._config = {**batcher.config, "ENABLED": False}
+        asyncio.run(sequential(app, method, path, build, config["warmup"]))
+        latency = summarize(*asyncio.run(sequential(app, method, path, build, config["requests"])))
+
+        for batcher_name, batcher in BATCHERS.items():
+            batcher._config = configs[batcher_name]
+        seconds, statuses, elapsed = asyncio.run(
+            concurrent(app, method, path, build, config["concurrency"], config["seconds"]),
+        )
+        endpoints[name] = {"latency": latency, "throughput": summarize(seconds, statuses, elapsed)}
+
+    return {
+        "load": load,
+        "endpoints": endpoints,
+        "memory": {"rss_kib": memory_kib()[0], "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss},
+    }
+
+
+def run_child(tree, config):
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.endpoints", "--child", f.name],
+            cwd=tree, capture_output=True, text=True,
+        )
+    finally:
+        os.unlink(f.name)
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"Measurement failed:\n{proc.stdout[-2000:]}{proc.stderr[-4000:]}")
+
+
+# -------------------------------
+# Results
+# -------------------------------
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {"numpy": numpy.__version__, "pandas": pandas.__version__, "sklearn": sklearn.__version__},
+    }
+
+
+def print_results(results):
+    for scale, result in results["scales"].items():
+        load = result["load"]
+        print(f"\n{int(scale):,} listings: models load in {load['seconds']:.2f}s, "
+              f"+{(load['rss_kib_after'] - load['rss_kib_before']) / 1024:.0f} MiB RSS, "
+              f"peak {result['memory']['max_rss_kib'] / 1024:.0f} MiB")
+        print(f"{'endpoint':<28}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'req/s':>9}{'non-200':>9}")
+        for name, r in result["endpoints"].items():
+            latency, throughput = r["latency"], r["throughput"]
+            errors = sum(n for s, n in latency["statuses"].items() if s != "200")
+            errors += sum(n for s, n in throughput["statuses"].items() if s != "200")
+            print(f"{name:<28}{latency.get('p50_ms', '-'):>9}{latency.get('p90_ms', '-'):>9}"
+                  f"{latency.get('p99_ms', '-'):>9}{throughput['requests_per_second']:>9}{errors:>9}")
+
+
+def compare(base_path, new_path, threshold):
+    """Print per-endpoint changes between two result files; returns the number of regressions."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"base {base['environment']['commit']}  new {new['environment']['commit']}")
+    print(f"{'scale':>10} {'endpoint':<28}{'p50 ms':>22}{'p99 ms':>22}{'req/s':>22}")
+    regressions = 0
+    for scale in sorted(set(base["scales"]) & set(new["scales"]), key=int):
+        for name, b in base["scales"][scale]["endpoints"].items():
+            n = new["scales"][scale]["endpoints"].get(name)
+            if n is None:
+                continue
+            cells, flagged = [], False
+            for section, key, higher_better in [("latency", "p50_ms", False), ("latency", "p99_ms", False),
+                                                ("throughput", "requests_per_second", True)]:
+                old, now = b[section].get(key), n[section].get(key)
+                if not old or now is None:
+                    cells.append(f"{'-':>22}")
+                    continue
+                change = now / old - 1
+                cells.append(f"{old:>9} -> {now:<8}{change:+.0%}".rjust(22))
+                if key != "p99_ms" and (change < -threshold if higher_better else change > threshold):
+                    flagged = True
+            regressions += flagged
+            print(f"{int(scale):>10} {name:<28}{''.join(cells)}{'  REGRESSION' if flagged else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10k,100k,1M", help="comma-separated listing counts")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated endpoint names")
+    parser.add_argument("--requests", type=int, default=300, help="sequential requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests before the sequential run")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients in the throughput run")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of the throughput run")
+    parser.add_argument("--cities", type=int, default=12)
+    parser.add_argument("--locations", type=int, default=8, help="localities per city")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--estimator", default="forest", help="train_property_models --estimator")
+    parser.add_argument("--jobs", type=int, default=1, help="training processes")
+    parser.add_argument("--compact", action="store_true", help="also export and serve the compact models")
+    parser.add_argument("--workdir", help="keep data and trees here (default: a temporary directory)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        with open(args.child) as f:
+            print("RESULT " + json.dumps(measure(json.load(f))))
+        return 0
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    cities = city_table(args.cities, args.locations, args.seed)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zonewise-bench-")
+    results = {
+        "environment": environment(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "child", "workdir")},
+        "scales": {},
+    }
+    try:
+        for rows in map(parse_scale, args.scales.split(",")):
+            print(f"{rows:,} listings: building data and models...", flush=True)
+            tree, build = prepare(os.path.join(workdir, str(rows)), rows, cities, args)
+            print(f"{rows:,} listings: measuring...", flush=True)
+            result = run_child(tree, {
+                "cities": cities, "endpoints": endpoints, "seed": args.seed, "requests": args.requests,
+                "warmup": args.warmup, "concurrency": args.concurrency, "seconds": args.seconds,
+            })
+            results["scales"][str(rows)] = {"build": build, **result}
+            if args.output:
+                # Written after every scale, so a failure at 1M keeps the smaller ones
+                with open(args.output, "w") as f:
+                    json.dump(results, f, indent=2)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+"""
+Import-time cost of the Django app and its URLconf.
+
+    python -m benchmarks.imports --top 20
+
+Runs a fresh interpreter with `-X importtime` that sets up Django and
+imports the whole URLconf (every view module), and reports wall time of
+each phase, the slowest imports by cumulative time, and how many model
+artifacts were loaded as a side effect (should be 0: loading is lazy).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = """
+import json, os, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+t2 = time.perf_counter()
+from core.artifacts import registry
+stats = registry.stats()
+print("RESULT " + json.dumps({
+    "setup_seconds": t1 - t0,
+    "urlconf_seconds": t2 - t1,
+    "artifacts_registered": len(stats),
+    "artifacts_loaded": sum(s["loaded"] for s in stats.values()),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", CHILD],
+        cwd=backend_dir, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(next(l for l in proc.stdout.splitlines() if l.startswith("RESULT "))[7:])
+    imports = sorted(parse_importtime(proc.stderr), key=lambda r: r[2], reverse=True)
+    result["slowest_imports"] = [
+        {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cum_us / 1000}
+        for name, self_us, cum_us in imports[:args.top]
+    ]
+
+    print(f"django.setup():       {result['setup_seconds'] * 1000:8.1f} ms")
+    print(f"URLconf import:       {result['urlconf_seconds'] * 1000:8.1f} ms")
+    print(f"artifacts loaded:     {result['artifacts_loaded']} of {result['artifacts_registered']} registered")
+    print(f"slowest imports (cumulative):")
+    for row in result["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Recall-vs-latency benchmark for the neighbor backends in core.neighbors.
+
+    python -m benchmarks.neighbors --rows 200000 --dim 64 --k 10
+    python -m benchmarks.neighbors --model properties/ml/knn_model.pkl
+
+Ground truth comes from the "exact" backend; every other backend (and every
+IVF nprobe setting) is scored by recall@k against it, with build time and
+per-query latency percentiles. Use --output to keep the numbers as JSON.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from core.neighbors import BACKENDS
+
+
+def synthetic_matrix(rows, dim, clusters=50, seed=0):
+    """Clustered data, roughly like one-hot + scaled numeric listing vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=3.0, size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=rows)
+    return centers[labels] + rng.normal(size=(rows, dim))
+
+
+def load_matrix(args):
+    if args.model:
+        import joblib
+        return np.asarray(joblib.load(args.model)._fit_X, dtype=float)
+    if args.matrix:
+        return np.load(args.matrix)
+    return synthetic_matrix(args.rows, args.dim, seed=args.seed)
+
+
+def run_backend(name, X, Q, k, options):
+    start = time.perf_counter()
+    index = BACKENDS[name](X, **options)
+    build_seconds = time.perf_counter() - start
+
+    latencies, found = [], []
+    for q in Q:
+        start = time.perf_counter()
+        found.append(index.query(q[None, :], k)[0][1])
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        "backend": name,
+        "options": options,
+        "build_seconds": round(build_seconds, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "qps": round(len(Q) / (latencies.sum() / 1000), 1),
+    }, found
+
+
+def recall(found, truth):
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="comma-separated IVF nprobe values")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--matrix", help=".npy matrix to search instead of synthetic data")
+    parser.add_argument("--model", help="fitted NearestNeighbors pickle whose training matrix to search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    X = load_matrix(args)
+    rng = np.random.default_rng(args.seed + 1)
+    # Queries are perturbed training rows, like real searches near listings
+    Q = X[rng.choice(len(X), size=args.queries)] + rng.normal(scale=0.1, size=(args.queries, X.shape[1]))
+
+    runs = [("exact", {}), ("blocked", {})]
+    runs += [("ivf", {"nprobe": int(p), "nlist": args.nlist}) for p in args.nprobe.split(",")]
+
+    results, truth = [], None
+    for name, options in runs:
+        result, found = run_backend(name, X, Q, args.k, options)
+        if truth is None:
+            truth = found
+        result["recall"] = round(recall(found, truth), 4)
+        results.append(result)
+        print(f"{name:8} {json.dumps(options):32} build {result['build_seconds']:8.3f}s  "
+              f"p50 {result['p50_ms']:8.3f}ms  p95 {result['p95_ms']:8.3f}ms  recall@{args.k} {result['recall']:.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": len(X), "dim": X.shape[1], "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Serving cost of the estimate-model choices in properties.train.
+
+    python -m benchmarks.property_models
+    python -m benchmarks.property_models --estimators forest,linear --jobs 4
+
+Trains the whole properties model set once per estimator choice (into a
+temporary directory; properties/ml is left alone) and prints what
+train_property_models records for each: fit time, load time, size on disk
+and per-row inference latency of the sale/rent models, batched and for a
+single request.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estimators", help="comma-separated choices (default: all)")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--sample-rows", type=int, default=1000)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+    django.setup()
+    from properties.train import ESTIMATOR_CHOICES, train
+
+    names = args.estimators.split(",") if args.estimators else list(ESTIMATOR_CHOICES)
+    results = {}
+    print(f"{'estimator':<11}{'model':<8}{'fit s':>9}{'load s':>9}{'KiB':>10}{'batch us/row':>14}{'single ms':>11}")
+    for name in names:
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = train(model_dir=directory, estimator=name, jobs=args.jobs, sample_rows=args.sample_rows)
+        results[name] = {group: manifest["models"][group] for group in ("sales", "rents")}
+        for group, m in results[name].items():
+            print(f"{name:<11}{group:<8}{m['fit_seconds']:>9.3f}{m['load_seconds']:>9.3f}{m['bytes'] / 1024:>10.1f}"
+                  f"{m['batch_us_per_row']:>14.2f}{m['single_row_ms']:>11.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
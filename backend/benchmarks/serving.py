@@ -0,0 +1,238 @@
+"""
+Throughput of the ML endpoints under WSGI vs ASGI, and what a burst of
+searches does to a light endpoint served by the same worker.
+
+    python -m benchmarks.serving
+    python -m benchmarks.serving --clients 32 --seconds 10 --threads 8
+    python -m benchmarks.serving --compare-batching
+
+Drives Django's own WSGIHandler and ASGIHandler in-process (no sockets, so
+only the serving model differs): under WSGI every client holds one of
+--threads request threads for its whole request, like a threaded gunicorn
+worker; under ASGI all clients share one event loop and the model work
+goes to core.offload's bounded pool. Both batch concurrent searches
+(core.batching); --compare-batching adds an unbatched ASGI run.
+
+--clients clients post distinct searches (response cache off) for
+--seconds, while one probe client polls /api/me/ (session lookup, like
+login); clients back off for BACKOFF seconds after a 503. Reports search
+throughput, 503s from admission control, probe latency and the average
+batch size.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SEARCH_PATH = "/api/recommend_properties/"
+PROBE_PATH = "/api/me/"
+BACKOFF = 0.25  # seconds a client waits after a 503
+
+
+def search_body(rng):
+    return json.dumps({
+        "city": rng.choice(["Mumbai", "Pune", "Bangalore", "Delhi"]),
+        "location": rng.choice(["Andheri", "Baner", "Whitefield", "Dwarka"]),
+        "property_type": rng.choice(["Apartment", "Villa", "Independent House"]),
+        "bedrooms": rng.randint(1, 5),
+        "area_sqft": rng.randint(400, 4000),
+        "amenities": ",".join(rng.sample(["Gym", "Pool", "Parking", "Lift", "Security"], 2)),
+    }).encode()
+
+
+def percentiles(values):
+    if not values:
+        return {"p50_ms": None, "p99_ms": None}
+    values = sorted(values)
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 2),
+        "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 2),
+    }
+
+
+class Tally:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses = {}
+        self.search_seconds = []
+        self.probe_seconds = []
+
+    def add(self, path, status, seconds):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            (self.probe_seconds if path == PROBE_PATH else self.search_seconds).append(seconds)
+
+    def report(self, seconds):
+        ok = self.statuses.get(200, 0)
+        return {
+            "searches": len(self.search_seconds),
+            "searches_per_second": round(len(self.search_seconds) / seconds, 2),
+            "ok_per_second": round(ok / seconds, 2),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "search": percentiles(self.search_seconds),
+            "probe": {"requests": len(self.probe_seconds), **percentiles(self.probe_seconds)},
+        }
+
+
+# -------------------------------
+# WSGI
+# -------------------------------
+def wsgi_call(app, method, path, body=b""):
+    environ = {
+        "REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)), "wsgi.input": io.BytesIO(body), "wsgi.url_scheme": "http",
+        "wsgi.errors": io.StringIO(), "wsgi.multithread": True, "wsgi.multiprocess": False,
+        "wsgi.run_once": False, "wsgi.version": (1, 0),
+    }
+    status = []
+    chunks = app(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+    b"".join(chunks)
+    getattr(chunks, "close", lambda: None)()
+    return status[0]
+
+
+def run_wsgi(clients, seconds, threads):
+    from django.core.handlers.wsgi import WSGIHandler
+    app = WSGIHandler()
+    tally = Tally()
+    # The server's request threads; requests wait for one in arrival order
+    server = ThreadPoolExecutor(threads)
+    deadline = time.monotonic() + seconds
+
+    def client(i, path):
+        rng = random.Random(i)
+        while time.monotonic() < deadline:
+            body = search_body(rng) if path == SEARCH_PATH else b""
+            start = time.perf_counter()
+            status = server.submit(wsgi_call, app, "POST" if path == SEARCH_PATH else "GET", path, body).result()
+            tally.add(path, status, time.perf_counter() - start)
+            if path == PROBE_PATH or status == 503:
+                time.sleep(BACKOFF if status == 503 else 0.05)
+
+    workers = [threading.Thread(target=client, args=(i, SEARCH_PATH)) for i in range(clients)]
+    workers.append(threading.Thread(target=client, args=(-1, PROBE_PATH)))
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    server.shutdown()
+    return tally.report(seconds)
+
+
+# -------------------------------
+# ASGI
+# -------------------------------
+async def asgi_call(app, method, path, body=b"", query=b""):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status[0]
+
+
+def run_asgi(clients, seconds):
+    from django.core.handlers.asgi import ASGIHandler
+    app = ASGIHandler()
+    tally = Tally()
+
+    async def client(i, path, deadline):
+        rng = random.Random(i)
+        while time.monotonic() < deadline:
+            body = search_body(rng) if path == SEARCH_PATH else b""
+            start = time.perf_counter()
+            status = await asgi_call(app, "POST" if path == SEARCH_PATH else "GET", path, body)
+            tally.add(path, status, time.perf_counter() - start)
+            await asyncio.sleep(BACKOFF if status == 503 else 0.05 if path == PROBE_PATH else 0)
+
+    async def main():
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(
+            *(client(i, SEARCH_PATH, deadline) for i in range(clients)), client(-1, PROBE_PATH, deadline),
+        )
+
+    asyncio.run(main())
+    return tally.report(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent search clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--threads", type=int, default=4, help="request threads of the WSGI worker")
+    parser.add_argument("--compare-batching", action="store_true",
+                        help="also run ASGI with micro-batching off (settings.MICRO_BATCHING)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+    from django.conf import settings
+    django.setup()
+    # Every search must reach the models
+    settings.RESPONSE_CACHE = {**getattr(settings, "RESPONSE_CACHE", {}), "BACKEND": None}
+    settings.SEARCH_MEMO_SIZE = 0
+    from core.artifacts import registry
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    registry.preload()
+
+    from properties.views import search_batcher
+    runs = {
+        "wsgi": lambda: run_wsgi(args.clients, args.seconds, args.threads),
+        "asgi": lambda: run_asgi(args.clients, args.seconds),
+    }
+    if args.compare_batching:
+        runs["asgi-unbatched"] = lambda: run_asgi(args.clients, args.seconds)
+    results = {}
+    for name, run in runs.items():
+        search_batcher._config = {**search_batcher.config, "ENABLED": name != "asgi-unbatched"}
+        batches, items = search_batcher.batches, search_batcher.items
+        results[name] = run()
+        batches = search_batcher.batches - batches
+        results[name]["avg_batch_size"] = round((search_batcher.items - items) / batches, 2) if batches else None
+    results["batcher"] = search_batcher.stats()
+
+    print(f"{args.clients} search clients, {args.seconds:.0f}s each, WSGI with {args.threads} threads")
+    print(f"{'server':<15}{'search/s':>10}{'200/s':>8}{'503':>6}{'search p50':>12}{'p99 ms':>9}"
+          f"{'probe p50':>11}{'p99 ms':>9}{'batch':>7}")
+    for name in runs:
+        r = results[name]
+        print(f"{name:<15}{r['searches_per_second']:>10.1f}{r['ok_per_second']:>8.1f}"
+              f"{r['statuses'].get('503', 0):>6}{r['search']['p50_ms']:>12}{r['search']['p99_ms']:>9}"
+              f"{r['probe']['p50_ms']:>11}{r['probe']['p99_ms']:>9}{r['avg_batch_size'] or '-':>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Dense vs CSR feature matrices for the listing recommender.
+
+    python -m benchmarks.sparse_features --rows 100000 --locations 5000
+
+Builds listings shaped like listproperties/data/rents.csv (one-hot city,
+location and type, multi-hot amenities, three scaled numbers) with many
+distinct locations, encodes them the way listproperties.train does, and
+reports matrix memory plus per-query latency of each neighbor backend on
+the dense and the CSR form. Top-k results of every run are checked against
+the dense exact search.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from benchmarks.neighbors import recall
+from core.neighbors import BACKENDS
+
+
+def synthetic_listings(rows, locations, amenities, seed=0):
+    rng = np.random.default_rng(seed)
+    cats = np.column_stack([
+        rng.integers(0, 20, rows).astype(str),
+        rng.integers(0, locations, rows).astype(str),
+        rng.integers(0, 5, rows).astype(str),
+    ])
+    # 0-5 amenities per listing
+    counts = rng.integers(0, 6, rows)
+    amen_rows = np.repeat(np.arange(rows), counts)
+    amen_cols = rng.integers(0, amenities, counts.sum())
+    amen = sp.csr_matrix((np.ones(len(amen_rows)), (amen_rows, amen_cols)), shape=(rows, amenities))
+    amen.data[:] = 1.0  # duplicates collapse to a single flag
+    nums = np.column_stack([
+        rng.integers(1, 6, rows), rng.normal(1000, 300, rows), rng.lognormal(10, 0.5, rows),
+    ])
+    return cats, amen, nums
+
+
+def encode(cats, amen, nums):
+    cat = OneHotEncoder(handle_unknown="ignore").fit_transform(cats)
+    num = sp.csr_matrix(StandardScaler().fit_transform(nums))
+    return sp.hstack([cat, amen, num], format="csr", dtype=float)
+
+
+def nbytes(X):
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def time_queries(index, Q, k):
+    latencies, found = [], []
+    for j in range(Q.shape[0]):
+        start = time.perf_counter()
+        found.append(index.query(Q[j:j + 1], k)[0][1])
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--locations", type=int, default=3000)
+    parser.add_argument("--amenities", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    X_sparse = encode(*synthetic_listings(args.rows, args.locations, args.amenities, args.seed))
+    encode_seconds = time.perf_counter() - start
+    X_dense = X_sparse.toarray()
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(X_sparse.shape[0], size=args.queries)
+    print(f"{X_sparse.shape[0]} rows x {X_sparse.shape[1]} features, "
+          f"{X_sparse.nnz / X_sparse.shape[0]:.1f} non-zeros per row, encoded in {encode_seconds:.2f}s")
+    print(f"matrix memory: dense {nbytes(X_dense) / 2**20:.1f} MiB, CSR {nbytes(X_sparse) / 2**20:.1f} MiB")
+
+    runs = [
+        ("exact", "dense", X_dense, X_dense[picks]),
+        ("blocked", "dense", X_dense, X_dense[picks]),
+        ("exact", "csr", X_sparse, X_sparse[picks]),
+        ("sparse", "csr", X_sparse, X_sparse[picks]),
+    ]
+    results, truth = [], None
+    for name, layout, X, Q in runs:
+        start = time.perf_counter()
+        index = BACKENDS[name](X)
+        build_seconds = time.perf_counter() - start
+        latencies, found = time_queries(index, Q, args.k)
+        if truth is None:
+            truth = found
+        result = {
+            "backend": name,
+            "layout": layout,
+            "matrix_bytes": nbytes(index.X),
+            "build_seconds": round(build_seconds, 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "recall": round(recall(found, truth), 4),
+        }
+        results.append(result)
+        print(f"{name:8} {layout:6} build {result['build_seconds']:7.3f}s  p50 {result['p50_ms']:8.3f}ms  "
+              f"p95 {result['p95_ms']:8.3f}ms  recall@{args.k} {result['recall']:.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "rows": X_sparse.shape[0], "features": X_sparse.shape[1], "nnz": int(X_sparse.nnz),
+                "dense_bytes": nbytes(X_dense), "csr_bytes": nbytes(X_sparse), "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Per-worker memory and cold-start time of the ML artifacts.
+
+    python -m benchmarks.workers --workers 4
+    python -m benchmarks.workers --workers 4 --no-mmap
+
+Starts N fresh processes the way gunicorn workers would (without --preload),
+each setting up Django and warming up every model artifact, and reports
+load time, RSS and PSS per worker. PSS splits shared pages between the processes
+mapping them, so with the memory-mapped store (ARTIFACT_MMAP_DIR) the mapped
+arrays count once across all workers instead of once per worker.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+
+def memory_kib():
+    """(rss, pss) of this process in KiB, from /proc (Linux only)."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values.get("rss"), values.get("pss")
+
+
+def worker(mmap_dir, ready, go, results):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    from django.conf import settings
+    settings.ARTIFACT_MMAP_DIR = mmap_dir
+    import django
+
+    baseline = memory_kib()
+    start = time.perf_counter()
+    django.setup()
+
+    # What wsgi.py does with ML_WARMUP = "sync": every registered artifact
+    from core.warmup import warm_up
+    warm_up("sync")
+    load_seconds = time.perf_counter() - start
+
+    # Measure once every worker has loaded, so shared pages are split evenly
+    ready.put(None)
+    go.wait()
+    rss, pss = memory_kib()
+    results.put({
+        "pid": os.getpid(),
+        "load_seconds": round(load_seconds, 4),
+        "rss_kib": rss,
+        "pss_kib": pss,
+        "rss_delta_kib": rss - baseline[0],
+    })
+    go.wait()
+
+
+def run(workers, mmap_dir):
+    ctx = multiprocessing.get_context("spawn")
+    ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(mmap_dir, ready, go, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get()
+    go.set()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return sorted(out, key=lambda r: r["pid"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-mmap", action="store_true", help="keep arrays in each worker's memory")
+    parser.add_argument("--mmap-dir", help="store directory (default: settings.ARTIFACT_MMAP_DIR)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    mmap_dir = None
+    if not args.no_mmap:
+        mmap_dir = args.mmap_dir
+        if mmap_dir is None:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+            from django.conf import settings
+            mmap_dir = str(settings.ARTIFACT_MMAP_DIR)
+
+    # First worker alone: pays for building the store if it doesn't exist yet
+    cold = run(1, mmap_dir)
+    warm = run(args.workers, mmap_dir)
+
+    print(f"store: {mmap_dir or 'disabled (in-process arrays)'}")
+    print(f"cold start: {cold[0]['load_seconds']:.3f}s")
+    for r in warm:
+        print(f"worker {r['pid']}: load {r['load_seconds']:.3f}s  RSS {r['rss_kib'] / 1024:.1f} MiB "
+              f"(+{r['rss_delta_kib'] / 1024:.1f} for artifacts)  PSS {r['pss_kib'] / 1024:.1f} MiB")
+    print(f"total PSS of {len(warm)} workers: {sum(r['pss_kib'] for r in warm) / 1024:.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mmap_dir": mmap_dir, "cold": cold, "warm": warm}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
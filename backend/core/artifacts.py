@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(paths):
+    """
+    (mtime_ns, size) of each path; changes whenever any file is rewritten,
+    created or deleted. Missing files are (None, None), so optional inputs
+    (e.g. a snapshot that hasn't been built yet) can be watched too; loaders
+    still fail on required files that don't exist.
+    """
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            signature.append((None, None))
+            continue
+        signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def signature_fingerprint(signature):
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:12]
+
+
+def file_fingerprint(paths):
+    """Short stable id of the current contents of `paths` (see get_versioned)."""
+    return signature_fingerprint(file_signature(paths))
+
+
+class Artifact:
+    """One cached object built from one or more files on disk."""
+
+    def __init__(self, name, paths, loader):
+        self.name = name
+        self.paths = list(paths)
+        self.loader = loader
+        # (object, fingerprint), replaced as one tuple so the two never disagree
+        self.current = (None, None)
+        self.signature = None
+        self.version = 0
+        self.load_seconds = None
+        self.size_bytes = None
+        self.loaded_at = None
+        self.loading = False
+        self.error = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self.current[0]
+
+    @property
+    def loaded(self):
+        return self.signature is not None
+
+
+class ArtifactStore:
+    """
+    Process-wide cache of model artifacts.
+
+    Each artifact is loaded once and shared by every request in the process.
+    At most every `check_interval` seconds a `get()` stats the backing files;
+    if their mtime or size changed (e.g. train.py ran again) the artifact is
+    reloaded and swapped in one assignment, so concurrent readers see either
+    the old or the new object, never a half-built one. If a reload fails the
+    previous object keeps being served.
+
+    Nothing is loaded at import time: an artifact loads on its first
+    `get()`, or earlier from core.warmup when the WSGI/ASGI app starts.
+    Warming up synchronously in the gunicorn master (`--preload`) lets
+    forked workers share the loaded objects' memory pages copy-on-write
+    instead of each unpickling its own copy.
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._artifacts = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def register(self, name, paths, loader):
+        """
+        Register `loader(*paths)` under `name`. Re-registering the same name
+        keeps the existing entry so module reloads don't drop the cache.
+        """
+        with self._lock:
+            if name not in self._artifacts:
+                self._artifacts[name] = Artifact(name, paths, loader)
+            return self._artifacts[name]
+
+    def on_reload(self, callback):
+        """Call `callback(name, version)` whenever an artifact is (re)loaded."""
+        self._listeners.append(callback)
+
+    def get(self, name):
+        return self.get_versioned(name)[0]
+
+    def get_versioned(self, name):
+        """
+        Return (object, fingerprint). The fingerprint identifies the files the
+        object was built from and, unlike `version`, is the same in every
+        process serving those files, so it can key caches shared by workers.
+        """
+        artifact = self._artifacts[name]
+        now = time.monotonic()
+        if artifact.loaded and now - artifact.checked_at < self.check_interval:
+            return artifact.current
+
+        signature = file_signature(artifact.paths)
+        if signature == artifact.signature:
+            artifact.checked_at = now
+            return artifact.current
+
+        with artifact.lock:
+            # Another thread may have reloaded while we waited for the lock
+            if signature != artifact.signature:
+                self._load(artifact, signature)
+            artifact.checked_at = time.monotonic()
+        return artifact.current
+
+    def version(self, name):
+        return self._artifacts[name].version
+
+    def preload(self, names=None):
+        """
+        Load the given artifacts (all registered ones by default).
+        Failures are logged and shown in stats(), not raised, so a missing
+        model only breaks the endpoints that need it.
+        """
+        for name in names or list(self._artifacts):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning("Could not preload artifact %s: %s", name, e)
+
+    def stats(self):
+        return {
+            name: {
+                "loaded": artifact.loaded,
+                "loading": artifact.loading,
+                "error": artifact.error,
+                "version": artifact.version,
+                "fingerprint": artifact.current[1],
+                "load_seconds": artifact.load_seconds,
+                "size_bytes": artifact.size_bytes,
+                "loaded_at": artifact.loaded_at,
+            }
+            for name, artifact in self._artifacts.items()
+        }
+
+    def _load(self, artifact, signature):
+        start = time.perf_counter()
+        artifact.loading = True
+        try:
+            value = artifact.loader(*artifact.paths)
+        except Exception as e:
+            artifact.error = f"{type(e).__name__}: {e}"
+            if not artifact.loaded:
+                raise
+            logger.exception("Reloading artifact %s failed; keeping version %s",
+                             artifact.name, artifact.version)
+            return
+        finally:
+            artifact.loading = False
+
+        artifact.current = (value, signature_fingerprint(signature))
+        artifact.signature = signature
+        artifact.version += 1
+        artifact.load_seconds = time.perf_counter() - start
+        artifact.size_bytes = sum(size or 0 for _, size in signature)
+        artifact.loaded_at = time.time()
+        artifact.error = None
+        logger.info("Loaded artifact %s v%s in %.3fs (%d bytes)", artifact.name,
+                    artifact.version, artifact.load_seconds, artifact.size_bytes)
+
+        for callback in self._listeners:
+            callback(artifact.name, artifact.version)
+
+
+# Shared by every app in the process
+registry = ArtifactStore()
@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import service, timing
+from .offload import Overloaded, inference
+
+DEFAULTS = {
+    "ENABLED": True,
+    "WINDOW_MS": 2.0,  # how long the first request of a batch waits for company
+    "MAX_BATCH": 16,   # a full batch is dispatched without waiting out the window
+}
+
+# name -> batcher, for metrics
+BATCHERS = {}
+
+# Upper bounds (ms) of the queueing delay histogram; the last bucket is open
+DELAY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into one call of a batched handler.
+
+    `await batcher.run(item)` queues `item`; a collector thread waits up to
+    WINDOW_MS after the first queued item (or until MAX_BATCH are queued),
+    then hands the whole batch to `handler(items)` on the executor's pool
+    and completes every caller with its own result. While no batch is
+    running the window is skipped, so a lone request at low load isn't
+    delayed. The handler returns one
+    result per item, in order; a result that is an exception is raised to
+    that caller only. While every pool thread is busy, items keep queueing,
+    so batches grow with load instead of the queue.
+
+    Admission (MAX_PENDING, QUEUE_TIMEOUT) is the executor's, shared with
+    the requests it runs one at a time; MAX_BATCH is capped at MAX_PENDING,
+    since no more items can be queued at once. Configured by
+    settings.MICRO_BATCHING (see DEFAULTS); with ENABLED off every item is
+    run alone through the executor. With the inference service enabled
+    (core.service) batches are sent there instead of calling `handler`.
+    Timing spans of the handler (core.timing) are handed back to each
+    caller's request along with its "queue" time.
+    """
+
+    def __init__(self, name, handler, executor=inference, config=None):
+        self.name = name
+        self.handler = handler
+        self.executor = executor
+        self._config = config
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._collector = None
+        self._slots = None
+        self._running = 0
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.expired = 0
+        self.sizes = {}
+        self.delays = timing.Histogram(DELAY_BUCKETS_MS)
+        self.run_seconds = 0.0
+        BATCHERS[name] = self
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = {**DEFAULTS, **getattr(settings, "MICRO_BATCHING", {})}
+        return self._config
+
+    async def run(self, item):
+        """The handler's result for `item`; raises it if it is an exception, or Overloaded."""
+        if not self.config["ENABLED"]:
+            result, spans = await self.executor.run(self._run_one, item)
+            timing.merge(spans)
+            if isinstance(result, BaseException):
+                raise result
+            return result
+        self.executor.admit()
+        future = self.submit(item)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            timing.merge(getattr(future, "spans", None))
+            self.executor.release()
+
+    async def run_many(self, items):
+        """
+        The handler's results for a list the caller already has (e.g. a
+        batch endpoint), as one batch outside the collector: admitted by the
+        executor as one request and sent to the service like any batch. A
+        result that is an exception is returned, not raised; Overloaded is.
+        """
+        results, spans = await self.executor.run(self._run_many, list(items))
+        timing.merge(spans)
+        return results
+
+    def handle(self, items):
+        """Run `items` as one batch in the calling thread: the handler, or the service when enabled."""
+        if service.enabled():
+            return service.client.call(self.name, items)
+        return self.handler(items)
+
+    def _run_many(self, items):
+        close_old_connections()
+        try:
+            with timing.collect() as timings:
+                results = self.handle(items)
+        finally:
+            close_old_connections()
+        return results, timings.spans
+
+    def _run_one(self, item):
+        results, spans = self._run_many([item])
+        return results[0], spans
+
+    def submit(self, item):
+        """Queue `item`; returns a concurrent.futures.Future for its result."""
+        future = Future()
+        with self._cond:
+            if self._collector is None:
+                # One pool thread per batch in flight; further items wait and coalesce
+                self._slots = threading.Semaphore(self.executor.config["WORKERS"])
+                self._collector = threading.Thread(target=self._collect, name=f"{self.name}-batcher", daemon=True)
+                self._collector.start()
+            self._queue.append((item, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    # -------------------------------
+    # Collector
+    # -------------------------------
+    def _collect(self):
+        while True:
+            window = self.config["WINDOW_MS"] / 1000
+            max_batch = min(self.config["MAX_BATCH"], self.executor.config["MAX_PENDING"])
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # Only worth waiting for company when batches are already running
+                deadline = self._queue[0][2] + window if self._running else 0
+                while len(self._queue) < max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            self._slots.acquire()
+            with self._cond:
+                batch = [self._queue.popleft() for _ in range(min(max_batch, len(self._queue)))]
+                self._running += 1
+            try:
+                self.executor.pool.submit(self._run_batch, batch)
+            except Exception as e:
+                self._done()
+                for _, future, _ in batch:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        try:
+            started = time.monotonic()
+            timeout = self.executor.config["QUEUE_TIMEOUT"]
+            live = []
+            for item, future, queued_at in batch:
+                # False when the caller went away (its task was cancelled)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if started - queued_at > timeout:
+                    with self._stats_lock:
+                        self.expired += 1
+                    future.set_exception(Overloaded(f"{self.name} queue wait exceeded {timeout}s"))
+                    continue
+                live.append((item, future, queued_at))
+            if not live:
+                return
+
+            close_old_connections()
+            try:
+                with timing.collect() as timings:
+                    results = self.handle([item for item, _, _ in live])
+            except Exception as e:
+                results = [e] * len(live)
+            finally:
+                close_old_connections()
+            self._record(live, started, time.monotonic() - started)
+
+            for (_, future, queued_at), result in zip(live, results):
+                # Read by run() once the result is in
+                future.spans = {"queue": started - queued_at, **timings.spans}
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._cond:
+            self._running -= 1
+        self._slots.release()
+
+    # -------------------------------
+    # Metrics
+    # -------------------------------
+    def _record(self, live, started, seconds):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(live)
+            self.sizes[len(live)] = self.sizes.get(len(live), 0) + 1
+            self.run_seconds += seconds
+        for _, _, queued_at in live:
+            self.delays.observe((started - queued_at) * 1000)
+
+    def stats(self):
+        config = self.config
+        with self._stats_lock:
+            return {
+                "enabled": config["ENABLED"],
+                "window_ms": config["WINDOW_MS"],
+                "max_batch": min(config["MAX_BATCH"], self.executor.config["MAX_PENDING"]),
+                "queued": len(self._queue),
+                "batches": self.batches,
+                "items": self.items,
+                "expired": self.expired,
+                "avg_batch_size": round(self.items / self.batches, 3) if self.batches else None,
+                "batch_sizes": {str(size): count for size, count in sorted(self.sizes.items())},
+                "queue_delay_ms": self.delays.stats(),
+                "avg_batch_run_ms": round(self.run_seconds / self.batches * 1000, 3) if self.batches else None,
+            }
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _column_kind(series):
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_numeric_dtype(series):
+        return "float"
+    return "text"
+
+
+def write_columns(df, directory):
+    """
+    Write each column of `df` to `directory` as .npy (text as fixed-width
+    unicode plus a null mask) and return the manifest entries read_columns
+    needs to open them again.
+    """
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        kind = _column_kind(series)
+        entry = {"name": name, "kind": kind, "file": f"{i:03d}.npy"}
+        if kind == "text":
+            nulls = series.isna().to_numpy()
+            values = np.asarray(series.astype(object).where(~nulls, "").astype(str), dtype=str)
+            if nulls.any():
+                entry["nulls"] = f"{i:03d}.nulls.npy"
+                np.save(os.path.join(directory, entry["nulls"]), nulls, allow_pickle=False)
+        else:
+            values = series.to_numpy(dtype=np.int64 if kind == "int" else float)
+        np.save(os.path.join(directory, entry["file"]), values, allow_pickle=False)
+        columns.append(entry)
+    return columns
+
+
+class ColumnFrame:
+    """
+    Read-only table over memory-mapped columns written by write_columns.
+
+    Opening it only maps the files; rows become a pandas DataFrame when they
+    are selected with `.iloc[rows]` (the response path), and a whole column
+    becomes a Series on `frame[name]` (index builds). That covers everything
+    the search and random-property endpoints ask of their frame, so startup
+    costs no parsing and workers share the column pages.
+    """
+
+    def __init__(self, columns, nulls, size):
+        self._columns = columns
+        self._nulls = nulls
+        self._size = size
+        self.columns = list(columns)
+
+    def __len__(self):
+        return self._size
+
+    def _values(self, name, rows=None):
+        values = self._columns[name] if rows is None else self._columns[name][rows]
+        if values.dtype.kind != "U":
+            return np.asarray(values)
+        values = values.astype(object)
+        if name in self._nulls:
+            values[self._nulls[name] if rows is None else self._nulls[name][rows]] = np.nan
+        return values
+
+    def __getitem__(self, name):
+        return pd.Series(self._values(name), name=name).infer_objects()
+
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        return pd.DataFrame({name: self._values(name, rows) for name in self.columns}, index=rows)
+
+    @property
+    def iloc(self):
+        return _RowSelector(self)
+
+    def to_frame(self):
+        return pd.DataFrame({name: self[name] for name in self.columns})
+
+
+class _RowSelector:
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __getitem__(self, rows):
+        return self.frame.take(rows)
+
+
+def read_columns(directory, entries, rows, mmap=True):
+    """Open columns written by write_columns as a ColumnFrame of `rows` rows."""
+
+    def load(name):
+        # Empty files can't be mapped
+        mmap_mode = "r" if mmap and rows else None
+        return np.load(os.path.join(directory, name), mmap_mode=mmap_mode, allow_pickle=False)
+
+    columns, nulls = {}, {}
+    for entry in entries:
+        columns[entry["name"]] = load(entry["file"])
+        if "nulls" in entry:
+            nulls[entry["name"]] = load(entry["nulls"])
+    return ColumnFrame(columns, nulls, rows)
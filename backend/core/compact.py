@@ -0,0 +1,375 @@
+"""
+Compact serving format for fitted scikit-learn models.
+
+`export_model` reduces a fitted object to the arrays inference needs
+(encoder vocabularies, scaler moments, regression coefficients, tree
+node arrays, the neighbor matrix) plus a little JSON metadata, and the
+classes below answer the same calls the app makes on the originals
+(`transform`, `predict`, `_fit_X`, ...) from those arrays alone. Arrays
+are .npy files opened memory-mapped, so loading unpickles nothing,
+doesn't import scikit-learn, and the pages are shared between workers.
+
+Supported: OneHotEncoder (dense or sparse, handle_unknown="ignore"),
+StandardScaler, LinearRegression, MultiLabelBinarizer, NearestNeighbors
+(dense), RandomForestRegressor / DecisionTreeRegressor, and a Pipeline of
+ColumnTransformer(OneHotEncoder + passthrough) followed by a regressor.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .versions import publish_version, published_path, read_manifest, sha256_file, source_info
+
+logger = logging.getLogger(__name__)
+
+COMPACT_FORMAT = 1
+
+
+class CompactError(Exception):
+    """The object can't be represented in the compact format."""
+
+
+# -------------------------------
+# Inference
+# -------------------------------
+class OneHot:
+    def __init__(self, categories, feature_names=None):
+        self.categories_ = categories
+        self.lookups = [{value: i for i, value in enumerate(c.tolist())} for c in categories]
+        self.offsets = np.cumsum([0] + [len(c) for c in categories])
+        if feature_names is not None:
+            self.feature_names_in_ = np.array(feature_names, dtype=object)
+
+    def transform(self, X):
+        rows = X.to_numpy(dtype=object) if hasattr(X, "to_numpy") else np.asarray(X, dtype=object)
+        out = np.zeros((len(rows), self.offsets[-1]))
+        for j, lookup in enumerate(self.lookups):
+            # Unknown values stay all-zero, like handle_unknown="ignore"
+            positions = np.fromiter((lookup.get(v, -1) for v in rows[:, j]), dtype=np.intp, count=len(rows))
+            hit = np.flatnonzero(positions >= 0)
+            out[hit, self.offsets[j] + positions[hit]] = 1
+        return out
+
+
+class Scaler:
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+
+class Linear:
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = float(intercept[0])
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+
+class Binarizer:
+    def __init__(self, classes):
+        self.classes_ = classes
+        self.lookup = {value: i for i, value in enumerate(classes.tolist())}
+
+    def transform(self, y):
+        out = np.zeros((len(y), len(self.classes_)), dtype=int)
+        for r, labels in enumerate(y):
+            for label in labels:
+                i = self.lookup.get(label)
+                if i is not None:
+                    out[r, i] = 1
+        return out
+
+
+class Neighbors:
+    def __init__(self, fit_X, metric, metric_params, n_neighbors):
+        self._fit_X = fit_X
+        self.effective_metric_ = metric
+        self.effective_metric_params_ = metric_params
+        self.n_neighbors = n_neighbors
+
+
+class Forest:
+    """
+    Regression trees flattened into shared node arrays; all trees are
+    walked together, one level per step, for every row at once.
+    """
+
+    def __init__(self, left, right, feature, threshold, value, roots):
+        self.left, self.right = left, right
+        self.feature, self.threshold = feature, threshold
+        self.value, self.roots = value, roots
+
+    def predict(self, X):
+        # Trees split on float32 inputs, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        while True:
+            left = self.left[node]
+            inner = left >= 0
+            if not inner.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(inner, np.where(go_left, left, self.right[node]), node)
+        return self.value[node].mean(axis=1)
+
+
+class Pipeline:
+    """One-hot the categorical columns, pass the rest through, then regress."""
+
+    def __init__(self, feature_names, categorical, passthrough, onehot, final):
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.categorical = categorical
+        self.passthrough = passthrough
+        self.onehot = onehot
+        self.final = final
+
+    def predict(self, frame):
+        X = np.hstack([
+            self.onehot.transform(frame[self.categorical]),
+            frame[self.passthrough].to_numpy(dtype=float),
+        ])
+        return self.final.predict(X)
+
+
+# -------------------------------
+# Export
+# -------------------------------
+def _text(values):
+    values = list(values)
+    if not all(isinstance(v, str) for v in values):
+        raise CompactError("Only string categories are supported")
+    return np.array(values, dtype=str)
+
+
+def _feature_names(obj):
+    names = getattr(obj, "feature_names_in_", None)
+    return None if names is None else [str(n) for n in names]
+
+
+def _export_onehot(obj, arrays, prefix=""):
+    if obj.handle_unknown != "ignore" or obj.drop is not None:
+        raise CompactError("OneHotEncoder needs handle_unknown='ignore' and no drop")
+    for j, categories in enumerate(obj.categories_):
+        arrays[f"{prefix}categories_{j}"] = _text(categories)
+    return {"kind": "onehot", "columns": len(obj.categories_), "feature_names": _feature_names(obj)}
+
+
+def _export_forest(obj, arrays, prefix=""):
+    trees = [e.tree_ for e in getattr(obj, "estimators_", [obj])]
+    if any(t.n_outputs != 1 for t in trees):
+        raise CompactError("Only single-output trees are supported")
+    sizes = [t.node_count for t in trees]
+    offsets = np.cumsum([0] + sizes[:-1])
+
+    def children(attr):
+        return np.concatenate([
+            np.where(getattr(t, attr) >= 0, getattr(t, attr) + off, -1) for t, off in zip(trees, offsets)
+        ]).astype(np.int32)
+
+    arrays[f"{prefix}left"] = children("children_left")
+    arrays[f"{prefix}right"] = children("children_right")
+    arrays[f"{prefix}feature"] = np.concatenate([np.maximum(t.feature, 0) for t in trees]).astype(np.int32)
+    arrays[f"{prefix}threshold"] = np.concatenate([t.threshold for t in trees])
+    arrays[f"{prefix}value"] = np.concatenate([t.value[:, 0, 0] for t in trees])
+    arrays[f"{prefix}roots"] = offsets.astype(np.int32)
+    return {"kind": "forest"}
+
+
+def _export_linear(obj, arrays, prefix=""):
+    if np.ndim(obj.coef_) != 1:
+        raise CompactError("Only single-target linear models are supported")
+    arrays[f"{prefix}coef"] = np.asarray(obj.coef_, dtype=float)
+    arrays[f"{prefix}intercept"] = np.array([obj.intercept_], dtype=float)
+    return {"kind": "linear"}
+
+
+REGRESSORS = {
+    "LinearRegression": _export_linear,
+    "RandomForestRegressor": _export_forest,
+    "DecisionTreeRegressor": _export_forest,
+}
+
+
+def export_model(obj, float32=False):
+    """
+    (meta, {name: array}) for a fitted object; raises CompactError for
+    anything unsupported. `float32` halves the neighbor matrix.
+    """
+    kind = type(obj).__name__
+    arrays = {}
+    if kind == "OneHotEncoder":
+        meta = _export_onehot(obj, arrays)
+    elif kind == "StandardScaler":
+        n = obj.n_features_in_
+        arrays["mean"] = obj.mean_ if obj.with_mean else np.zeros(n)
+        arrays["scale"] = obj.scale_ if obj.with_std else np.ones(n)
+        meta = {"kind": "scaler"}
+    elif kind == "MultiLabelBinarizer":
+        arrays["classes"] = _text(obj.classes_)
+        meta = {"kind": "binarizer"}
+    elif kind == "NearestNeighbors":
+        fit_X = np.asarray(obj._fit_X)
+        if fit_X.dtype == object:
+            raise CompactError("Only dense neighbor matrices are supported")
+        arrays["fit_X"] = fit_X.astype(np.float32 if float32 else float)
+        meta = {
+            "kind": "neighbors",
+            "metric": obj.effective_metric_,
+            "metric_params": obj.effective_metric_params_ or {},
+            "n_neighbors": obj.n_neighbors,
+        }
+    elif kind in REGRESSORS:
+        meta = REGRESSORS[kind](obj, arrays)
+    elif kind == "Pipeline":
+        meta = _export_pipeline(obj, arrays)
+    else:
+        raise CompactError(f"Unsupported model type {kind}")
+    return meta, arrays
+
+
+def _export_pipeline(obj, arrays):
+    if len(obj.steps) != 2 or type(obj.steps[0][1]).__name__ != "ColumnTransformer":
+        raise CompactError("Only ColumnTransformer + regressor pipelines are supported")
+    pre, final = obj.steps[0][1], obj.steps[1][1]
+    if type(final).__name__ not in REGRESSORS:
+        raise CompactError(f"Unsupported regressor {type(final).__name__}")
+
+    def passthrough(transformer):
+        # Newer scikit-learn fits remainder="passthrough" as an identity FunctionTransformer
+        if isinstance(transformer, str):
+            return transformer == "passthrough"
+        return type(transformer).__name__ == "FunctionTransformer" and transformer.func is None
+
+    names = _feature_names(obj)
+    steps = []
+    for name, transformer, columns in pre.transformers_:
+        columns = [names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        if not (isinstance(transformer, str) and transformer == "drop") and len(columns):
+            steps.append((transformer, columns))
+    # Output columns follow the step order: one-hot block, then passthrough
+    if len(steps) != 2 or type(steps[0][0]).__name__ != "OneHotEncoder" or not passthrough(steps[1][0]):
+        raise CompactError("Expected one-hot columns followed by passthrough columns")
+    (encoder, categorical), (_, passthrough) = steps
+    onehot = _export_onehot(encoder, arrays, prefix="pre_")
+    return {
+        "kind": "pipeline",
+        "feature_names": names,
+        "categorical": categorical,
+        "passthrough": passthrough,
+        "onehot": onehot,
+        "final": REGRESSORS[type(final).__name__](final, arrays, prefix="final_"),
+    }
+
+
+def _build(meta, arrays, prefix=""):
+    kind = meta["kind"]
+    if kind == "onehot":
+        categories = [arrays[f"{prefix}categories_{j}"] for j in range(meta["columns"])]
+        return OneHot(categories, meta["feature_names"])
+    if kind == "scaler":
+        return Scaler(arrays["mean"], arrays["scale"])
+    if kind == "binarizer":
+        return Binarizer(arrays["classes"])
+    if kind == "neighbors":
+        return Neighbors(arrays["fit_X"], meta["metric"], meta["metric_params"], meta["n_neighbors"])
+    if kind == "linear":
+        return Linear(arrays[f"{prefix}coef"], arrays[f"{prefix}intercept"])
+    if kind == "forest":
+        return Forest(*(arrays[f"{prefix}{k}"] for k in ("left", "right", "feature", "threshold", "value", "roots")))
+    if kind == "pipeline":
+        return Pipeline(
+            meta["feature_names"], meta["categorical"], meta["passthrough"],
+            _build(meta["onehot"], arrays, "pre_"), _build(meta["final"], arrays, "final_"),
+        )
+    raise CompactError(f"Unknown compact model kind {kind}")
+
+
+# -------------------------------
+# Store
+# -------------------------------
+def write_model(obj, directory, float32=False):
+    """Export `obj` into `directory` (created); returns its manifest entry."""
+    meta, arrays = export_model(obj, float32=float32)
+    os.makedirs(directory)
+    for key, values in arrays.items():
+        np.save(os.path.join(directory, f"{key}.npy"), values, allow_pickle=False)
+    return {"meta": meta, "arrays": sorted(arrays)}
+
+
+def read_model(directory, entry, mmap=True):
+    """The inference object for a model written by write_model."""
+    arrays = {}
+    for key in entry["arrays"]:
+        path = os.path.join(directory, f"{key}.npy")
+        try:
+            arrays[key] = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        except ValueError:
+            # Empty arrays can't be mapped
+            arrays[key] = np.load(path, allow_pickle=False)
+    return _build(entry["meta"], arrays)
+
+
+def source_matches(path, source):
+    st = os.stat(path)
+    if st.st_size != source["size"]:
+        return False
+    return st.st_mtime_ns == source["mtime_ns"] or sha256_file(path) == source["sha256"]
+
+
+def load_model(path, compact_dir, mmap_mode=None):
+    """
+    Load the model pickled at `path` (see core.versions.published_path):
+    from its compact export in `compact_dir` when there is one made from
+    the current file, otherwise with joblib as before.
+    """
+    source = published_path(path)
+    name = os.path.basename(path)
+    manifest = read_manifest(compact_dir)
+    entry = manifest and manifest.get("format") == COMPACT_FORMAT and manifest["models"].get(name)
+    if entry:
+        if source_matches(source, manifest["sources"][name]):
+            return read_model(os.path.join(compact_dir, manifest["path"], name), entry)
+        logger.warning("Compact export of %s is stale; loading the pickle", name)
+
+    # Imported here: the compact path never needs it
+    import joblib
+    return joblib.load(source, mmap_mode=mmap_mode)
+
+
+def export_models(paths, compact_dir, float32=False, keep=2):
+    """
+    Export the (published) model files `paths` as one version of
+    `compact_dir`; see core.versions.publish_version. The version hashes
+    the sources and options, so re-exporting unchanged models is a no-op.
+    Returns the manifest.
+    """
+    sources = {os.path.basename(p): source_info(published_path(p)) for p in paths}
+    key = {"format": COMPACT_FORMAT, "float32": float32, "sources": {n: s["sha256"] for n, s in sources.items()}}
+    version = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+
+    import joblib
+
+    def write(directory):
+        models = {}
+        for path in paths:
+            name = os.path.basename(path)
+            obj = joblib.load(published_path(path))
+            models[name] = write_model(obj, os.path.join(directory, name), float32=float32)
+        return {"models": models}
+
+    manifest = {
+        "format": COMPACT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "float32": float32,
+        "sources": sources,
+    }
+    return publish_version(compact_dir, version, write, manifest, keep=keep)
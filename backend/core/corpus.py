@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+
+from .artifacts import file_fingerprint
+from .columns import read_columns, write_columns
+
+logger = logging.getLogger(__name__)
+
+CORPUS_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# name -> Corpus, filled by each app's corpus.py (see build_corpus)
+CORPORA = {}
+
+
+def corpus_root():
+    return getattr(settings, "CORPUS_DIR", os.path.join(settings.BASE_DIR, "var", "corpus"))
+
+
+def corpus_manifest(name):
+    """Manifest path of corpus `name`; loaders register it with the artifact registry."""
+    return os.path.join(corpus_root(), name, MANIFEST_NAME)
+
+
+class Corpus:
+    """
+    One normalized table of listings plus their feature rows, built from a
+    static CSV and a database table.
+
+    The store is a directory of shards, each holding up to `chunk_size` rows
+    as columns (core.columns) and a CSR feature matrix, plus a manifest that
+    names the live shards. Building streams both sources chunk by chunk (the
+    CSV with pandas' chunksize, the table with QuerySet.iterator), so a
+    build only ever holds one chunk in memory.
+
+    `update()` is incremental: while the CSV and the encoder files are
+    unchanged, it only appends shards for rows with a higher id than the
+    last build saw and records deleted ids as tombstones; the database
+    shards are rewritten once tombstones pile up. Any change to the CSV or
+    the encoders rebuilds everything. Readers call `load()`, which returns
+    None while the store is missing or stale so callers can fall back to
+    their own sources.
+
+    The callables define the corpus:
+      read_csv(path, chunk_size) -> iterable of DataFrames in the corpus schema
+      queryset()                 -> QuerySet of the database rows to include
+      record(obj)                -> dict in the corpus schema for one row
+      prepare(frame)             -> the same rows type-normalized (optional)
+      encoder()                  -> encode(frame), returning CSR feature rows
+                                    for a corpus-schema frame
+    `version_files` are the files (CSV, encoders) a build depends on.
+    Every update() asks `encoder()` for a fresh encode, so a long-running
+    builder (`build_corpus --loop`) never encodes with encoders from before
+    a retrain.
+    """
+
+    def __init__(self, name, csv_path, version_files, read_csv, queryset, record, encoder, prepare=None):
+        self.name = name
+        self.csv_path = csv_path
+        self.version_files = list(version_files)
+        self.read_csv = read_csv
+        self.queryset = queryset
+        self.record = record
+        self.encoder = encoder
+        self.encode = None
+        self.prepare = prepare or (lambda frame: frame)
+        CORPORA[name] = self
+
+    @property
+    def directory(self):
+        return os.path.join(corpus_root(), self.name)
+
+    @property
+    def manifest_path(self):
+        return corpus_manifest(self.name)
+
+    def version(self):
+        return file_fingerprint(self.version_files)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def is_current(self, manifest, version=None):
+        return (
+            manifest is not None
+            and manifest.get("format") == CORPUS_FORMAT
+            and manifest.get("version") == (version or self.version())
+        )
+
+    # -------------------------------
+    # Build
+    # -------------------------------
+    def update(self, full=False, chunk_size=5000, compact_ratio=0.2):
+        """
+        Bring the store up to date with both sources. Returns a summary of
+        what was done. Safe to run on a schedule (cron, `build_corpus --loop`).
+        """
+        start = time.perf_counter()
+        # Stamped before the encoders are read: if they change during the
+        # build, the next update sees a new version and rebuilds
+        version = self.version()
+        self.encode = self.encoder()
+        manifest = self.read_manifest()
+        summary = {"corpus": self.name}
+        os.makedirs(self.directory, exist_ok=True)
+        if full or not self.is_current(manifest, version):
+            # Shard names keep counting up, so readers of the old manifest
+            # never see their files replaced underneath them
+            first_shard = manifest.get("next_shard", 0) if manifest else 0
+            manifest = self._new_manifest(chunk_size, version, first_shard)
+            summary["csv_rows"] = self._append_csv(manifest, chunk_size)
+            summary["rebuilt"] = True
+        else:
+            summary["rebuilt"] = False
+
+        summary["db_rows_added"] = self._append_db(manifest, chunk_size)
+        summary["db_rows_removed"] = self._tombstone_deleted(manifest)
+        live = manifest["db"]["rows"] - len(manifest["db"]["tombstones"])
+        if manifest["db"]["tombstones"] and len(manifest["db"]["tombstones"]) > compact_ratio * max(live, 1):
+            self._compact_db(manifest, chunk_size)
+            summary["compacted"] = True
+
+        manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+        manifest["rows"] = sum(shard["rows"] for shard in manifest["shards"]) - len(manifest["db"]["tombstones"])
+        self._write_manifest(manifest)
+        self._prune(manifest)
+        summary["rows"] = manifest["rows"]
+        summary["seconds"] = round(time.perf_counter() - start, 4)
+        return summary
+
+    def _new_manifest(self, chunk_size, version, first_shard=0):
+        return {
+            "format": CORPUS_FORMAT,
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "chunk_size": chunk_size,
+            "shards": [],
+            "next_shard": first_shard,
+            "db": {"max_id": 0, "rows": 0, "tombstones": []},
+        }
+
+    def _append_csv(self, manifest, chunk_size):
+        rows = 0
+        for chunk in self.read_csv(self.csv_path, chunk_size):
+            self._write_shard(manifest, "csv", chunk.reset_index(drop=True), np.full(len(chunk), -1))
+            rows += len(chunk)
+        return rows
+
+    def _db_chunks(self, queryset, chunk_size):
+        records, ids = [], []
+        for obj in queryset.order_by("id").iterator(chunk_size=chunk_size):
+            records.append(self.record(obj))
+            ids.append(obj.id)
+            if len(records) == chunk_size:
+                yield self.prepare(pd.DataFrame(records)), np.array(ids)
+                records, ids = [], []
+        if records:
+            yield self.prepare(pd.DataFrame(records)), np.array(ids)
+
+    def _append_db(self, manifest, chunk_size):
+        db = manifest["db"]
+        added = 0
+        for frame, ids in self._db_chunks(self.queryset().filter(id__gt=db["max_id"]), chunk_size):
+            self._write_shard(manifest, "db", frame, ids)
+            db["max_id"] = int(ids[-1])
+            db["rows"] += len(ids)
+            added += len(ids)
+        return added
+
+    def _tombstone_deleted(self, manifest):
+        db = manifest["db"]
+        live = db["rows"] - len(db["tombstones"])
+        count = self.queryset().count()
+        if count == live:
+            return 0  # ids only grow, so nothing we hold was deleted
+        present = set(self.queryset().values_list("id", flat=True).iterator(chunk_size=10000))
+        tombstones = set(db["tombstones"])
+        removed = 0
+        for shard in manifest["shards"]:
+            if shard["source"] != "db":
+                continue
+            ids = np.load(os.path.join(self.directory, shard["name"], "ids.npy"))
+            for listing_id in ids.tolist():
+                if listing_id not in present and listing_id not in tombstones:
+                    tombstones.add(listing_id)
+                    removed += 1
+        db["tombstones"] = sorted(tombstones)
+        return removed
+
+    def _compact_db(self, manifest, chunk_size):
+        # Rewrite the database part from scratch; the CSV shards are kept
+        manifest["shards"] = [shard for shard in manifest["shards"] if shard["source"] == "csv"]
+        manifest["db"] = {"max_id": 0, "rows": 0, "tombstones": []}
+        self._append_db(manifest, chunk_size)
+
+    def _write_shard(self, manifest, source, frame, ids):
+        name = f"{source}-{manifest['next_shard']:05d}"
+        manifest["next_shard"] += 1
+        directory = os.path.join(self.directory, name)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+        features = sp.csr_matrix(self.encode(frame), dtype=float)
+        for key in ("data", "indices", "indptr"):
+            np.save(os.path.join(directory, f"{key}.npy"), getattr(features, key), allow_pickle=False)
+        np.save(os.path.join(directory, "ids.npy"), np.asarray(ids, dtype=np.int64), allow_pickle=False)
+        manifest["shards"].append({
+            "name": name,
+            "source": source,
+            "rows": len(frame),
+            "features": features.shape[1],
+            "columns": write_columns(frame, directory),
+        })
+
+    def _write_manifest(self, manifest):
+        tmp = os.path.join(self.directory, f".{MANIFEST_NAME}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _prune(self, manifest):
+        live = {shard["name"] for shard in manifest["shards"]}
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if os.path.isdir(path) and entry not in live:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # -------------------------------
+    # Load
+    # -------------------------------
+    def load(self):
+        """
+        (frame, features CSR, ids) for every live row, in shard order, or
+        None when the store is missing or was built from other inputs.
+        `ids` are the database ids of table rows and -1 for CSV rows.
+        """
+        manifest = self.read_manifest()
+        if not self.is_current(manifest):
+            if manifest is not None:
+                logger.warning("Corpus %s is stale; run manage.py build_corpus", self.name)
+            return None
+
+        frames, matrices, ids = [], [], []
+        for shard in manifest["shards"]:
+            directory = os.path.join(self.directory, shard["name"])
+            frames.append(read_columns(directory, shard["columns"], shard["rows"], mmap=False).to_frame())
+            parts = [np.load(os.path.join(directory, f"{key}.npy")) for key in ("data", "indices", "indptr")]
+            matrices.append(sp.csr_matrix(tuple(parts), shape=(shard["rows"], shard["features"])))
+            ids.append(np.load(os.path.join(directory, "ids.npy")))
+        if not frames:
+            return None
+
+        frame = pd.concat(frames, ignore_index=True)
+        features = sp.vstack(matrices, format="csr")
+        ids = np.concatenate(ids)
+        tombstones = manifest["db"]["tombstones"]
+        if tombstones:
+            keep = ~np.isin(ids, tombstones)
+            frame, features, ids = frame[keep].reset_index(drop=True), features[keep], ids[keep]
+        return frame, features, ids
@@ -0,0 +1,42 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.corpus import CORPORA
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the listing CSVs and the ListingProperty table into the recommendation "
+        "corpora the search and recommend endpoints load. Incremental unless --full; "
+        "run it from cron, or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="corpora to build (default: all)")
+        parser.add_argument("--full", action="store_true", help="rebuild from scratch instead of appending")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="rows per read and per shard")
+        parser.add_argument("--loop", type=float, metavar="SECONDS",
+                            help="keep running, updating every SECONDS")
+
+    def handle(self, *args, **options):
+        # Each app defines its corpus in <app>/corpus.py
+        autodiscover_modules("corpus")
+        names = options["names"] or sorted(CORPORA)
+        unknown = [name for name in names if name not in CORPORA]
+        if unknown:
+            raise CommandError(f"Unknown corpus: {', '.join(unknown)} (have {', '.join(sorted(CORPORA))})")
+
+        full = options["full"]
+        while True:
+            for name in names:
+                summary = CORPORA[name].update(full=full, chunk_size=options["chunk_size"])
+                self.stdout.write(json.dumps(summary))
+            if options["loop"] is None:
+                break
+            full = False
+            connections.close_all()
+            time.sleep(options["loop"])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.service import get_config, serve
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the ML models once and answer the search, recommend and estimate endpoints' "
+        "batches for every web worker over a Unix socket (settings.INFERENCE_SERVICE, "
+        "MODE \"service\")."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=str(get_config()["SOCKET"]), help="Unix socket path")
+        parser.add_argument("--processes", type=int, default=1,
+                            help="inference processes, forked after loading so they share the models")
+
+    def handle(self, *args, **options):
+        serve(options["socket"], processes=options["processes"], log=self.stdout.write)
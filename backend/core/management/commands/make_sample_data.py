@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sample_data import city_table, write_dataset
+from listproperties.train import DATA_PATH as RENTS_FILE
+from listproperties.views import CSV_PATH as CITY_FILE
+from properties.search import DATA_FILE as SALES_FILE
+
+
+class Command(BaseCommand):
+    help = (
+        "Write synthetic residential_data.csv, rents.csv and city_data.csv where the apps read "
+        "them, for development without the real data. Then build the snapshot and train the "
+        "models (build_property_snapshot, train_property_models, train_recommender)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=3000, help="sale listings, and as many rent listings")
+        parser.add_argument("--cities", type=int, default=6)
+        parser.add_argument("--locations", type=int, default=8, help="localities per city")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--force", action="store_true", help="overwrite existing CSVs")
+
+    def handle(self, *args, **options):
+        paths = [SALES_FILE, RENTS_FILE, CITY_FILE]
+        existing = [p for p in paths if os.path.exists(p)]
+        if existing and not options["force"]:
+            raise CommandError(f"Not overwriting {', '.join(existing)} (use --force)")
+
+        cities = city_table(options["cities"], options["locations"], options["seed"])
+        write_dataset(*paths, options["rows"], cities, options["seed"])
+        for path in paths:
+            self.stdout.write(f"Wrote {path}")
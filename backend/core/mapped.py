@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# Array sets kept per name: the newest plus the one before it, which
+# workers that haven't seen the new files yet may still be opening
+KEEP = 2
+
+
+def mapped_dir():
+    """Root of the memory-mapped array store, or None when it is disabled."""
+    return getattr(settings, "ARTIFACT_MMAP_DIR", None)
+
+
+def mapped_arrays(name, fingerprint, build, layout):
+    """
+    Return the dict of arrays produced by `build()`, memory-mapped read-only
+    from `<ARTIFACT_MMAP_DIR>/<name>/<fingerprint>-v<layout>/`.
+
+    The first process to ask for a fingerprint runs `build()` and writes one
+    .npy file per array; every later process (other gunicorn workers, the
+    next restart) maps those files instead, so all of them share one copy of
+    the data in the page cache and start without rebuilding it. Directories
+    are published with an atomic rename, so a concurrent reader never sees
+    a half-written set. Once a new set is written, all but the KEEP most
+    recent are removed.
+
+    The fingerprint only covers the input files, and the store outlives
+    restarts and deploys: callers pass a `layout` version of what `build`
+    produces and bump it whenever its keys, dtypes or ordering change, so
+    new code never maps arrays written by old code. With
+    ARTIFACT_MMAP_DIR = None the arrays stay in process memory.
+    """
+    root = mapped_dir()
+    if not root:
+        return build()
+
+    base = os.path.join(root, name)
+    target = os.path.join(base, f"{fingerprint}-v{layout}")
+    try:
+        return _open(target)
+    except FileNotFoundError:
+        # Not built yet, or pruned by another process in the meantime
+        pass
+    _write(base, target, build())
+    _prune(base, current=target)
+    return _open(target)
+
+
+def _write(base, target, arrays):
+    os.makedirs(base, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=base, prefix=".tmp-")
+    try:
+        manifest = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            np.save(os.path.join(tmp, f"{key}.npy"), array, allow_pickle=False)
+            manifest[key] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        os.rename(tmp, target)
+        logger.info("Wrote memory-mapped arrays %s", target)
+    except OSError:
+        # Another process published the same fingerprint first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, MANIFEST)):
+            raise
+
+
+def _open(target):
+    with open(os.path.join(target, MANIFEST)) as f:
+        manifest = json.load(f)
+    arrays = {}
+    for key, meta in manifest.items():
+        # Empty files can't be mapped
+        mmap_mode = "r" if np.prod(meta["shape"]) else None
+        arrays[key] = np.load(os.path.join(target, f"{key}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+    return arrays
+
+
+def _prune(base, current):
+    entries = []
+    for entry in os.listdir(base):
+        path = os.path.join(base, entry)
+        if not entry.startswith(".") and path != current:
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                pass
+    # Newest first; `current` counts as one of the KEEP
+    for _, path in sorted(entries, reverse=True)[KEEP - 1:]:
+        # Processes still mapping these files keep them alive until they unmap
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,262 @@
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+
+
+def top_k(dist, k):
+    """Positions of the k smallest values in `dist`, nearest first."""
+    k = min(k, len(dist))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(dist):
+        top = np.argpartition(dist, k - 1)[:k]
+    else:
+        top = np.arange(len(dist))
+    return top[np.argsort(dist[top], kind="stable")]
+
+
+def _ranges(Q, ranges, n):
+    return ranges if ranges is not None else [(0, n)] * Q.shape[0]
+
+
+def _is_euclidean(metric, metric_params):
+    params = metric_params or {}
+    return metric == "euclidean" or (metric == "minkowski" and params.get("p", 2) == 2)
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+# Every index is built over a fixed matrix X and answers
+#   query(Q, k, ranges=None) -> [(distances, positions), ...]
+# one entry per query row, nearest first. ranges[j] = (lo, hi) restricts
+# query j to rows lo <= position < hi (the price-sorted budget windows of
+# properties.neighbors); None means all rows. X and Q may be dense arrays
+# or, for "exact" and "sparse", scipy CSR matrices.
+
+class ExactIndex:
+    """Exact search with sklearn's pairwise_distances; supports any metric."""
+
+    name = "exact"
+
+    def __init__(self, X, metric="euclidean", metric_params=None, **options):
+        self.X = X
+        self.metric = metric
+        self.metric_params = metric_params or {}
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def query(self, Q, k, ranges=None):
+        ranges = _ranges(Q, ranges, len(self))
+        lo = min(start for start, _ in ranges)
+        hi = max(stop for _, stop in ranges)
+        if lo >= hi:
+            return [(np.empty(0), np.empty(0, dtype=np.intp)) for _ in ranges]
+
+        # Imported here so importing the views doesn't pull in scikit-learn
+        from sklearn.metrics import pairwise_distances
+        dist = pairwise_distances(Q, self.X[lo:hi], metric=self.metric, **self.metric_params)
+        results = []
+        for d_row, (start, stop) in zip(dist, ranges):
+            d = d_row[start - lo:stop - lo]
+            top = top_k(d, k)
+            results.append((d[top], top + start))
+        return results
+
+
+class BlockedIndex:
+    """
+    Exact Euclidean search in NumPy, scanning rows in fixed-size blocks.
+
+    Uses ||q||^2 - 2 q.x + ||x||^2 with precomputed row norms, so each block
+    is one matrix product, and keeps a running top-k per query, so memory is
+    O(n_queries * block_size) however large the corpus gets.
+    """
+
+    name = "blocked"
+
+    def __init__(self, X, metric="euclidean", metric_params=None, block_size=65536, **options):
+        if not _is_euclidean(metric, metric_params):
+            raise ValueError(f"blocked neighbor backend only supports euclidean, not {metric}")
+        self.X = self._matrix(X)
+        self.sq_norms = self._sq_norms(self.X)
+        self.block_size = block_size
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    @staticmethod
+    def _matrix(X):
+        return np.ascontiguousarray(X, dtype=float)
+
+    @staticmethod
+    def _sq_norms(X):
+        return np.einsum("ij,ij->i", X, X)
+
+    def _dot(self, Q, start, stop):
+        return Q @ self.X[start:stop].T
+
+    def query(self, Q, k, ranges=None):
+        Q = self._matrix(Q)
+        ranges = _ranges(Q, ranges, len(self))
+        q_norms = self._sq_norms(Q)
+        best = [(np.empty(0), np.empty(0, dtype=np.intp)) for _ in ranges]
+        lo = min(start for start, _ in ranges)
+        hi = max(stop for _, stop in ranges)
+
+        for b_start in range(lo, hi, self.block_size):
+            b_stop = min(b_start + self.block_size, hi)
+            d2 = q_norms[:, None] - 2.0 * self._dot(Q, b_start, b_stop) + self.sq_norms[b_start:b_stop]
+            for j, (start, stop) in enumerate(ranges):
+                s, e = max(start, b_start), min(stop, b_stop)
+                if s >= e:
+                    continue
+                cand_d = np.concatenate([best[j][0], d2[j, s - b_start:e - b_start]])
+                cand_i = np.concatenate([best[j][1], np.arange(s, e)])
+                top = top_k(cand_d, k)
+                best[j] = (cand_d[top], cand_i[top])
+
+        return [(np.sqrt(np.maximum(d, 0.0)), i) for d, i in best]
+
+
+class SparseIndex(BlockedIndex):
+    """
+    BlockedIndex over a CSR matrix, for wide one-hot feature spaces.
+
+    Row norms and q.x products only touch stored non-zeros, so both memory
+    and distance cost scale with the number of set features per row rather
+    than with the number of distinct locations and amenities.
+    """
+
+    name = "sparse"
+
+    @staticmethod
+    def _matrix(X):
+        return sp.csr_matrix(X, dtype=float)
+
+    @staticmethod
+    def _sq_norms(X):
+        return np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+    def _dot(self, Q, start, stop):
+        return (Q @ self.X[start:stop].T).toarray()
+
+
+class IVFIndex:
+    """
+    Approximate Euclidean search with an inverted file.
+
+    Rows are clustered with a few rounds of k-means into `nlist` lists; a
+    query only scores the rows of its `nprobe` closest lists. Raising nprobe
+    trades latency for recall (nprobe == nlist is exact). When the probed
+    lists hold fewer than k rows inside the query's range, that query falls
+    back to an exact blocked scan of the range, so small windows stay exact.
+    """
+
+    name = "ivf"
+
+    def __init__(self, X, metric="euclidean", metric_params=None, nlist=None, nprobe=8,
+                 train_size=20000, n_iter=10, seed=0, **options):
+        self.exact = BlockedIndex(X, metric, metric_params)
+        self.X = self.exact.X
+        n = len(self.X)
+        self.nlist = max(1, min(n, nlist or int(np.sqrt(n))))
+        self.nprobe = min(nprobe, self.nlist)
+        self.centroids = self._kmeans(train_size, n_iter, seed) if n else np.empty((0, self.X.shape[1]))
+
+        assign = self._nearest_centroid(self.X) if n else np.empty(0, dtype=np.intp)
+        # Rows grouped by list; list c is list_rows[list_offsets[c]:list_offsets[c + 1]]
+        self.list_rows = np.argsort(assign, kind="stable")
+        self.list_offsets = np.searchsorted(assign[self.list_rows], np.arange(self.nlist + 1))
+
+    def __len__(self):
+        return len(self.X)
+
+    def _kmeans(self, train_size, n_iter, seed):
+        rng = np.random.default_rng(seed)
+        n = len(self.X)
+        sample = self.X[rng.choice(n, size=min(n, max(train_size, self.nlist)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=self.nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = self._nearest_centroid(sample, centroids)
+            for c in range(self.nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        return centroids
+
+    def _nearest_centroid(self, X, centroids=None, block=65536):
+        centroids = self.centroids if centroids is None else centroids
+        c_norms = np.einsum("ij,ij->i", centroids, centroids)
+        out = np.empty(len(X), dtype=np.intp)
+        for start in range(0, len(X), block):
+            chunk = X[start:start + block]
+            out[start:start + block] = np.argmin(c_norms - 2.0 * (chunk @ centroids.T), axis=1)
+        return out
+
+    def query(self, Q, k, ranges=None):
+        Q = np.asarray(Q, dtype=float)
+        ranges = _ranges(Q, ranges, len(self.X))
+        if not len(self.X):
+            return [(np.empty(0), np.empty(0, dtype=np.intp)) for _ in ranges]
+
+        c_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        probes = np.argsort(c_norms - 2.0 * (Q @ self.centroids.T), axis=1)[:, :self.nprobe]
+
+        results = []
+        for j, (start, stop) in enumerate(ranges):
+            cand = np.concatenate([
+                self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probes[j]
+            ])
+            cand = cand[(cand >= start) & (cand < stop)]
+            if len(cand) < min(k, stop - start):
+                results.append(self.exact.query(Q[j:j + 1], k, [(start, stop)])[0])
+                continue
+            diff = self.X[cand] - Q[j]
+            d = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            top = top_k(d, k)
+            results.append((d[top], cand[top]))
+        return results
+
+
+BACKENDS = {
+    "exact": ExactIndex,
+    "blocked": BlockedIndex,
+    "ivf": IVFIndex,
+    "sparse": SparseIndex,
+}
+
+# Backends that only take dense input; sparse matrices go to "sparse" instead
+DENSE_ONLY = {"blocked", "ivf"}
+
+
+def make_index(X, metric="euclidean", metric_params=None, backend=None, **options):
+    """
+    Build a neighbor index over X with the configured backend
+    (settings.NEIGHBOR_BACKEND / NEIGHBOR_BACKEND_OPTIONS unless given).
+    Backends that can't handle `metric` fall back to exact search, and
+    dense-only backends are swapped for "sparse" when X is a sparse matrix.
+    """
+    if backend is None:
+        backend = getattr(settings, "NEIGHBOR_BACKEND", "exact")
+        options = {**getattr(settings, "NEIGHBOR_BACKEND_OPTIONS", {}), **options}
+    if backend != "exact" and not _is_euclidean(metric, metric_params):
+        backend = "exact"
+    elif backend in DENSE_ONLY and sp.issparse(X):
+        backend = "sparse"
+    return BACKENDS[backend](X, metric=metric, metric_params=metric_params, **options)
+
+
+def index_from_model(nn_model, **kwargs):
+    """
+    make_index() over the training matrix of a fitted sklearn
+    NearestNeighbors; a model fitted on sparse input keeps its CSR matrix.
+    """
+    fit_X = nn_model._fit_X
+    return make_index(
+        fit_X if sp.issparse(fit_X) else np.asarray(fit_X),
+        metric=nn_model.effective_metric_,
+        metric_params=nn_model.effective_metric_params_,
+        **kwargs,
+    )
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+DEFAULTS = {
+    "WORKERS": 2,          # threads running model work, per process
+    "MAX_PENDING": 16,     # admitted requests (running + queued); more get 503
+    "QUEUE_TIMEOUT": 2.0,  # seconds an admitted request may wait for a thread
+    "RETRY_AFTER": 1,      # seconds, sent with 503
+}
+
+# name -> executor, for metrics
+EXECUTORS = {}
+
+
+class Overloaded(Exception):
+    """The executor is full or the request waited too long; answer 503."""
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for the CPU-bound part of async views.
+
+    `await executor.run(fn, *args)` runs fn on one of WORKERS threads, off
+    the event loop, so other requests on the same worker (login, saved
+    properties) keep being served while models run. Admission is decided up
+    front: once MAX_PENDING calls are running or queued, further calls raise
+    Overloaded immediately instead of piling up, and a queued call that
+    didn't start within QUEUE_TIMEOUT is dropped (its client has likely
+    given up). Configured by settings.INFERENCE_EXECUTOR (see DEFAULTS).
+    """
+
+    def __init__(self, name, config=None):
+        self.name = name
+        self._config = config
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        EXECUTORS[name] = self
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = {**DEFAULTS, **getattr(settings, "INFERENCE_EXECUTOR", {})}
+        return self._config
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.config["WORKERS"], thread_name_prefix=self.name)
+        return self._pool
+
+    def admit(self):
+        """Count one more pending request, or raise Overloaded; pair with release()."""
+        with self._lock:
+            if self.pending >= self.config["MAX_PENDING"]:
+                self.rejected += 1
+                raise Overloaded(f"{self.name} is at capacity")
+            self.pending += 1
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _call(self, fn, args, admitted_at):
+        started = time.monotonic()
+        with self._lock:
+            self.wait_seconds += started - admitted_at
+        if started - admitted_at > self.config["QUEUE_TIMEOUT"]:
+            with self._lock:
+                self.expired += 1
+            raise Overloaded(f"{self.name} queue wait exceeded {self.config['QUEUE_TIMEOUT']}s")
+        # Pool threads outlive requests, so apply the request cycle's connection cleanup here
+        close_old_connections()
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self.run_seconds += time.monotonic() - started
+                self.completed += 1
+
+    async def run(self, fn, *args):
+        """Result of fn(*args) computed on the pool; raises Overloaded when not admitted."""
+        self.admit()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, self._call, fn, args, time.monotonic())
+        finally:
+            self.release()
+
+    def stats(self):
+        config = self.config
+        return {
+            "workers": config["WORKERS"],
+            "max_pending": config["MAX_PENDING"],
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 3) if self.completed else None,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else None,
+        }
+
+
+def overloaded_response(exc, executor):
+    response = JsonResponse({"error": f"Server busy, retry shortly ({exc})"}, status=503)
+    response["Retry-After"] = str(executor.config["RETRY_AFTER"])
+    return response
+
+
+# Shared by the ML endpoints of every app
+inference = InferenceExecutor("inference")
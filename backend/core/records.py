@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def int_column(series, default=0):
+    """
+    `int(float(x))` for a whole column at once; cells where that would fail
+    (missing, non-numeric, infinite) become `default`.
+    """
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+    ok = np.isfinite(values)
+    out = np.where(ok, values, 0).astype(np.int64).astype(object)
+    out[~ok] = default
+    return out
+
+
+def float_column(values):
+    """Finite floats as Python floats, anything else as None."""
+    values = np.asarray(values, dtype=float)
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out
+
+
+def text_column(series):
+    """Strings as-is, with missing and empty values as None."""
+    out = series.to_numpy(dtype=object, na_value=None)
+    out[out == ""] = None
+    return out
+
+
+def frame_records(frame):
+    """
+    Convert a DataFrame into JSON-ready dicts column by column.
+
+    Each column is turned into Python objects once (NumPy scalars become
+    int/float, NaN/NA become None) and the records are zipped from those
+    columns, instead of iterrows() + to_dict() + per-cell checks.
+    """
+    names = list(frame.columns)
+    columns = [_python_column(frame[name]) for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def _python_column(series):
+    values = series.to_numpy(dtype=object, na_value=None)
+    if series.dtype.kind == "f":
+        # to_numpy(na_value=None) leaves NaN in plain float columns
+        values[pd.isna(series.to_numpy())] = None
+    return values
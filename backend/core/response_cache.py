@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+
+from .cache import CACHES, LRUCache
+
+DEFAULTS = {
+    "BACKEND": "local",   # "local", "django", or None to disable
+    "ALIAS": "default",   # Django cache alias for the "django" backend
+    "MAX_ENTRIES": 2048,  # per worker, "local" backend only
+    "TIMEOUT": 600,       # seconds
+}
+
+
+class LocalBackend:
+    """In-process LRU; entries are shared by reference, not copied."""
+
+    def __init__(self, name, config):
+        self.lru = LRUCache(f"{name}.entries", maxsize=config["MAX_ENTRIES"], ttl=config["TIMEOUT"])
+
+    def get(self, key):
+        return self.lru.get(key, None)
+
+    def set(self, key, value):
+        self.lru.set(key, value)
+
+
+class DjangoCacheBackend:
+    """Any configured Django cache (locmem, Redis, Memcached, ...), shared across workers."""
+
+    def __init__(self, name, config):
+        from django.core.cache import caches
+        self.cache = caches[config["ALIAS"]]
+        self.timeout = config["TIMEOUT"]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+
+BACKENDS = {
+    "local": LocalBackend,
+    "django": DjangoCacheBackend,
+}
+
+
+class ResponseCache:
+    """
+    Cache of endpoint payloads keyed on a canonicalized request.
+
+    Callers pass the canonical form of the request (whatever makes two
+    requests answer identically) and a version string for the data/models
+    behind the answer. Both go into the key, so publishing a new dataset or
+    model makes old entries unreachable without an explicit flush.
+    Configured by settings.RESPONSE_CACHE (see DEFAULTS).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._backend = None
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            config = {**DEFAULTS, **getattr(settings, "RESPONSE_CACHE", {})}
+            backend_cls = BACKENDS.get(config["BACKEND"])
+            self._backend = backend_cls(self.name, config) if backend_cls else False
+        return self._backend
+
+    def key(self, canonical, version):
+        try:
+            body = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        return f"{self.name}:{version}:{digest}"
+
+    def get_or_compute(self, canonical, version, compute):
+        """
+        Return the cached payload for `canonical` at `version`, or call
+        `compute()` and store its result. A `canonical` of None (request that
+        can't be canonicalized, e.g. invalid input) always computes.
+        Exceptions from `compute` propagate and nothing is stored.
+        """
+        backend = self.backend
+        key = self.key(canonical, version) if canonical is not None and backend else None
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+            return compute()
+
+        value = backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        backend.set(key, value)
+        return value
+
+    def get_or_compute_many(self, canonicals, version, compute_many):
+        """
+        Batched get_or_compute: one entry per canonical, in order. Everything
+        not found is answered by one `compute_many(positions)` call returning
+        a result per position; results that are exceptions are passed
+        through and not stored.
+        """
+        backend = self.backend
+        results = [None] * len(canonicals)
+        keys = {}
+        missing = []
+        hits = misses = bypassed = 0
+        for i, canonical in enumerate(canonicals):
+            key = self.key(canonical, version) if canonical is not None and backend else None
+            if key is None:
+                bypassed += 1
+                missing.append(i)
+                continue
+            value = backend.get(key)
+            if value is not None:
+                hits += 1
+                results[i] = value
+                continue
+            misses += 1
+            keys[i] = key
+            missing.append(i)
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.bypassed += bypassed
+
+        if missing:
+            for i, value in zip(missing, compute_many(missing)):
+                results[i] = value
+                if i in keys and not isinstance(value, Exception):
+                    backend.set(keys[i], value)
+        return results
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,29 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Drop-in for JsonResponse on large payloads.
+
+    Uses orjson when it is installed (several times faster on long lists of
+    records, and serializes NumPy scalars/arrays directly), otherwise the same
+    DjangoJSONEncoder that JsonResponse uses.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
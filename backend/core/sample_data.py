@@ -0,0 +1,100 @@
+"""
+Synthetic listings for development and benchmarks: residential_data.csv,
+rents.csv and city_data.csv with the columns (and the blemishes) of the
+real data, which is not part of the repo. Written by `manage.py
+make_sample_data`; also used by benchmarks/endpoints.py. Deterministic in
+the seed, city and locality counts, so every run sees the same listings.
+"""
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+AMENITIES = ["Gym", "Lift", "Parking", "Pool", "Security", "Garden", "Clubhouse", "Power Backup"]
+# Property type -> price multiplier and share of listings
+PROPERTY_TYPES = {"Apartment": (1.0, 0.6), "Independent House": (1.3, 0.25), "Villa": (1.8, 0.15)}
+
+
+def city_table(cities, locations, seed=0):
+    """{city: {"locations": [...], <city_data.csv metrics>}}, the same for every scale."""
+    rng = random.Random(seed)
+    table = {}
+    for i in range(cities):
+        name = f"City{i:02d}"
+        table[name] = {
+            "locations": [f"{name}-Locality{j:02d}" for j in range(locations)],
+            "Housing_Cost_per_sqft": rng.randrange(4000, 25000, 500),
+            "Job_Market_Score": round(rng.uniform(5, 9.5), 1),
+            "Cost_of_Living_Index": rng.randrange(40, 95),
+            "Amenities_Score": rng.randrange(5, 10),
+            "Lifestyle_Score": rng.randrange(5, 10),
+        }
+    return table
+
+
+def synthetic_listings(rows, cities, seed=0):
+    """
+    Listings shaped like residential_data.csv, with its blemishes: a few
+    padded lower-case city names, missing amenities and images, and
+    unparseable prices. Returns (frame, sale prices as numbers).
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(list(cities), dtype=object)
+    costs = np.array([c["Housing_Cost_per_sqft"] for c in cities.values()], dtype=float)
+    per_city = len(next(iter(cities.values()))["locations"])
+
+    city_idx = rng.integers(0, len(names), rows)
+    loc_idx = rng.integers(0, per_city, rows)
+    type_names = np.array(list(PROPERTY_TYPES), dtype=object)
+    multipliers = np.array([m for m, _ in PROPERTY_TYPES.values()])
+    type_idx = rng.choice(len(type_names), rows, p=[p for _, p in PROPERTY_TYPES.values()])
+    bedrooms = rng.integers(1, 6, rows)
+    area = (bedrooms * rng.normal(550, 120, rows)).clip(250).round().astype(np.int64)
+    per_sqft = costs[city_idx] * (0.7 + 0.6 * loc_idx / per_city) * multipliers[type_idx]
+    price = (area * per_sqft * rng.lognormal(0, 0.15, rows)).round()
+
+    city = names[city_idx]
+    messy = rng.random(rows) < 0.01
+    city[messy] = [f" {c.lower()} " for c in city[messy]]
+    location = np.array([f"{c}-Locality{j:02d}" for c, j in zip(names[city_idx], loc_idx)], dtype=object)
+
+    combos = np.array([",".join(a for k, a in enumerate(AMENITIES) if m >> k & 1) for m in range(2 ** len(AMENITIES))],
+                      dtype=object)
+    mask = rng.integers(1, 2 ** len(AMENITIES), rows)
+    mask[rng.random(rows) < 0.24] = 0
+    images = np.array([f"http://img/{i}.jpg" for i in range(rows)], dtype=object)
+    images[rng.random(rows) < 0.33] = ""
+
+    frame = pd.DataFrame({
+        "city": city,
+        "location": location,
+        "property_type": type_names[type_idx],
+        "bedrooms": bedrooms,
+        "area_sqft": area,
+        "price": price,
+        "amenities": combos[mask],
+        "image": images,
+        "seller_name": [f"S{i}" for i in range(rows)],
+    })
+    return frame, price
+
+
+def write_dataset(sales_file, rents_file, city_file, rows, cities, seed=0):
+    """Write a sale listings CSV (residential_data.csv), a rent one (rents.csv) and city_data.csv."""
+    for path in (sales_file, rents_file, city_file):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    sales, price = synthetic_listings(rows, cities, seed)
+    rents = sales.copy()
+    # Rents: about 0.3% of the sale price a month, a few left at 0 like rents.csv
+    rents["price"] = (price * 0.003).round()
+    rents.loc[rents.sample(frac=0.01, random_state=seed).index, "price"] = 0.0
+    # Sale prices as formatted rupees, a few unparseable
+    sales["price"] = [f"₹{int(p):,}" for p in price]
+    sales.loc[sales.sample(frac=0.01, random_state=seed).index, "price"] = "NA"
+
+    sales.to_csv(sales_file, index=False)
+    rents.to_csv(rents_file, index=False)
+    pd.DataFrame([
+        {"City": name, **{k: v for k, v in info.items() if k != "locations"}} for name, info in cities.items()
+    ]).to_csv(city_file, index=False)
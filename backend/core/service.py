@@ -0,0 +1,273 @@
+"""
+Optional out-of-process inference, configured by settings.INFERENCE_SERVICE.
+
+With MODE "service", every batch a core.batching.MicroBatcher would run in
+the web worker is sent instead to `manage.py inference_service` over a
+Unix socket: (batcher name, items) in, one result or exception per item
+plus the batch's timing spans out. The service loads the models once and runs the same handlers, so web
+workers never load them and can be small and numerous, while inference is
+scaled with the service's --processes. The socket speaks
+multiprocessing.connection (pickled messages, so whoever passes the
+handshake can run code in the service): AUTHKEY must be set explicitly
+for both sides, and the socket is only accessible to its owner.
+
+MODE "local" (the default) runs the handlers in the web worker as before.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections
+
+from . import timing
+from .offload import Overloaded
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MODE": "local",   # "local" or "service"
+    "SOCKET": os.path.join(settings.BASE_DIR, "var", "inference.sock"),
+    "AUTHKEY": None,   # shared secret, required
+    "TIMEOUT": 30.0,   # seconds to wait for a batch's results
+}
+
+# True inside `manage.py inference_service`: its handlers always run locally
+_serving = False
+
+
+class ServiceUnavailable(Overloaded):
+    """The inference service can't be reached or didn't answer in time; answer 503."""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "INFERENCE_SERVICE", {})}
+
+
+def enabled():
+    return not _serving and get_config()["MODE"] == "service"
+
+
+def _authkey(config):
+    # Not SECRET_KEY: a message that passes the handshake is unpickled
+    if not config["AUTHKEY"]:
+        raise ImproperlyConfigured("INFERENCE_SERVICE['AUTHKEY'] must be set to use the inference service")
+    key = config["AUTHKEY"]
+    return key.encode() if isinstance(key, str) else key
+
+
+# -------------------------------
+# Client (web workers)
+# -------------------------------
+class ServiceClient:
+    """One connection per calling thread (the inference pool's), reopened after errors."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def _connection(self, config, authkey):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(str(config["SOCKET"]), family="AF_UNIX", authkey=authkey)
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def request(self, message):
+        config = get_config()
+        authkey = _authkey(config)
+        start = time.perf_counter()
+        try:
+            conn = self._connection(config, authkey)
+            conn.send(message)
+            if not conn.poll(config["TIMEOUT"]):
+                raise TimeoutError(f"no answer within {config['TIMEOUT']}s")
+            reply = conn.recv()
+        except Exception as e:
+            # The connection is in an unknown state: never reuse it
+            self._close()
+            with self._lock:
+                self.errors += 1
+            raise ServiceUnavailable(f"inference service: {e}") from e
+        with self._lock:
+            self.calls += 1
+            self.seconds += time.perf_counter() - start
+        return reply
+
+    def call(self, name, items):
+        """The service's results for the batch `items` of batcher `name`; its spans go to core.timing."""
+        reply = self.request(("call", name, list(items)))
+        timing.merge(reply["spans"])
+        return reply["results"]
+
+    def status(self):
+        """The service's own stats, plus this worker's client counters."""
+        local = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_call_ms": round(self.seconds / self.calls * 1000, 3) if self.calls else None,
+        }
+        try:
+            return {**self.request(("stats",)), "client": local, "reachable": True}
+        except (ServiceUnavailable, ImproperlyConfigured) as e:
+            return {"client": local, "reachable": False, "error": str(e)}
+
+
+client = ServiceClient()
+
+
+# -------------------------------
+# Server (manage.py inference_service)
+# -------------------------------
+def _stats():
+    from .artifacts import registry
+    from .batching import BATCHERS
+    from .cache import CACHES
+    return {
+        "pid": os.getpid(),
+        "artifacts": registry.stats(),
+        "caches": {name: cache.stats() for name, cache in list(CACHES.items())},
+        "handlers": sorted(BATCHERS),
+    }
+
+
+def _answer(message):
+    from .batching import BATCHERS
+    if message[0] == "stats":
+        return _stats()
+    _, name, items = message
+    batcher = BATCHERS.get(name)
+    if batcher is None:
+        return {"results": [LookupError(f"No inference handler {name!r}")] * len(items), "spans": {}}
+    close_old_connections()
+    with timing.collect() as timings:
+        try:
+            results = batcher.handler(items)
+        except Exception as e:
+            results = [e] * len(items)
+        finally:
+            close_old_connections()
+    return {"results": results, "spans": timings.spans}
+
+
+def _serve_connection(conn):
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            reply = _answer(message)
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                # Something in the reply doesn't pickle: report it per item
+                logger.exception("Could not send inference results")
+                error = RuntimeError(f"Unsendable result: {e}")
+                if message[0] == "call":
+                    conn.send({"results": [error] * len(message[2]), "spans": reply["spans"]})
+                else:
+                    conn.send({"error": str(error)})
+
+
+def _accept_forever(listener):
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError:
+            logger.warning("Rejected an inference client with the wrong AUTHKEY")
+            continue
+        except OSError as e:
+            logger.warning("Inference service accept failed: %s", e)
+            continue
+        threading.Thread(target=_serve_connection, args=(conn,), daemon=True).start()
+
+
+def serve(socket_path=None, processes=1, log=print):
+    """
+    Load every model artifact, then answer batches on `socket_path` with
+    `processes` pre-forked processes (1: this one) sharing the listening
+    socket and the loaded pages. Dead children are replaced. Unix only.
+    """
+    global _serving
+    config = get_config()
+    authkey = _authkey(config)
+    _serving = True
+    socket_path = str(socket_path or config["SOCKET"])
+
+    # Importing the URLconf imports the views, which register the artifacts and batchers
+    from django.urls import get_resolver
+    from .artifacts import registry
+    get_resolver().url_patterns
+    start = time.perf_counter()
+    registry.preload()
+    log(f"Loaded {len(registry.stats())} artifacts in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    # Owner-only from the moment it is bound
+    umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(umask)
+    os.chmod(socket_path, 0o600)
+    # Children must not share the parent's database connections
+    connections.close_all()
+    log(f"Inference service on {socket_path} with {processes} process(es)")
+
+    if processes <= 1:
+        try:
+            _accept_forever(listener)
+        finally:
+            listener.close()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _accept_forever(listener)
+            finally:
+                os._exit(1)
+        return pid
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    children = set()
+    try:
+        children = {spawn() for _ in range(processes)}
+        while True:
+            pid, status = os.wait()
+            if pid in children:
+                children.discard(pid)
+                log(f"Inference process {pid} exited ({status}); starting another")
+                children.add(spawn())
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
@@ -0,0 +1,311 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.test import SimpleTestCase, override_settings
+
+from . import compact
+from .batching import BATCHERS, MicroBatcher
+from .compact import export_models, load_model
+from .neighbors import BlockedIndex, ExactIndex, IVFIndex, SparseIndex, make_index
+from .offload import EXECUTORS, InferenceExecutor, Overloaded, overloaded_response
+from .versions import MANIFEST_NAME, publish_version, published_path, read_manifest
+
+
+class NeighborBackendTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        # Clustered rows, like one-hot locations plus a few scaled numbers
+        centers = rng.normal(scale=4, size=(12, 8))
+        cls.X = centers[rng.integers(0, 12, 3000)] + rng.normal(size=(3000, 8))
+        cls.Q = centers[rng.integers(0, 12, 40)] + rng.normal(size=(40, 8))
+        cls.ranges = [(0, 3000), (100, 2900), (1000, 1003), (500, 500)] * 10
+        cls.exact = ExactIndex(cls.X).query(cls.Q, 10, cls.ranges)
+
+    def assert_same(self, results, expected=None):
+        for (dist, rows), (e_dist, e_rows) in zip(results, expected or self.exact):
+            np.testing.assert_array_equal(rows, e_rows)
+            np.testing.assert_allclose(dist, e_dist, atol=1e-6)
+
+    def test_exact_backends_agree(self):
+        self.assert_same(BlockedIndex(self.X, block_size=700).query(self.Q, 10, self.ranges))
+        self.assert_same(SparseIndex(sp.csr_matrix(self.X), block_size=700).query(sp.csr_matrix(self.Q), 10, self.ranges))
+
+    def test_ivf_recall(self):
+        approx = IVFIndex(self.X, nlist=30, nprobe=4).query(self.Q, 10, self.ranges)
+        found = sum(len(np.intersect1d(rows, e_rows)) for (_, rows), (_, e_rows) in zip(approx, self.exact))
+        self.assertGreaterEqual(found / sum(len(e_rows) for _, e_rows in self.exact), 0.9)
+        # Probing every list is exact
+        self.assert_same(IVFIndex(self.X, nlist=30, nprobe=30).query(self.Q, 10, self.ranges))
+
+    def test_ivf_falls_back_to_exact_for_small_windows(self):
+        index = IVFIndex(self.X, nlist=30, nprobe=1)
+        ranges = [(1000, 1008)] * len(self.Q)
+        with mock.patch.object(index.exact, "query", wraps=index.exact.query) as exact_query:
+            results = index.query(self.Q, 5, ranges)
+        # One probed list rarely holds 5 of 8 rows: those queries were answered exactly
+        self.assertGreater(exact_query.call_count, 0)
+        self.assert_same(results, ExactIndex(self.X).query(self.Q, 5, ranges))
+
+    def test_make_index_choice(self):
+        with override_settings(NEIGHBOR_BACKEND="ivf", NEIGHBOR_BACKEND_OPTIONS={"nlist": 7}):
+            index = make_index(self.X)
+            self.assertIsInstance(index, IVFIndex)
+            self.assertEqual(index.nlist, 7)
+            # Only euclidean is approximated; dense-only backends take CSR as "sparse"
+            self.assertIsInstance(make_index(self.X, metric="cosine"), ExactIndex)
+            self.assertIsInstance(make_index(sp.csr_matrix(self.X)), SparseIndex)
+        self.assertIsInstance(make_index(self.X, metric="minkowski", metric_params={"p": 2}, backend="blocked"),
+                              BlockedIndex)
+
+
+class PublishVersionTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.path = os.path.join(self.root, "model.pkl")
+
+    def publish(self, version, content, keep=2):
+        def write(directory):
+            with open(os.path.join(directory, "model.pkl"), "w") as f:
+                f.write(content)
+            return {"files": {"model.pkl": {"file": "model.pkl"}}}
+        return publish_version(self.root, version, write, {"trainer": "test"}, keep=keep)
+
+    def read(self):
+        with open(published_path(self.path)) as f:
+            return f.read()
+
+    def test_manifest_switches_versions(self):
+        manifest = self.publish("a" * 12, "first")
+        self.assertEqual(manifest["path"], "a" * 12)
+        self.assertEqual(read_manifest(self.root)["trainer"], "test")
+        self.assertEqual(self.read(), "first")
+
+        self.publish("b" * 12, "second")
+        self.assertEqual(self.read(), "second")
+        # Same inputs: the published directory is left as it is
+        self.publish("b" * 12, "ignored")
+        self.assertEqual(self.read(), "second")
+
+        # Pruning keeps the newest by mtime; don't depend on the clock's resolution
+        os.utime(os.path.join(self.root, "a" * 12), (1, 1))
+        self.publish("c" * 12, "third", keep=2)
+        self.assertEqual(self.read(), "third")
+        self.assertEqual(sorted(e for e in os.listdir(self.root) if not e.startswith(".")),
+                         ["b" * 12, "c" * 12, MANIFEST_NAME])
+
+    def test_failed_write_publishes_nothing(self):
+        self.publish("a" * 12, "first")
+
+        def write(directory):
+            raise RuntimeError("disk full")
+        with self.assertRaises(RuntimeError):
+            publish_version(self.root, "b" * 12, write, {})
+        self.assertEqual(self.read(), "first")
+        self.assertFalse(any(e.startswith(".tmp-") for e in os.listdir(self.root)))
+
+    def test_unpublished_model(self):
+        with self.assertRaisesRegex(FileNotFoundError, "model.pkl is not published in .*training command"):
+            published_path(self.path)
+        # A file put there by hand is used as it is
+        with open(self.path, "w") as f:
+            f.write("by hand")
+        self.assertEqual(published_path(self.path), self.path)
+
+
+class CompactModelTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from sklearn.compose import ColumnTransformer
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.linear_model import LinearRegression
+        from sklearn.neighbors import NearestNeighbors
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import MultiLabelBinarizer, OneHotEncoder, StandardScaler
+
+        rng = np.random.default_rng(1)
+        n = 300
+        frame = pd.DataFrame({
+            "city": rng.choice(["Pune", "Delhi", "Goa"], n),
+            "property_type": rng.choice(["Apartment", "Villa"], n),
+            "bedrooms": rng.integers(1, 5, n).astype(float),
+            "area_sqft": rng.normal(1000, 250, n).round(),
+            "Gym": rng.integers(0, 2, n),
+        })
+        y = frame["area_sqft"] * 4000 * frame["city"].map({"Pune": 1.0, "Delhi": 1.5, "Goa": 0.8}) + rng.normal(0, 1e5, n)
+        cats = ["city", "property_type"]
+        numbers = frame[["bedrooms", "area_sqft"]]
+        ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False).fit(frame[cats])
+        scaler = StandardScaler().fit(numbers)
+        X = np.hstack([ohe.transform(frame[cats]), scaler.transform(numbers)])
+
+        def pipeline(regressor):
+            return Pipeline([
+                ("pre", ColumnTransformer([("cat", OneHotEncoder(handle_unknown="ignore"), cats)],
+                                          remainder="passthrough")),
+                ("rf", regressor),
+            ]).fit(frame, y)
+
+        cls.models = {
+            "ohe.pkl": ohe,
+            "scaler.pkl": scaler,
+            "linear.pkl": LinearRegression().fit(X, y),
+            "mlb.pkl": MultiLabelBinarizer().fit([["Gym", "Pool"], ["Lift"]]),
+            "knn.pkl": NearestNeighbors(n_neighbors=4).fit(X),
+            "forest.pkl": RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y),
+            "pipeline_forest.pkl": pipeline(RandomForestRegressor(n_estimators=5, random_state=0)),
+            "pipeline_linear.pkl": pipeline(LinearRegression()),
+        }
+        # New rows, with a city and a type the encoders never saw
+        cls.frame = frame.sample(40, random_state=2).reset_index(drop=True)
+        cls.frame.loc[:4, "city"] = "Atlantis"
+        cls.frame.loc[5:7, "property_type"] = "Houseboat"
+        cls.X = np.hstack([ohe.transform(cls.frame[cats]), scaler.transform(cls.frame[["bedrooms", "area_sqft"]])])
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.tmp.cleanup)
+        cls.model_dir = os.path.join(cls.tmp.name, "ml")
+        cls.compact_dir = os.path.join(cls.model_dir, "compact")
+
+        def write(directory):
+            for name, obj in cls.models.items():
+                joblib.dump(obj, os.path.join(directory, name))
+            return {"files": {name: {"file": name} for name in cls.models}}
+        publish_version(cls.model_dir, "a" * 12, write, {})
+        cls.paths = {name: os.path.join(cls.model_dir, name) for name in cls.models}
+        export_models(list(cls.paths.values()), cls.compact_dir)
+
+    def load(self, name):
+        loaded = load_model(self.paths[name], self.compact_dir)
+        self.assertEqual(type(loaded).__module__, compact.__name__)
+        return loaded
+
+    def test_predictions_match_the_pickles(self):
+        cats = self.frame[["city", "property_type"]]
+        numbers = self.frame[["bedrooms", "area_sqft"]]
+        np.testing.assert_array_equal(self.load("ohe.pkl").transform(cats), self.models["ohe.pkl"].transform(cats))
+        np.testing.assert_allclose(self.load("scaler.pkl").transform(numbers),
+                                   self.models["scaler.pkl"].transform(numbers), rtol=1e-12)
+        labels = [["Gym"], ["Pool", "Sauna"], []]
+        with self.assertWarnsRegex(UserWarning, "Sauna"):
+            expected = self.models["mlb.pkl"].transform(labels)
+        np.testing.assert_array_equal(self.load("mlb.pkl").transform(labels), expected)
+        np.testing.assert_array_equal(self.load("knn.pkl")._fit_X, self.models["knn.pkl"]._fit_X)
+        for name in ("linear.pkl", "forest.pkl"):
+            np.testing.assert_allclose(self.load(name).predict(self.X), self.models[name].predict(self.X), rtol=1e-9)
+        for name in ("pipeline_forest.pkl", "pipeline_linear.pkl"):
+            np.testing.assert_allclose(self.load(name).predict(self.frame), self.models[name].predict(self.frame),
+                                       rtol=1e-9)
+
+    def test_stale_export_loads_the_pickle(self):
+        manifest = read_manifest(self.model_dir)
+        path = os.path.join(self.model_dir, manifest["path"], "linear.pkl")
+        original = os.stat(path)
+        # Cleanups run last first: put the pickle back, then its mtime
+        self.addCleanup(os.utime, path, ns=(original.st_atime_ns, original.st_mtime_ns))
+        self.addCleanup(joblib.dump, self.models["linear.pkl"], path)
+        # Retrained in place without re-exporting
+        joblib.dump(self.models["forest.pkl"], path)
+        with self.assertLogs("core.compact", "WARNING"):
+            loaded = load_model(self.paths["linear.pkl"], self.compact_dir)
+        self.assertEqual(type(loaded).__name__, "RandomForestRegressor")
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def batcher(self, handler, window_ms=50.0, max_batch=16, workers=1, max_pending=4):
+        name = f"tests.{self._testMethodName}"
+        executor = InferenceExecutor(name, config={
+            "WORKERS": workers, "MAX_PENDING": max_pending, "QUEUE_TIMEOUT": 5.0, "RETRY_AFTER": 1,
+        })
+        self.addCleanup(EXECUTORS.pop, name, None)
+        self.addCleanup(BATCHERS.pop, name, None)
+        return MicroBatcher(name, handler, executor, config={
+            "ENABLED": True, "WINDOW_MS": window_ms, "MAX_BATCH": max_batch,
+        })
+
+    async def test_exceptions_go_to_their_own_item(self):
+        def handler(items):
+            return [ValueError(f"bad {x}") if x < 0 else x * 2 for x in items]
+        batcher = self.batcher(handler)
+        results = await asyncio.gather(*(batcher.run(x) for x in (1, -1, 2)), return_exceptions=True)
+        self.assertEqual(results[0], 2)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 4)
+        # run_many returns them instead of raising
+        many = await batcher.run_many([3, -3])
+        self.assertEqual(many[0], 6)
+        self.assertIsInstance(many[1], ValueError)
+
+    async def test_a_failing_handler_fails_every_item(self):
+        def handler(items):
+            raise RuntimeError("model missing")
+        batcher = self.batcher(handler)
+        results = await asyncio.gather(batcher.run(1), batcher.run(2), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_idle_requests_skip_the_window(self):
+        batcher = self.batcher(lambda items: items, window_ms=1000)
+        start = time.monotonic()
+        self.assertEqual(await batcher.run("alone"), "alone")
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    async def test_batches_form_while_busy_and_stay_within_max_pending(self):
+        release = threading.Event()
+        sizes = []
+
+        def handler(items):
+            sizes.append(len(items))
+            release.wait(5)
+            return items
+
+        # MAX_BATCH above MAX_PENDING is clamped to it
+        batcher = self.batcher(handler, max_batch=16, max_pending=4)
+        self.assertEqual(batcher.stats()["max_batch"], 4)
+        first = asyncio.ensure_future(batcher.run(0))
+        while not sizes:
+            await asyncio.sleep(0.005)
+        # The first went alone; these three queue while it runs
+        queued = [asyncio.ensure_future(batcher.run(i)) for i in (1, 2, 3)]
+        await asyncio.sleep(0.01)
+        # A fifth is over MAX_PENDING: refused at once, and answered 503 by the views
+        with self.assertRaises(Overloaded) as refused:
+            await batcher.run(4)
+        response = overloaded_response(refused.exception, batcher.executor)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+        release.set()
+        self.assertEqual(await asyncio.gather(first, *queued), [0, 1, 2, 3])
+        self.assertEqual(sizes, [1, 3])
+        self.assertEqual(batcher.stats()["batch_sizes"], {"1": 1, "3": 1})
+
+    async def test_max_batch_splits_the_queue(self):
+        release = threading.Event()
+        sizes = []
+
+        def handler(items):
+            sizes.append(len(items))
+            release.wait(5)
+            return items
+
+        batcher = self.batcher(handler, window_ms=10, max_batch=2, max_pending=8)
+        first = asyncio.ensure_future(batcher.run(0))
+        while not sizes:
+            await asyncio.sleep(0.005)
+        queued = [asyncio.ensure_future(batcher.run(i)) for i in range(1, 6)]
+        await asyncio.sleep(0.05)
+        release.set()
+        self.assertEqual(await asyncio.gather(first, *queued), list(range(6)))
+        self.assertEqual(sizes, [1, 2, 2, 1])
@@ -0,0 +1,195 @@
+"""
+Per-request timing spans, configured by settings.REQUEST_TIMING.
+
+A view wrapped in `timed("search_properties")` collects a Timings for its
+request; code below it marks stages with `with span("kneighbors"): ...`
+(a no-op outside a timed request). When the view returns, the stage
+durations go into the response's Server-Timing header and into the
+per-endpoint, per-stage histograms shown on /api/metrics/.
+
+Stages that run off the request's context (batches on the inference
+pool, the inference service) are collected there with `collect()` and
+handed back to the request with `merge()`; see core.batching. A request
+answered in a batch reports the batch's stage times, since it waited for
+all of them, plus its own "queue" time.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULTS = {
+    "ENABLED": True,
+    "HEADER": True,  # send Server-Timing (stage names and durations are visible to clients)
+}
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# endpoint -> stage -> Histogram, for metrics
+HISTOGRAMS = {}
+_histograms_lock = threading.Lock()
+
+_current = ContextVar("timings", default=None)
+_config = None
+
+
+def get_config():
+    global _config
+    if _config is None:
+        _config = {**DEFAULTS, **getattr(settings, "REQUEST_TIMING", {})}
+    return _config
+
+
+class Histogram:
+    """Bucketed durations in ms with count, sum, max and bucket-resolution percentiles."""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.count += 1
+            self.sum += ms
+            if ms > self.max:
+                self.max = ms
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the open bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def stats(self):
+        with self._lock:
+            labels = [f"le_{b}ms" for b in self.bounds] + [f"gt_{self.bounds[-1]}ms"]
+            return {
+                "count": self.count,
+                "avg_ms": round(self.sum / self.count, 3) if self.count else None,
+                "p50_ms": self.percentile(0.5),
+                "p90_ms": self.percentile(0.9),
+                "p99_ms": self.percentile(0.99),
+                "max_ms": round(self.max, 3),
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class Timings:
+    """Seconds per stage for one request (or one batch); repeated stages add up."""
+
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def merge(self, spans):
+        for name, seconds in spans.items():
+            self.add(name, seconds)
+
+
+class span:
+    """`with span("stage"):` adds the block's duration to the active Timings, if any."""
+
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+@contextmanager
+def collect():
+    """Make a fresh Timings active for the block (e.g. a batch on a pool thread) and yield it."""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def merge(spans):
+    """Add stage durations measured elsewhere to the active Timings, if any."""
+    timings = _current.get()
+    if timings is not None and spans:
+        timings.merge(spans)
+
+
+def histogram(endpoint, stage):
+    stages = HISTOGRAMS.get(endpoint)
+    if stages is None or stage not in stages:
+        with _histograms_lock:
+            stages = HISTOGRAMS.setdefault(endpoint, {})
+            stages.setdefault(stage, Histogram())
+    return stages[stage]
+
+
+def _finish(endpoint, timings, total, response):
+    spans = {**timings.spans, "total": total}
+    for stage, seconds in spans.items():
+        histogram(endpoint, stage).observe(seconds * 1000)
+    if get_config()["HEADER"]:
+        response["Server-Timing"] = ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in spans.items())
+    return response
+
+
+def timed(endpoint):
+    """View decorator (sync or async): time the request's spans under `endpoint`."""
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if not get_config()["ENABLED"]:
+                    return await view(request, *args, **kwargs)
+                start = time.perf_counter()
+                with collect() as timings:
+                    response = await view(request, *args, **kwargs)
+                return _finish(endpoint, timings, time.perf_counter() - start, response)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if not get_config()["ENABLED"]:
+                    return view(request, *args, **kwargs)
+                start = time.perf_counter()
+                with collect() as timings:
+                    response = view(request, *args, **kwargs)
+                return _finish(endpoint, timings, time.perf_counter() - start, response)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return {
+        endpoint: {stage: hist.stats() for stage, hist in list(stages.items())}
+        for endpoint, stages in list(HISTOGRAMS.items())
+    }
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+MANIFEST_NAME = "manifest.json"
+# Versions are the first 12 hex digits of a sha256
+VERSION_PATTERN = re.compile(r"[0-9a-f]{12}")
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_info(path):
+    """Identity of an input file, for manifests (see snapshot.is_current)."""
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256_file(path)}
+
+
+def publish_version(root, version, write, manifest, keep=2):
+    """
+    Publish a build as `<root>/<version>/` and point `<root>/manifest.json`
+    at it.
+
+    `write(directory)` fills a temporary directory that is renamed into
+    place once complete, so readers never see a partial version; it returns
+    extra manifest fields. An existing `<version>` is left alone (same
+    inputs; workers may be mapping its files). The manifest is replaced
+    atomically and older versions beyond `keep` are deleted. Returns the
+    manifest.
+    """
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, version)
+    tmp = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    try:
+        extra = write(tmp) or {}
+        if os.path.exists(target):
+            shutil.rmtree(tmp)
+        else:
+            os.rename(tmp, target)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    manifest = {**manifest, "version": version, "path": version, **extra}
+    manifest_tmp = os.path.join(root, f".{MANIFEST_NAME}.tmp")
+    with open(manifest_tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, os.path.join(root, MANIFEST_NAME))
+
+    prune_versions(root, keep=keep, current=version)
+    return manifest
+
+
+def prune_versions(root, keep, current):
+    # Only version directories: `root` may hold other things (e.g. properties/ml/compact)
+    versions = [
+        entry for entry in os.listdir(root)
+        if entry != current and VERSION_PATTERN.fullmatch(entry) and os.path.isdir(os.path.join(root, entry))
+    ]
+    versions.sort(key=lambda v: os.path.getmtime(os.path.join(root, v)), reverse=True)
+    for entry in versions[max(keep - 1, 0):]:
+        shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def published_path(path):
+    """
+    Where to load `path` from: its copy in the version published in the
+    same directory when that manifest lists a file of this name, else
+    `path` itself (a file put there by hand). Raises FileNotFoundError
+    naming the directory when neither exists: nothing was trained yet.
+    """
+    directory, name = os.path.split(path)
+    manifest = read_manifest(directory)
+    if manifest is not None and name in manifest.get("files", {}):
+        return os.path.join(directory, manifest["path"], name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{name} is not published in {directory}; run its training command "
+            f"(see the README's data and models section)"
+        )
+    return path
@@ -0,0 +1,49 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import service, timing
+from .artifacts import registry
+from .batching import BATCHERS
+from .cache import CACHES
+from .offload import EXECUTORS
+from .warmup import status as warmup_status
+
+
+@require_GET
+def metrics(request):
+    """Cache hit rates, loaded model artifacts, inference pool load, batching and stage latencies for this worker process."""
+    return JsonResponse({
+        "caches": {name: cache.stats() for name, cache in list(CACHES.items())},
+        "artifacts": registry.stats(),
+        "executors": {name: executor.stats() for name, executor in EXECUTORS.items()},
+        "batchers": {name: batcher.stats() for name, batcher in BATCHERS.items()},
+        "timings": timing.stats(),
+        "service": service.client.status() if service.enabled() else None,
+    })
+
+
+@require_GET
+def readiness(request):
+    """
+    200 once every registered model artifact is loaded in this worker,
+    503 while any is still loading or failed to load. Load balancers can
+    hold traffic back until the startup warm-up has finished. With the
+    inference service enabled, its artifacts count instead (and 503 while
+    it can't be reached).
+    """
+    if service.enabled():
+        remote = service.client.status()
+        if not remote["reachable"]:
+            return JsonResponse({"ready": False, "service": remote["error"]}, status=503)
+        stats = remote["artifacts"]
+    else:
+        stats = registry.stats()
+    artifacts = {
+        name: {key: info[key] for key in ("loaded", "loading", "error", "load_seconds")}
+        for name, info in stats.items()
+    }
+    ready = all(info["loaded"] for info in artifacts.values())
+    return JsonResponse(
+        {"ready": ready, "warmup": warmup_status, "artifacts": artifacts},
+        status=200 if ready else 503,
+    )
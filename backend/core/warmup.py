@@ -0,0 +1,55 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.urls import get_resolver
+
+from . import service
+from .artifacts import registry
+
+logger = logging.getLogger(__name__)
+
+# Progress of the last warm-up in this process, for the readiness endpoint
+status = {"mode": None, "state": "idle", "seconds": None}
+
+
+def warm_up(mode=None):
+    """
+    Load every model artifact ahead of the first request.
+
+    Called by wsgi.py / asgi.py, so manage.py commands never pay for it.
+    `mode` (default settings.ML_WARMUP):
+      "background"  load in a daemon thread; the worker serves right away and
+                    ML endpoints load on first use if they get there first
+      "sync"        load before returning; use with gunicorn --preload so
+                    forked workers share the loaded pages
+      None / "off"  load lazily on first use only
+    """
+    mode = mode or getattr(settings, "ML_WARMUP", "background")
+    status["mode"] = mode
+    if mode in (None, "off"):
+        return None
+    if service.enabled():
+        # The models live in the inference service; nothing to load here
+        status["state"] = "skipped"
+        return None
+
+    # Importing the URLconf imports the views, which register the artifacts
+    get_resolver().url_patterns
+
+    if mode == "sync":
+        _run()
+        return None
+    thread = threading.Thread(target=_run, name="artifact-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run():
+    status["state"] = "running"
+    start = time.perf_counter()
+    registry.preload()
+    status["seconds"] = round(time.perf_counter() - start, 4)
+    status["state"] = "done"
+    logger.info("Artifact warm-up finished in %.3fs", status["seconds"])
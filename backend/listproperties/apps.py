@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ListpropertiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listproperties'
+
+    def ready(self):
+        # Keep the recommender's live index in step with ListingProperty
+        from . import signals  # noqa: F401
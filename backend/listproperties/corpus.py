@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+
+from core.corpus import Corpus
+from .live import listing_record, live_queryset
+from .recommendation import MODEL_DIR, MODEL_MANIFEST, NUM_COLS, RENT_CORPUS, encode_inputs, read_artifacts
+from .train import DATA_PATH, prepare_frame
+
+ENCODER_NAMES = ("ohe", "mlb", "scaler")
+
+
+def rent_record(listing):
+    """A ListingProperty as a corpus row; amenities_list is rebuilt on load."""
+    record = listing_record(listing)
+    del record["amenities_list"]
+    return record
+
+
+def read_rent_csv(path, chunk_size):
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        yield prepare_frame(chunk).drop(columns="amenities_list")
+
+
+def prepare_rent_frame(frame):
+    for col in NUM_COLS:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    return frame
+
+
+class RentEncoder:
+    """
+    encode_inputs over corpus rows, with the encoders train.py fitted in
+    `model_dir`. Loaded on first use; the corpus makes a new one per update.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.models = None
+
+    def __call__(self, frame):
+        if self.models is None:
+            self.models = read_artifacts(self.model_dir, names=ENCODER_NAMES)
+        # Missing values as None, which encode_inputs treats like train.py does
+        records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        return encode_inputs(self.models, records)
+
+
+rent_corpus = Corpus(
+    RENT_CORPUS,
+    csv_path=DATA_PATH,
+    version_files=[DATA_PATH, MODEL_MANIFEST, *(os.path.join(MODEL_DIR, f"{name}.pkl") for name in ENCODER_NAMES)],
+    read_csv=read_rent_csv,
+    queryset=lambda: live_queryset().select_related("user"),
+    record=rent_record,
+    prepare=prepare_rent_frame,
+    encoder=RentEncoder,
+)
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from core.artifacts import registry
+from core.cache import CACHES
+from core.neighbors import make_index
+from core.records import frame_records
+from core.timing import span
+from .models import ListingProperty
+from .recommendation import ARTIFACT_NAME, build_index, encode_inputs
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "POLL_INTERVAL": 2.0,       # seconds between checks for other workers' changes
+    "COMPACT_INTERVAL": 300.0,  # seconds between background re-fits
+    "MAX_DELTA": 1000,          # re-fit early once this many listings are pending
+}
+
+
+def live_queryset():
+    """The user listings the rent recommender serves: residential rentals."""
+    return ListingProperty.objects.filter(listing_type="Rent", category="Residential")
+
+
+def listing_record(listing):
+    """A ListingProperty as a row of the recommender's frame (see train.prepare_frame)."""
+    return {
+        "City": listing.city,
+        "Location": listing.location,
+        "Property Type": listing.property_type,
+        "Bedrooms": listing.bedrooms,
+        "Area (sqft)": listing.area,
+        "Price (INR)": float(listing.price),
+        "amenities": None,
+        "image": listing.image or None,
+        "seller_name": listing.user.username,
+        "amenities_list": [],
+    }
+
+
+def content_version(*parts):
+    body = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+
+
+class LiveState:
+    """
+    One immutable generation of the live index. Requests read it without
+    locking; every change builds a new one and swaps it in.
+
+    `models` is the base (train.py's pickles, the rent corpus or the last
+    background re-fit), `base_ids` maps listing ids to their rows in a base
+    that has listings, `delta` holds listings added since the base was built
+    as {id: (record, CSR row)}, and `removed` are listing ids deleted
+    (tombstoned) since then.
+
+    `version` identifies what the state answers from: `base_version` (the
+    identity of the base, see LiveListings) plus the tombstones and the
+    delta's records. It only depends on content, so workers holding the
+    same listings share response cache entries, and workers that differ
+    never do.
+    """
+
+    def __init__(self, models, base_ids=None, delta=None, removed=None, base_version=""):
+        self.models = models
+        self.base_ids = base_ids or {}
+        self.delta = delta or {}
+        self.removed = removed or frozenset()
+        self.base_version = base_version
+        self.version = content_version(base_version, sorted(self.removed), [
+            [i, self.delta[i][0]] for i in sorted(self.delta)
+        ])
+        self.removed_rows = np.array(
+            sorted(self.base_ids[i] for i in self.removed if i in self.base_ids), dtype=np.intp,
+        )
+        self.delta_frame = None
+        self.delta_index = None
+        if self.delta:
+            ids = list(self.delta)
+            self.delta_frame = pd.DataFrame([self.delta[i][0] for i in ids], columns=models["df"].columns)
+            metric, metric_params = models["metric"]
+            self.delta_index = make_index(
+                sp.vstack([self.delta[i][1] for i in ids], format="csr"),
+                metric=metric, metric_params=metric_params,
+            )
+
+    def recommend(self, user_input, top_n=10):
+        """get_recommendations over the base minus tombstones plus the delta."""
+        df = self.models["df"]
+        with span("encode"):
+            X_user = encode_inputs(self.models, [user_input])
+
+        # Over-fetch by the number of tombstoned base rows, then drop them
+        n_neighbors = min(top_n + len(self.removed_rows), len(df))
+        with span("kneighbors"):
+            distances, indices = self.models["index"].query(X_user, n_neighbors)[0]
+            if self.delta_index is not None:
+                d_dist, d_pos = self.delta_index.query(X_user, min(top_n, len(self.delta_frame)))[0]
+
+        with span("records"):
+            if len(self.removed_rows):
+                keep = ~np.isin(indices, self.removed_rows)
+                distances, indices = distances[keep][:top_n], indices[keep][:top_n]
+            results = df.iloc[indices].copy()
+
+            if self.delta_index is not None:
+                results = pd.concat([results, self.delta_frame.iloc[d_pos]])
+                distances = np.concatenate([distances, d_dist])
+                # Stable, so base rows keep their order and win ties
+                order = np.argsort(distances, kind="stable")[:top_n]
+                results, distances = results.iloc[order], distances[order]
+
+            results["similarity_score"] = 1 / (1 + distances)
+            return frame_records(results)
+
+
+class LiveListings:
+    """
+    Rent recommender index that follows the ListingProperty table.
+
+    New listings are encoded with the trained encoders and appended to a
+    small delta searched next to the base index; deleted ones become
+    tombstones filtered out of results. The worker that saves or deletes a
+    listing applies it immediately (see signals.py); other workers pick it
+    up on their next poll, at most POLL_INTERVAL seconds later. A
+    background thread periodically re-fits the encoders and KNN over the
+    trained rows plus every live listing (so new cities and locations get
+    their own features), then folds the delta and tombstones into the new
+    base. Configured by settings.LIVE_LISTINGS (see DEFAULTS).
+    """
+
+    def __init__(self):
+        self.state = None
+        self.fingerprint = None
+        self.generation = 0
+        self.max_id = 0
+        self.known_ids = set()
+        self.changes = {}  # listing id -> generation of its last change
+        self.synced_at = 0.0
+        self.compactions = 0
+        self.last_compaction_seconds = None
+        self._pristine = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._compactor = None
+        CACHES["listproperties.live"] = self
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, "LIVE_LISTINGS", {})}
+
+    def current(self):
+        """(LiveState, version string for response caches)."""
+        base, fingerprint = registry.get_versioned(ARTIFACT_NAME)
+        if not self.config["ENABLED"]:
+            return LiveState(base), fingerprint
+        if fingerprint != self.fingerprint:
+            with self._lock:
+                if fingerprint != self.fingerprint:
+                    self._reset(base, fingerprint)
+        elif time.monotonic() - self.synced_at >= self.config["POLL_INTERVAL"]:
+            self.sync()
+        return self.state, self.state.version
+
+    def _reset(self, base, fingerprint):
+        # New models from train.py: start over from them and the whole table
+        self.fingerprint = fingerprint
+        self._pristine = base
+        # A base built from the corpus already holds the listings up to its last build
+        listing_ids = base.get("listing_ids", ())
+        base_ids = {int(i): row for row, i in enumerate(listing_ids) if i >= 0}
+        self.state = LiveState(base, base_ids, base_version=fingerprint)
+        self.max_id = max(base_ids, default=0)
+        self.known_ids = set(base_ids)
+        self.changes = {}
+        self.sync()
+        self._start_compactor()
+
+    # -------------------------------
+    # Changes
+    # -------------------------------
+    def sync(self):
+        """Apply listings created or deleted (by any worker) since the last sync."""
+        with self._lock:
+            self.synced_at = time.monotonic()
+            try:
+                added = list(live_queryset().filter(id__gt=self.max_id).select_related("user")
+                             .order_by("id").iterator(chunk_size=500))
+                removed = ()
+                # Ids only grow, so a count below what we know means deletions
+                if live_queryset().count() != len(self.known_ids) + len(added):
+                    removed = self.known_ids - set(live_queryset().values_list("id", flat=True))
+            except DatabaseError as e:
+                # Keep serving what we have (e.g. before migrations have run)
+                logger.warning("Could not sync live listings: %s", e)
+                return
+            if added or removed:
+                self._apply(added, removed)
+
+    def listing_saved(self, listing):
+        if self.state is None:
+            return  # not loaded yet; the first sync will see it
+        with self._lock:
+            if live_queryset().filter(id=listing.id).exists():
+                self._apply([listing], ())
+            elif listing.id in self.known_ids:
+                self._apply((), {listing.id})
+
+    def listing_deleted(self, listing_id):
+        if self.state is None:
+            return
+        with self._lock:
+            if listing_id in self.known_ids:
+                self._apply((), {listing_id})
+
+    def _apply(self, listings, removed_ids):
+        state = self.state
+        delta = dict(state.delta)
+        removed = set(state.removed)
+        self.generation += 1
+
+        if listings:
+            records = [listing_record(listing) for listing in listings]
+            X = encode_inputs(state.models, records)
+            for j, listing in enumerate(listings):
+                delta[listing.id] = (records[j], X[j])
+                # An edited listing that is already in the base: hide the old copy
+                if listing.id in state.base_ids:
+                    removed.add(listing.id)
+                self.known_ids.add(listing.id)
+                self.changes[listing.id] = self.generation
+                self.max_id = max(self.max_id, listing.id)
+        for listing_id in removed_ids:
+            delta.pop(listing_id, None)
+            if listing_id in state.base_ids:
+                removed.add(listing_id)
+            self.known_ids.discard(listing_id)
+            self.changes[listing_id] = self.generation
+
+        self.state = LiveState(state.models, state.base_ids, delta, frozenset(removed), state.base_version)
+        if len(delta) >= self.config["MAX_DELTA"]:
+            self._wake.set()
+
+    # -------------------------------
+    # Compaction
+    # -------------------------------
+    def _start_compactor(self):
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self._compact_loop, name="live-listings-compactor", daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            self._wake.wait(self.config["COMPACT_INTERVAL"])
+            self._wake.clear()
+            try:
+                if self.state.delta or self.state.removed:
+                    self.compact()
+            except Exception:
+                logger.exception("Re-fitting the live listings index failed")
+            finally:
+                connections.close_all()
+
+    def compact(self):
+        """
+        Re-fit the encoders and KNN over the trained rows plus every live
+        listing, and make that the new base. Changes that land while the
+        re-fit runs stay in the delta/tombstones of the new generation.
+        """
+        # Imported here: scikit-learn is only needed once a re-fit runs
+        from .train import fit_models
+
+        start = time.perf_counter()
+        with self._lock:
+            fingerprint, pristine, since = self.fingerprint, self._pristine, self.generation
+
+        listings = list(live_queryset().select_related("user").order_by("id").iterator(chunk_size=500))
+        trained = pristine["df"]
+        if "listing_ids" in pristine:
+            # Corpus base: keep its rents.csv rows, the listings are re-read below
+            trained = trained[pristine["listing_ids"] < 0]
+        rows = [listing_record(listing) for listing in listings]
+        added = pd.DataFrame(rows, columns=trained.columns)
+        models = build_index(fit_models(pd.concat([trained, added], ignore_index=True)))
+        base_ids = {listing.id: len(trained) + j for j, listing in enumerate(listings)}
+        # Re-fitting is deterministic: the same listings give the same base in every worker
+        base_version = content_version(fingerprint, [[listing.id, row] for listing, row in zip(listings, rows)])
+
+        with self._lock:
+            if self.fingerprint != fingerprint:
+                return  # train.py published new models meanwhile; _reset took over
+            state = self.state
+            pending = {i for i, gen in self.changes.items() if gen > since}
+            delta_ids = [i for i in pending if i in state.delta]
+            records = [state.delta[i][0] for i in delta_ids]
+            X = encode_inputs(models, records) if records else None
+            delta = {i: (records[j], X[j]) for j, i in enumerate(delta_ids)}
+            removed = {i for i in pending if i in base_ids and (i not in self.known_ids or i in delta)}
+
+            self.changes = {i: gen for i, gen in self.changes.items() if gen > since}
+            self.generation += 1
+            self.state = LiveState(models, base_ids, delta, frozenset(removed), base_version)
+
+        self.compactions += 1
+        self.last_compaction_seconds = round(time.perf_counter() - start, 4)
+        logger.info("Re-fitted live listings index with %d listings in %.3fs",
+                    len(listings), self.last_compaction_seconds)
+
+    def stats(self):
+        state = self.state
+        return {
+            "enabled": self.config["ENABLED"],
+            "base_rows": len(state.models["df"]) if state else None,
+            "live_listings": len(self.known_ids),
+            "delta": len(state.delta) if state else 0,
+            "tombstones": len(state.removed) if state else 0,
+            "generation": self.generation,
+            "compactions": self.compactions,
+            "last_compaction_seconds": self.last_compaction_seconds,
+        }
+
+
+# One per process, shared by the view and the model signals
+live_listings = LiveListings()
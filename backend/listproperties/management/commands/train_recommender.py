@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from listproperties.train import DATA_PATH, MODEL_DIR, train
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit the rent recommender's encoders and KNN from rents.csv and publish them as a "
+        "versioned, compressed artifact set that the API switches to on its next check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=DATA_PATH, help="CSV to train on")
+        parser.add_argument("--output", default=MODEL_DIR, help="model directory")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="CSV rows read and encoded at a time")
+        parser.add_argument("--jobs", type=int, default=1, help="worker processes encoding chunks")
+        parser.add_argument("--keep", type=int, default=2, help="versions to keep, including the new one")
+
+    def handle(self, *args, **options):
+        manifest = train(
+            options["source"], options["output"],
+            chunk_size=options["chunk_size"], jobs=options["jobs"], keep=options["keep"],
+        )
+        self.stdout.write(
+            f"Models {manifest['version']}: {manifest['rows']} rows, {manifest['features']} features"
+        )
+        for stage, seconds in manifest["timings"].items():
+            self.stdout.write(f"  {stage}: {seconds:.3f}s")
+        for name, info in manifest["files"].items():
+            self.stdout.write(f"  {info['file']}: {info['bytes'] / 1024:.1f} KiB")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
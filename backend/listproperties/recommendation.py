@@ -3,50 +3,180 @@
 
 import os
 import pickle
+import joblib
 import numpy as np
+import scipy.sparse as sp
+
+from core.artifacts import file_fingerprint, registry
+from core.corpus import corpus_manifest
+from core.versions import MANIFEST_NAME, read_manifest
+from core.mapped import mapped_arrays
+from core.neighbors import make_index
+from core.records import frame_records
+from core.timing import span
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, "models")
+ARTIFACT_NAME = "listproperties.recommender"
+# Version of build_index's memory-mapped arrays; bump when their keys,
+# dtypes or ordering change so arrays written by older code are rebuilt
+ARRAYS_LAYOUT = 1
+ARTIFACT_FILES = ["ohe.pkl", "mlb.pkl", "scaler.pkl", "knn.pkl", "df.pkl"]
+# Written by `manage.py train_recommender`; takes precedence over the .pkl files
+MODEL_MANIFEST = os.path.join(MODEL_DIR, MANIFEST_NAME)
+# rents.csv rows plus residential rent listings, built by `manage.py build_corpus`
+RENT_CORPUS = "listproperties.rent"
+RENT_CORPUS_MANIFEST = corpus_manifest(RENT_CORPUS)
+
+
+def read_artifacts(model_dir=MODEL_DIR, names=("ohe", "mlb", "scaler", "knn", "df")):
+    """
+    {name: object} for the trained artifacts: the version named by
+    `<model_dir>/manifest.json` when train_recommender has published one,
+    else the plain pickles of older training runs.
+    """
+    manifest = read_manifest(model_dir)
+    models = {}
+    for name in names:
+        if manifest is not None:
+            models[name] = joblib.load(os.path.join(model_dir, manifest["path"], manifest["files"][name]["file"]))
+        else:
+            path = os.path.join(model_dir, f"{name}.pkl")
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"No recommender models in {model_dir}; run manage.py train_recommender "
+                    f"(see the README's data and models section)"
+                )
+            with open(path, 'rb') as f:
+                models[name] = pickle.load(f)
+    return models
+
+
+def load_models(*paths):
+    """
+    Load the trained artifacts (see read_artifacts) from the directory of
+    the first path; all paths count towards the fingerprint. When the rent
+    corpus is built for these encoders, its rows replace df and the KNN's
+    training matrix, and models["listing_ids"] holds their ListingProperty
+    ids (-1 for rents.csv rows).
+    """
+    # Imported here: corpus.py imports this module
+    from .corpus import rent_corpus
+    from .train import prepare_frame
+
+    models = read_artifacts(os.path.dirname(paths[0]))
+
+    matrix = None
+    corpus = rent_corpus.load()
+    if corpus is not None:
+        frame, matrix, models["listing_ids"] = corpus
+        models["df"] = prepare_frame(frame)
+    return build_index(models, file_fingerprint(paths), matrix=matrix)
+
+
+def build_index(models, fingerprint=None, matrix=None):
+    """
+    Replace models["knn"] with models["index"]: neighbor search over the KNN
+    training matrix (or `matrix`, rows of models["df"] encoded the same
+    way) with the configured backend. The matrix is one-hot
+    locations/amenities plus a few numbers, so it is kept as CSR (models
+    trained before the sparse pipeline are converted). With a `fingerprint`
+    of the files the models came from, its buffers are memory-mapped so
+    workers share one copy.
+    """
+    knn = models.pop("knn")
+
+    def build_arrays():
+        X = sp.csr_matrix(knn._fit_X if matrix is None else matrix, dtype=float)
+        return {"data": X.data, "indices": X.indices, "indptr": X.indptr, "shape": np.array(X.shape)}
+
+    if fingerprint:
+        arrays = mapped_arrays(ARTIFACT_NAME, fingerprint, build_arrays, layout=ARRAYS_LAYOUT)
+    else:
+        arrays = build_arrays()
+    X = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(arrays["shape"]))
+    models["metric"] = (knn.effective_metric_, knn.effective_metric_params_)
+    models["index"] = make_index(X, metric=models["metric"][0], metric_params=models["metric"][1])
+    return models
+
+
+# The five files are fitted together, so they are cached and reloaded as one
+# unit; the manifests are watched so a training run or corpus build swaps in
+registry.register(
+    ARTIFACT_NAME,
+    [os.path.join(MODEL_DIR, f) for f in ARTIFACT_FILES] + [MODEL_MANIFEST, RENT_CORPUS_MANIFEST],
+    load_models,
+)
 
-def get_recommendations(user_input, top_n=10):
-    # Load pre-fitted models and encoders
-    with open(os.path.join(MODEL_DIR, 'ohe.pkl'), 'rb') as f:
-        ohe = pickle.load(f)
-    with open(os.path.join(MODEL_DIR, 'mlb.pkl'), 'rb') as f:
-        mlb = pickle.load(f)
-    with open(os.path.join(MODEL_DIR, 'scaler.pkl'), 'rb') as f:
-        scaler = pickle.load(f)
-    with open(os.path.join(MODEL_DIR, 'knn.pkl'), 'rb') as f:
-        knn = pickle.load(f)
-    with open(os.path.join(MODEL_DIR, 'df.pkl'), 'rb') as f:
-        df = pickle.load(f)
-
-    # Define columns (matching train.py)
-    cat_cols = ["City", "Location", "Property Type"]
-    num_cols = ["Bedrooms", "Area (sqft)", "Price (INR)"]
-
-    # Prepare user input
-    cat_input = [[user_input.get(c, "") for c in cat_cols]]
-    cat_vec = ohe.transform(cat_input).toarray()
 
+# Define columns (matching train.py)
+CAT_COLS = ["City", "Location", "Property Type"]
+NUM_COLS = ["Bedrooms", "Area (sqft)", "Price (INR)"]
+
+
+def _amenities_list(user_input):
     amenities_input = user_input.get("amenities", [])
     if isinstance(amenities_input, str):
         amenities_input = [a.strip() for a in amenities_input.split(",") if a.strip()]
     elif not isinstance(amenities_input, list):
         amenities_input = []
-    amenities_vec = mlb.transform([amenities_input])
+    return amenities_input
 
-    num_input = np.array([[user_input.get(c, 0) for c in num_cols]], dtype=float)
-    num_vec = scaler.transform(num_input)
 
-    X_user = np.hstack([cat_vec, amenities_vec, num_vec])
+def canonical_input(user_input, top_n=10):
+    """
+    Cache identity of a recommendation request: categories verbatim (the
+    encoder is case-sensitive), numbers as floats, amenities as a sorted set.
+    Returns None when the input can't be normalized.
+    """
+    try:
+        return {
+            "categories": [user_input.get(c, "") for c in CAT_COLS],
+            "numbers": [float(user_input.get(c, 0)) for c in NUM_COLS],
+            "amenities": sorted(set(_amenities_list(user_input))),
+            "top_n": top_n,
+        }
+    except Exception:
+        return None
 
-    n_neighbors = min(top_n, len(df))
-    distances, indices = knn.kneighbors(X_user, n_neighbors=n_neighbors)
 
-    results = df.iloc[indices[0]].copy()
-    results["similarity_score"] = 1 / (1 + distances[0])
-    results = results.replace({np.nan: None})
+def encode_inputs(models, inputs):
+    """CSR feature rows (matching the index) for a list of input dicts."""
+    ohe = models["ohe"]
+    mlb = models["mlb"]
+    scaler = models["scaler"]
+
+    cat_input = [[item.get(c, "") for c in CAT_COLS] for item in inputs]
+    cat_vec = ohe.transform(cat_input)
+
+    amenities_vec = sp.csr_matrix(mlb.transform([_amenities_list(item) for item in inputs]))
+
+    # Missing numbers (e.g. a listing without bedrooms) count as 0, as in train.py
+    num_input = np.array([
+        [0 if item.get(c) is None else item[c] for c in NUM_COLS] for item in inputs
+    ], dtype=float)
+    num_vec = sp.csr_matrix(scaler.transform(num_input))
+
+    return sp.hstack([cat_vec, amenities_vec, num_vec], format="csr", dtype=float)
+
+
+def get_recommendations(user_input, top_n=10, models=None):
+    # Pre-fitted models and encoders, loaded once per process
+    if models is None:
+        models = registry.get(ARTIFACT_NAME)
+    index = models["index"]
+    df = models["df"]
+
+    # Prepare user input as a CSR row, matching the index
+    with span("encode"):
+        X_user = encode_inputs(models, [user_input])
+
+    n_neighbors = min(top_n, len(df))
+    with span("kneighbors"):
+        distances, indices = index.query(X_user, n_neighbors)[0]
 
-    return results.to_dict(orient="records")
\ No newline at end of file
+    with span("records"):
+        results = df.iloc[indices].copy()
+        results["similarity_score"] = 1 / (1 + distances)
+        return frame_records(results)
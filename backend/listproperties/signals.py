@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .live import live_listings
+from .models import ListingProperty
+
+
+# Make saved/deleted listings visible to this worker's recommender right away;
+# other workers pick them up on their next poll
+@receiver(post_save, sender=ListingProperty)
+def listing_saved(sender, instance, **kwargs):
+    live_listings.listing_saved(instance)
+
+
+@receiver(post_delete, sender=ListingProperty)
+def listing_deleted(sender, instance, **kwargs):
+    live_listings.listing_deleted(instance.id)
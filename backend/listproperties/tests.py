@@ -1,3 +1,175 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.corpus import CORPORA, Corpus
+from core.sample_data import city_table, synthetic_listings, write_dataset
+from core.versions import MANIFEST_NAME
+from userauth.models import Customer
+from .corpus import RentEncoder, prepare_rent_frame, read_rent_csv, rent_record
+from .live import LiveListings, live_queryset
+from .models import ListingProperty
+from .recommendation import build_index, canonical_input, encode_inputs, read_artifacts
+from .train import fit_models, prepare_frame, train
+
+
+class CanonicalInputTests(SimpleTestCase):
+    request = {
+        "City": "Mumbai", "Location": "Andheri", "Property Type": "Apartment",
+        "Bedrooms": 2, "Area (sqft)": "850", "Price (INR)": 40000, "amenities": "Gym,Lift",
+    }
+
+    def test_equivalent_requests_share_a_key(self):
+        same = {**self.request, "Bedrooms": "2.0", "Area (sqft)": 850, "amenities": ["Lift", "Gym", "Gym"]}
+        self.assertEqual(canonical_input(same), canonical_input(self.request))
+        self.assertNotEqual(canonical_input({**self.request, "City": "mumbai"}), canonical_input(self.request))
+        self.assertNotEqual(canonical_input(self.request, top_n=5), canonical_input(self.request))
+        self.assertIsNone(canonical_input({**self.request, "Bedrooms": "two"}))
+
+
+@override_settings(LIVE_LISTINGS={"ENABLED": True, "POLL_INTERVAL": 0.0, "MAX_DELTA": 1000})
+class LiveListingsTests(TestCase):
+    query = {
+        "City": "City00", "Location": "City00-Locality00", "Property Type": "Villa",
+        "Bedrooms": 4, "Area (sqft)": 2345, "Price (INR)": 98765, "amenities": [],
+    }
+
+    def setUp(self):
+        frame, price = synthetic_listings(300, city_table(2, 3), seed=2)
+        frame["price"] = (price * 0.003).round()
+        self.trained_rows = len(frame)
+        self.live = LiveListings()
+        # Not under test, and the re-fit thread would outlive the test database
+        patcher = mock.patch.object(LiveListings, "_start_compactor")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        base = build_index(fit_models(prepare_frame(frame)))
+        patcher = mock.patch("listproperties.live.registry.get_versioned", return_value=(base, "base"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.live.current()
+
+        # The app's own instance follows the signals too; route them here
+        for name in ("listing_saved", "listing_deleted"):
+            patcher = mock.patch(f"listproperties.signals.live_listings.{name}", getattr(self.live, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = Customer.objects.create(username="owner", email="owner@example.com", password="x")
+
+    def create_listing(self):
+        return ListingProperty.objects.create(
+            user=self.user, listing_type="Rent", category="Residential", city="City00",
+            location="City00-Locality00", property_type="Villa", bedrooms=4, area=2345,
+            price=98765, phone_number="0",
+        )
+
+    def top(self):
+        state, _ = self.live.current()
+        return state.recommend(self.query, top_n=5)
+
+    def test_created_listing_is_recommended_then_removed(self):
+        _, before = self.live.current()
+        listing = self.create_listing()
+        state, after = self.live.current()
+        self.assertIn(listing.id, state.delta)
+        self.assertNotEqual(after, before)
+        self.assertEqual(self.top()[0]["seller_name"], "owner")
+
+        listing.delete()
+        state, _ = self.live.current()
+        self.assertEqual(state.delta, {})
+        self.assertNotIn("owner", [r["seller_name"] for r in self.top()])
+
+    def test_deleted_base_listing_is_tombstoned(self):
+        listing = self.create_listing()
+        self.live.compact()
+        state, _ = self.live.current()
+        self.assertEqual(state.delta, {})
+        self.assertEqual(state.base_ids, {listing.id: self.trained_rows})
+        self.assertEqual(self.top()[0]["seller_name"], "owner")
+
+        listing_id = listing.id
+        listing.delete()
+        state, _ = self.live.current()
+        self.assertEqual(state.removed, {listing_id})
+        results = self.top()
+        self.assertEqual(len(results), 5)
+        self.assertNotIn("owner", [r["seller_name"] for r in results])
+
+    def test_other_workers_pick_up_changes_on_sync(self):
+        # A listing saved by another worker: no signal reaches this instance
+        with mock.patch("listproperties.signals.live_listings.listing_saved"):
+            listing = self.create_listing()
+        self.assertNotIn(listing.id, self.live.state.delta)
+        state, _ = self.live.current()
+        self.assertIn(listing.id, state.delta)
+
+    def test_cache_version_follows_content_across_workers(self):
+        # Another worker: same base, sees changes only by polling
+        other = LiveListings()
+        other.current()
+        first = self.create_listing()
+        first.delete()
+        second = self.create_listing()
+        state, version = self.live.current()
+        other_state, other_version = other.current()
+        self.assertEqual(list(other_state.delta), [second.id])
+        self.assertEqual(version, other_version)
+
+        # A deletion this worker applied and the other hasn't polled for yet
+        second.delete()
+        _, version = self.live.current()
+        self.assertNotEqual(version, other.state.version)
+        self.assertEqual(other.current()[1], version)
+
+        # Re-fitting the same listings gives the same base everywhere
+        third = self.create_listing()
+        self.live.compact()
+        _, compacted = self.live.current()
+        self.assertNotEqual(compacted, other.current()[1])
+        other.compact()
+        self.assertEqual(other.current()[1], compacted)
+        self.assertEqual(other.state.base_ids, {third.id: self.trained_rows})
+
+
+class RentCorpusRetrainTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.rents = os.path.join(self.dir, "rents.csv")
+        self.model_dir = os.path.join(self.dir, "models")
+        settings = override_settings(CORPUS_DIR=os.path.join(self.dir, "corpus"))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(CORPORA.pop, "tests.rents", None)
+        self.corpus = Corpus(
+            "tests.rents",
+            csv_path=self.rents,
+            version_files=[self.rents, os.path.join(self.model_dir, MANIFEST_NAME)],
+            read_csv=read_rent_csv,
+            queryset=lambda: live_queryset().select_related("user"),
+            record=rent_record,
+            prepare=prepare_rent_frame,
+            encoder=lambda: RentEncoder(self.model_dir),
+        )
+
+    def build(self, cities, locations):
+        write_dataset(os.path.join(self.dir, "sales.csv"), self.rents, os.path.join(self.dir, "cities.csv"),
+                      200, city_table(cities, locations))
+        train(self.rents, self.model_dir)
+        return self.corpus.update(chunk_size=100)
+
+    def test_retrain_in_the_same_process_reencodes(self):
+        self.assertTrue(self.build(2, 3)["rebuilt"])
+        # More localities means more one-hot columns
+        self.assertTrue(self.build(3, 6)["rebuilt"])
+
+        frame, features, _ = self.corpus.load()
+        models = read_artifacts(self.model_dir)
+        records = frame.head(5).astype(object).where(frame.head(5).notna(), None).to_dict("records")
+        expected = encode_inputs(models, records)
+        self.assertEqual(features.shape[1], expected.shape[1])
+        self.assertEqual((features[:5] != expected).nnz, 0)
@@ -1,67 +1,194 @@
 # train.py
-# This file trains the model and saves the fitted encoders and KNN to pickle files for later use in the API.
+# This file trains the model and publishes the fitted encoders and KNN for later use in the API.
+# Run it with `python manage.py train_recommender`.
 
+import hashlib
+import json
 import os
-import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import joblib
 import pandas as pd
-import numpy as np
+import scipy.sparse as sp
+import sklearn
 from sklearn.preprocessing import OneHotEncoder, StandardScaler, MultiLabelBinarizer
 from sklearn.neighbors import NearestNeighbors
 
+from core.versions import publish_version, source_info
+
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "data", "rents.csv")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-# Load and preprocess data
-df = pd.read_csv(DATA_PATH)
-
-# Rename columns to match expected capitalized keys from frontend
-df = df.rename(columns={
-    'city': 'City',
-    'location': 'Location',
-    'property_type': 'Property Type',
-    'bedrooms': 'Bedrooms',
-    'area_sqft': 'Area (sqft)',
-    'price': 'Price (INR)',
-    'amenities': 'amenities'
-})
-
-# Process amenities
-df["amenities_list"] = df["amenities"].fillna("").apply(
-    lambda x: [a.strip() for a in str(x).split(",") if a.strip()]
-)
 
 # Define feature columns based on available data
 cat_cols = ["City", "Location", "Property Type"]
 num_cols = ["Bedrooms", "Area (sqft)", "Price (INR)"]
 
-# Fit encoders and scaler
-ohe = OneHotEncoder(handle_unknown="ignore")
-mlb = MultiLabelBinarizer()
-scaler = StandardScaler()
-
-cat_encoded = ohe.fit_transform(df[cat_cols]).toarray()
-amenities_encoded = mlb.fit_transform(df["amenities_list"])
-num_scaled = scaler.fit_transform(df[num_cols].fillna(0))
-
-X = np.hstack([cat_encoded, amenities_encoded, num_scaled])
-
-# Fit KNN
-knn = NearestNeighbors(n_neighbors=20, metric="euclidean")
-knn.fit(X)
-
-# Save the fitted models and encoders
-with open(os.path.join(MODEL_DIR, 'ohe.pkl'), 'wb') as f:
-    pickle.dump(ohe, f)
-with open(os.path.join(MODEL_DIR, 'mlb.pkl'), 'wb') as f:
-    pickle.dump(mlb, f)
-with open(os.path.join(MODEL_DIR, 'scaler.pkl'), 'wb') as f:
-    pickle.dump(scaler, f)
-with open(os.path.join(MODEL_DIR, 'knn.pkl'), 'wb') as f:
-    pickle.dump(knn, f)
-with open(os.path.join(MODEL_DIR, 'df.pkl'), 'wb') as f:
-    pickle.dump(df, f)  # Save dataframe for retrieving results
-
-print("Training complete. Models saved to models/ directory.")
\ No newline at end of file
+ARTIFACT_NAMES = ["ohe", "mlb", "scaler", "knn", "df"]  # df for retrieving results
+TRAIN_FORMAT = 1
+
+
+def prepare_frame(df):
+    """Rename the raw rents.csv columns and split amenities into lists."""
+    # Rename columns to match expected capitalized keys from frontend
+    df = df.rename(columns={
+        'city': 'City',
+        'location': 'Location',
+        'property_type': 'Property Type',
+        'bedrooms': 'Bedrooms',
+        'area_sqft': 'Area (sqft)',
+        'price': 'Price (INR)',
+        'amenities': 'amenities'
+    })
+
+    # Process amenities
+    df["amenities_list"] = df["amenities"].fillna("").apply(
+        lambda x: [a.strip() for a in str(x).split(",") if a.strip()]
+    )
+    return df
+
+
+# -------------------------------
+# Fitting
+# -------------------------------
+def fit_encoders(chunks):
+    """
+    Fit the one-hot encoder, amenity binarizer and scaler in one pass over
+    prepared chunks. Only the distinct categories and amenities and the
+    scaler's running moments are kept between chunks, and the result is the
+    same as fitting on the whole frame: the encoders are fitted on the
+    distinct values (sorted either way) and StandardScaler.partial_fit
+    accumulates the same mean and variance.
+    """
+    categories = [[] for _ in cat_cols]
+    amenities = set()
+    scaler = StandardScaler()
+    for chunk in chunks:
+        for values, col in zip(categories, cat_cols):
+            values.append(chunk[col].drop_duplicates())
+        amenities.update(a for items in chunk["amenities_list"] for a in items)
+        scaler.partial_fit(chunk[num_cols].fillna(0))
+
+    distinct = [pd.concat(values).drop_duplicates().tolist() for values in categories]
+    # One row per distinct value; shorter columns repeat their first value
+    width = max(len(values) for values in distinct)
+    fit_frame = pd.DataFrame({
+        col: values + values[:1] * (width - len(values)) for col, values in zip(cat_cols, distinct)
+    })
+    ohe = OneHotEncoder(handle_unknown="ignore").fit(fit_frame)
+    mlb = MultiLabelBinarizer(sparse_output=True).fit([sorted(amenities)])
+    return {"ohe": ohe, "mlb": mlb, "scaler": scaler}
+
+
+def encode_chunk(encoders, chunk):
+    """KNN feature rows (CSR) for a prepared chunk."""
+    # Kept sparse end to end: the one-hot width grows with the number of
+    # locations and amenities, but each row only sets a handful of them
+    cat_encoded = encoders["ohe"].transform(chunk[cat_cols])
+    amenities_encoded = encoders["mlb"].transform(chunk["amenities_list"])
+    num_scaled = sp.csr_matrix(encoders["scaler"].transform(chunk[num_cols].fillna(0)))
+    return sp.hstack([cat_encoded, amenities_encoded, num_scaled], format="csr", dtype=float)
+
+
+def fit_knn(X):
+    knn = NearestNeighbors(n_neighbors=20, metric="euclidean")
+    knn.fit(X)
+    return knn
+
+
+def fit_models(df):
+    """
+    Fit the encoders and KNN on a prepared frame. Returns the same dict
+    recommendation.load_models builds from the published artifacts.
+    """
+    encoders = fit_encoders([df])
+    return {**encoders, "knn": fit_knn(encode_chunk(encoders, df)), "df": df}
+
+
+# -------------------------------
+# Pipeline
+# -------------------------------
+_worker_encoders = None
+
+
+def _init_worker(encoders):
+    global _worker_encoders
+    _worker_encoders = encoders
+
+
+def _encode_in_worker(chunk):
+    return encode_chunk(_worker_encoders, chunk)
+
+
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - start, 4)
+
+
+def train(data_path=DATA_PATH, model_dir=MODEL_DIR, chunk_size=5000, jobs=1, keep=2):
+    """
+    Train from `data_path` and publish the artifacts as
+    `<model_dir>/<version>/<name>.joblib` (compressed) with
+    `<model_dir>/manifest.json` pointing at them; see core.versions.
+
+    The CSV is read once into the frame published as df; the encoders are
+    fitted in one pass over slices of `chunk_size` rows, and the slices are
+    encoded by `jobs` worker processes. Slices are views of the frame, so
+    beyond df only the encoded sparse parts are held. The version hashes the
+    source contents and the training settings, so retraining unchanged data
+    republishes the same version.
+    Returns the manifest, whose "timings" has seconds per stage.
+    """
+    timings = {}
+    start = time.perf_counter()
+    source = source_info(data_path)
+
+    with _stage(timings, "read"):
+        df = prepare_frame(pd.read_csv(data_path))
+    chunks = [df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)]
+
+    with _stage(timings, "fit_encoders"):
+        encoders = fit_encoders(chunks)
+
+    with _stage(timings, "encode"):
+        if jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(encoders,)) as pool:
+                parts = list(pool.map(_encode_in_worker, chunks))
+        else:
+            parts = [encode_chunk(encoders, chunk) for chunk in chunks]
+        X = sp.vstack(parts, format="csr")
+
+    with _stage(timings, "fit_knn"):
+        knn = fit_knn(X)
+
+    models = {**encoders, "knn": knn, "df": df}
+    settings = {"format": TRAIN_FORMAT, "source": source["sha256"], "sklearn": sklearn.__version__}
+    version = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+    def write(directory):
+        files = {}
+        with _stage(timings, "write"):
+            for name in ARTIFACT_NAMES:
+                path = os.path.join(directory, f"{name}.joblib")
+                joblib.dump(models[name], path, compress=3)
+                files[name] = {"file": f"{name}.joblib", "bytes": os.path.getsize(path)}
+        timings["total"] = round(time.perf_counter() - start, 4)
+        return {"files": files, "timings": timings}
+
+    manifest = {
+        "format": TRAIN_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "rows": len(models["df"]),
+        "features": X.shape[1],
+        "sklearn": sklearn.__version__,
+        "chunk_size": chunk_size,
+        "jobs": jobs,
+    }
+    return publish_version(model_dir, version, write, manifest, keep=keep)
@@ -83,23 +83,15 @@ import os
 import pandas as pd
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from core.artifacts import registry
 
 # Get the directory where this file (views.py) is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Build the full path to city_data.csv
 CSV_PATH = os.path.join(BASE_DIR, "city_data.csv")
+CITY_DATA_ARTIFACT = "listproperties.city_data"
 
-# Load dataset
-df = pd.read_csv(CSV_PATH)
-
-def get_city_data(city):
-    row = df[df["City"].str.lower() == city.lower()]
-    if row.empty:
-        return None
-    return row.iloc[0].to_dict()
-
-# Precompute min/max for normalization across dataset
 METRIC_CONFIG = {
     "Housing_Cost_per_sqft": {"label": "Housing Affordability", "higher_better": False},
     "Job_Market_Score": {"label": "Job Market", "higher_better": True},
@@ -108,24 +100,43 @@ METRIC_CONFIG = {
     "Lifestyle_Score": {"label": "Lifestyle", "higher_better": True},
 }
 
-MIN_MAX = {}
-for col in METRIC_CONFIG.keys():
-    # Guard against missing columns
-    if col in df.columns:
-        col_min = pd.to_numeric(df[col], errors='coerce').min()
-        col_max = pd.to_numeric(df[col], errors='coerce').max()
-        MIN_MAX[col] = (float(col_min), float(col_max))
 
-def normalize_score(value, col):
+def load_city_data(csv_path):
+    """(dataset, {column: (min, max)}) for the move meter."""
+    df = pd.read_csv(csv_path)
+
+    # Precompute min/max for normalization across dataset
+    min_max = {}
+    for col in METRIC_CONFIG.keys():
+        # Guard against missing columns
+        if col in df.columns:
+            col_min = pd.to_numeric(df[col], errors='coerce').min()
+            col_max = pd.to_numeric(df[col], errors='coerce').max()
+            min_max[col] = (float(col_min), float(col_max))
+    return df, min_max
+
+
+# Loaded on first use (or by the startup warm-up), not at import
+registry.register(CITY_DATA_ARTIFACT, [CSV_PATH], load_city_data)
+
+
+def get_city_data(city):
+    df, _ = registry.get(CITY_DATA_ARTIFACT)
+    row = df[df["City"].str.lower() == city.lower()]
+    if row.empty:
+        return None
+    return row.iloc[0].to_dict()
+
+def normalize_score(value, col, min_max):
     if value is None:
         return None
     try:
         v = float(value)
     except (TypeError, ValueError):
         return None
-    if col not in MIN_MAX:
+    if col not in min_max:
         return None
-    mn, mx = MIN_MAX[col]
+    mn, mx = min_max[col]
     if mx is None or mn is None or mx == mn:
         return None
     cfg = METRIC_CONFIG[col]
@@ -145,6 +156,7 @@ def move_meter_view(request):
     if not from_city or not to_city:
         return JsonResponse({"error": "Please provide from_city and to_city"}, status=400)
 
+    _, min_max = registry.get(CITY_DATA_ARTIFACT)
     from_data = get_city_data(from_city)
     to_data = get_city_data(to_city)
 
@@ -158,8 +170,8 @@ def move_meter_view(request):
     for col, cfg in METRIC_CONFIG.items():
         from_val = from_data.get(col)
         to_val = to_data.get(col)
-        from_score = normalize_score(from_val, col)
-        to_score = normalize_score(to_val, col)
+        from_score = normalize_score(from_val, col, min_max)
+        to_score = normalize_score(to_val, col, min_max)
         if from_score is not None:
             from_scores.append(from_score)
         if to_score is not None:
@@ -192,12 +204,60 @@ def move_meter_view(request):
     })
 
 # views.py (assuming this is in a Django app, e.g., api/views.py)
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from .recommendation import get_recommendations  # Import from recommendation.py
+import json
+from core.batching import MicroBatcher
+from core.offload import Overloaded, inference, overloaded_response
+from core.response_cache import ResponseCache
+from core.responses import FastJsonResponse
+from core.timing import span, timed
+from .live import live_listings
+from .recommendation import canonical_input  # Import from recommendation.py
+
+# Identical requests are answered from here until train.py publishes new
+# models or a rent listing is added or removed
+recommend_cache = ResponseCache("recommend.responses")
+
+
+def _recommend(user_input):
+    # Trained listings plus user-created rent listings (see live.py)
+    with span("live_sync"):
+        state, version = live_listings.current()
+    return recommend_cache.get_or_compute(
+        canonical_input(user_input, top_n=10), version,
+        lambda: state.recommend(user_input, top_n=10),
+    )
+
 
-@api_view(["POST"])
-def recommend_property(request):
-    user_input = request.data
-    results = get_recommendations(user_input, top_n=10)
-    return Response(results)
\ No newline at end of file
+def _recommend_many(items):
+    results = []
+    for user_input in items:
+        try:
+            results.append(_recommend(user_input))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+# A batcher mostly so the inference service (core.service) can run it;
+# requests are still answered one by one
+recommend_batcher = MicroBatcher("recommend_property", _recommend_many)
+
+
+@csrf_exempt
+@timed("recommend_property")
+async def recommend_property(request):
+    # Async: live.py's sync and the recommender run on core.offload's bounded pool
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+    try:
+        with span("parse"):
+            user_input = request.POST if request.POST else json.loads(request.body or b"{}")
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid JSON: {str(e)}"}, status=400)
+
+    try:
+        payload = await recommend_batcher.run(user_input)
+        with span("serialize"):
+            return FastJsonResponse(payload)
+    except Overloaded as e:
+        return overloaded_response(e, inference)
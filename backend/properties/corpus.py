@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from core.compact import load_model
+from core.corpus import Corpus
+from listproperties.models import ListingProperty
+from .search import (
+    AMENITIES_FILE, COMPACT_DIR, DATA_FILE, KNN_OHE_FILE, KNN_SCALER_FILE, MODEL_MANIFEST, SALE_CORPUS,
+)
+from .snapshot import clean_frame
+
+
+def sale_queryset():
+    """User listings that belong next to residential_data.csv: residential sales."""
+    return ListingProperty.objects.filter(listing_type="Sell", category="Residential").select_related("user")
+
+
+def sale_record(listing):
+    """A ListingProperty as a row of residential_data.csv."""
+    return {
+        "city": listing.city,
+        "location": listing.location,
+        "property_type": listing.property_type,
+        "bedrooms": listing.bedrooms,
+        "area_sqft": listing.area,
+        "price": float(listing.price),
+        "amenities": None,
+        "image": listing.image or None,
+        "seller_name": listing.user.username,
+    }
+
+
+def read_sale_csv(path, chunk_size):
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        yield clean_frame(chunk)[0]
+
+
+class SaleEncoder:
+    """
+    The search KNN's features for corpus rows: the same encoders the
+    knn_model was trained with, applied as _knn_vectors_uncached applies
+    them to queries. Loaded on first use, so an update with nothing to
+    encode doesn't read them; the corpus makes a new one per update.
+    """
+
+    def __init__(self):
+        self.encoders = None
+
+    def __call__(self, frame):
+        if self.encoders is None:
+            self.encoders = [load_model(f, COMPACT_DIR) for f in (KNN_OHE_FILE, KNN_SCALER_FILE, AMENITIES_FILE)]
+        ohe_knn, scaler_knn, amenities_encoder = self.encoders
+
+        cat_encoded = ohe_knn.transform(frame[["city", "location", "property_type"]])
+        # Unparseable prices were 0 when the model was trained
+        numbers = frame[["bedrooms", "area_sqft", "price"]].to_numpy(dtype=float)
+        num_scaled = scaler_knn.transform(np.nan_to_num(numbers))
+        amenities = frame["amenities"].fillna("").astype(str).apply(
+            lambda x: [a.strip() for a in x.split(",") if a.strip()]
+        )
+        amenities_encoded = amenities_encoder.transform(list(amenities))
+        return np.hstack([cat_encoded, num_scaled, amenities_encoded])
+
+
+sale_corpus = Corpus(
+    SALE_CORPUS,
+    csv_path=DATA_FILE,
+    version_files=[DATA_FILE, KNN_OHE_FILE, KNN_SCALER_FILE, AMENITIES_FILE, MODEL_MANIFEST],
+    read_csv=read_sale_csv,
+    queryset=sale_queryset,
+    record=sale_record,
+    prepare=lambda frame: clean_frame(frame)[0],
+    encoder=SaleEncoder,
+)
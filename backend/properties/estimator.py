@@ -0,0 +1,187 @@
+import os
+from django.conf import settings
+
+from core.artifacts import registry
+from core.compact import load_model
+from core.timing import span
+from core.versions import MANIFEST_NAME
+from .features import FeaturePlan
+
+MODEL_DIR = os.path.join(settings.BASE_DIR, 'properties', 'ml')
+# Written by `manage.py train_property_models`
+MODEL_MANIFEST = os.path.join(MODEL_DIR, MANIFEST_NAME)
+# Written by `manage.py export_compact_models`
+COMPACT_DIR = os.path.join(MODEL_DIR, 'compact')
+COMPACT_MANIFEST = os.path.join(COMPACT_DIR, MANIFEST_NAME)
+
+# listing_type -> (artifact name, model file, price basis)
+ESTIMATORS = {
+    "sale": ("properties.residential_sales_model", "residential_sales_model.pkl", "Total (Sale)"),
+    "rent": ("properties.residential_rents_model", "residential_rents_model.pkl", "Total (Monthly Rent)"),
+}
+
+
+class Estimator:
+    """A fitted sale/rent model plus the feature plan compiled for it."""
+
+    def __init__(self, model):
+        self.model = model
+        self.plan = FeaturePlan(model.feature_names_in_)
+
+    def predict(self, records):
+        """Predict total prices for a list of input dicts (see FeaturePlan.matrix)."""
+        with span("features"):
+            frame = self.plan.frame(records)
+        with span("predict"):
+            return self.model.predict(frame)
+
+
+def load_estimator(path, model_manifest=None, compact_manifest=COMPACT_MANIFEST):
+    return Estimator(load_model(path, os.path.dirname(compact_manifest)))
+
+
+for _name, _file, _ in ESTIMATORS.values():
+    registry.register(_name, [os.path.join(MODEL_DIR, _file), MODEL_MANIFEST, COMPACT_MANIFEST], load_estimator)
+
+ARTIFACT_NAMES = [name for name, _, _ in ESTIMATORS.values()]
+
+
+def get_estimator(listing_type):
+    """
+    Return (Estimator, price_basis) for "sale" or "rent".
+    Raises KeyError for other listing types and FileNotFoundError when the
+    model has not been trained yet.
+    """
+    name, _, price_basis = ESTIMATORS[listing_type]
+    return registry.get(name), price_basis
+
+
+def model_path(listing_type):
+    return os.path.join(MODEL_DIR, ESTIMATORS[listing_type][1])
+
+
+# -------------------------------
+# Input validation
+# -------------------------------
+REQUIRED_FIELDS = ['listing_type', 'city', 'location', 'property_type', 'bedrooms', 'area_sqft', 'amenities']
+
+
+class EstimateInputError(Exception):
+    """An estimate request that can't be priced; the message is client-safe."""
+
+
+def parse_estimate_input(data):
+    """
+    Validate one estimate request and return (listing_type, record), where
+    record is the input dict expected by Estimator.predict.
+    """
+    for field in REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            raise EstimateInputError(f'Missing or empty required field: {field}')
+
+    listing_type = data.get('listing_type').lower().strip()
+    try:
+        bedrooms = float(data.get('bedrooms', 0)) if data.get('bedrooms') else 0
+        area_sqft = float(data.get('area_sqft'))
+    except ValueError as e:
+        raise EstimateInputError(f'Invalid numeric value: {str(e)}')
+
+    if area_sqft <= 0:
+        raise EstimateInputError('Area must be greater than 0')
+    if listing_type not in ESTIMATORS:
+        raise EstimateInputError('Invalid listing_type. Must be "sale" or "rent".')
+
+    return listing_type, {
+        'city': data.get('city'),
+        'location': data.get('location'),
+        'property_type': data.get('property_type'),
+        'bedrooms': bedrooms,
+        'area_sqft': area_sqft,
+        'amenities': data.get('amenities'),
+    }
+
+
+# -------------------------------
+# Batch estimation
+# -------------------------------
+BATCH_CHUNK_SIZE = 1000
+
+
+def chunked(rows, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Lists of (index, row) pairs from `rows`, `chunk_size` at a time. `rows`
+    may be a lazy iterator (memory stays bounded by the chunk size), and a
+    row may be an Exception to report a line that could not be decoded.
+    Each chunk goes through parse_chunk, estimate_batch and chunk_results.
+    """
+    chunk = []
+    for index, row in enumerate(rows):
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_chunk(chunk):
+    """
+    Validate a chunk from chunked(). Returns ({index: error result} for the
+    rows that can't be priced, [(index, (listing_type, record))] for the
+    rest), the latter ready for estimate_batch.
+    """
+    results = {}
+    pending = []
+    for index, row in chunk:
+        try:
+            if isinstance(row, Exception):
+                raise EstimateInputError(str(row))
+            if not isinstance(row, dict):
+                raise EstimateInputError('Each row must be an object')
+            pending.append((index, parse_estimate_input(row)))
+        except Exception as e:
+            results[index] = {'index': index, 'error': str(e)}
+    return results, pending
+
+
+def chunk_results(chunk, results, pending, estimates):
+    """The chunk's results in input order, given estimate_batch's answers for `pending`."""
+    for (index, (listing_type, _)), estimate in zip(pending, estimates):
+        if isinstance(estimate, FileNotFoundError):
+            error = f'Model file not found at {model_path(listing_type)}. Please train the model first.'
+            results[index] = {'index': index, 'error': error}
+        elif isinstance(estimate, Exception):
+            results[index] = {'index': index, 'error': f'Internal server error: {str(estimate)}'}
+        else:
+            results[index] = {
+                'index': index,
+                'estimated_price': round(float(estimate[0]), 2),
+                'price_basis': estimate[1],
+            }
+    return [results[index] for index, _ in chunk]
+
+
+def estimate_batch(items):
+    """
+    Price (listing_type, record) pairs from parse_estimate_input with one
+    model call per listing type. Returns one (price, price_basis) per item,
+    in order, or the exception that item's model raised (FileNotFoundError
+    when it isn't trained). Also the handler of the estimate endpoint's
+    micro-batcher (core.batching).
+    """
+    results = [None] * len(items)
+    groups = {}
+    for position, (listing_type, _) in enumerate(items):
+        groups.setdefault(listing_type, []).append(position)
+
+    for listing_type, positions in groups.items():
+        try:
+            estimator, price_basis = get_estimator(listing_type)
+            prices = estimator.predict([items[p][1] for p in positions])
+        except Exception as e:
+            for p in positions:
+                results[p] = e
+            continue
+        for p, price in zip(positions, prices):
+            results[p] = (price, price_basis)
+    return results
@@ -0,0 +1,102 @@
+"""
+Compact export of the properties models (see core.compact), run with
+`manage.py export_compact_models`.
+
+Every export is checked against the pickles it was made from on the rows
+of residential_data.csv before it is reported, so a mismatch shows up at
+export time rather than in responses.
+"""
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from core.compact import export_models, read_model
+from core.versions import published_path
+from .search import (
+    AMENITIES_FILE, COMPACT_DIR, DATA_FILE, KNN_FILE, KNN_OHE_FILE, KNN_SCALER_FILE, OHE_FILE, REG_FILE,
+    SCALER_FILE,
+)
+from .estimator import MODEL_DIR, ESTIMATORS
+from .snapshot import clean_frame
+
+ESTIMATOR_FILES = [os.path.join(MODEL_DIR, file) for _, file, _ in ESTIMATORS.values()]
+EXPORT_FILES = [
+    REG_FILE, OHE_FILE, SCALER_FILE, KNN_FILE, KNN_OHE_FILE, KNN_SCALER_FILE, AMENITIES_FILE, *ESTIMATOR_FILES,
+]
+NEIGHBORS = 10
+
+
+def _outputs(name, model, df):
+    """What the app computes with `model` over the frame `df`."""
+    # Imported here: .train imports scikit-learn, which serving from EXPORT_FILES shouldn't need
+    from .train import CAT_COLS, amenity_lists, estimate_frame
+    if name in ("ohe_encoder.pkl", "ohe_encoder_knn.pkl"):
+        return model.transform(df[CAT_COLS].values.tolist())
+    if name == "scaler.pkl":
+        return model.transform(df[["bedrooms", "area_sqft"]].to_numpy(dtype=float))
+    if name == "scaler_knn.pkl":
+        return model.transform(df[["bedrooms", "area_sqft", "price"]].fillna(0).to_numpy(dtype=float))
+    if name == "amenities_encoder.pkl":
+        return model.transform(list(amenity_lists(df)))
+    if name == "knn_model.pkl":
+        return np.asarray(model._fit_X, dtype=float)
+    if name == "regression_model.pkl":
+        # Only the coefficients matter here; the encoders are checked on their own
+        return model.predict(np.eye(model.coef_.shape[0]))
+    return model.predict(estimate_frame(df))
+
+
+def _neighbor_agreement(original, compact, queries):
+    """Share of the top-NEIGHBORS rows both matrices return for `queries` (float32 may reorder ties)."""
+    def top(X):
+        X = np.asarray(X, dtype=float)
+        d = (queries ** 2).sum(1)[:, None] - 2 * queries @ X.T + (X ** 2).sum(1)[None, :]
+        return np.argsort(d, axis=1, kind="stable")[:, :NEIGHBORS]
+    a, b = top(original), top(compact)
+    return float(np.mean([len(set(x) & set(y)) / NEIGHBORS for x, y in zip(a, b)]))
+
+
+def verify(manifest, data_file=DATA_FILE, compact_dir=COMPACT_DIR, queries=200):
+    """
+    Compare every exported model with its pickle. Returns one report per
+    file: max absolute / relative difference of its outputs, on-disk
+    bytes and load seconds of both formats.
+    """
+    df = clean_frame(pd.read_csv(data_file))[0]
+    reports = {}
+    for path in EXPORT_FILES:
+        name = os.path.basename(path)
+        source = published_path(path)
+        directory = os.path.join(compact_dir, manifest["path"], name)
+
+        start = time.perf_counter()
+        original = joblib.load(source)
+        pickle_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        compact = read_model(directory, manifest["models"][name])
+        compact_seconds = time.perf_counter() - start
+
+        expected = np.asarray(_outputs(name, original, df), dtype=float)
+        actual = np.asarray(_outputs(name, compact, df), dtype=float)
+        diff = np.abs(expected - actual)
+        report = {
+            "max_abs_diff": float(diff.max()) if diff.size else 0.0,
+            "max_rel_diff": float((diff / np.maximum(np.abs(expected), 1e-12)).max()) if diff.size else 0.0,
+            "pickle_bytes": os.path.getsize(source),
+            "compact_bytes": sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)),
+            "pickle_load_seconds": round(pickle_seconds, 5),
+            "compact_load_seconds": round(compact_seconds, 5),
+        }
+        if name == "knn_model.pkl":
+            rows = np.random.default_rng(0).choice(len(expected), size=min(queries, len(expected)), replace=False)
+            report["neighbor_agreement"] = _neighbor_agreement(expected, actual, expected[rows])
+        reports[name] = report
+    return reports
+
+
+def export(float32=False, keep=2):
+    """Export EXPORT_FILES to COMPACT_DIR; returns the manifest."""
+    return export_models(EXPORT_FILES, COMPACT_DIR, float32=float32, keep=keep)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Raw request fields the sale/rent models were trained on; every other
+# training column is a one-hot amenity token
+INPUT_FIELDS = ("city", "location", "property_type", "bedrooms", "area_sqft")
+TEXT_FIELDS = ("city", "location", "property_type")
+
+
+class FeaturePlan:
+    """
+    Compiled input layout for one fitted estimator.
+
+    Built once from `model.feature_names_in_`, it maps each input field and
+    amenity token straight to its column position, so a request becomes one
+    preallocated row instead of a DataFrame + str.get_dummies + concat +
+    per-column alignment. Amenities are split on "," without stripping,
+    exactly like `Series.str.get_dummies(sep=",")`; tokens the model never saw
+    are ignored and unseen columns stay 0.
+    """
+
+    def __init__(self, feature_names):
+        self.columns = list(feature_names)
+        self.width = len(self.columns)
+        self.field_positions = {
+            col: pos for pos, col in enumerate(self.columns) if col in INPUT_FIELDS
+        }
+        self.token_positions = {
+            col: pos for pos, col in enumerate(self.columns)
+            if col not in INPUT_FIELDS and col not in ("amenities", "")
+        }
+        # Pipelines that one-hot encode city/location/type themselves need the
+        # raw strings, so the row can't be a plain float array
+        self.has_text = any(field in self.field_positions for field in TEXT_FIELDS)
+
+    def matrix(self, records):
+        """
+        Fill an (n_records, n_features) array. Each record is a dict with the
+        INPUT_FIELDS plus an "amenities" comma-separated string.
+        """
+        X = np.zeros((len(records), self.width), dtype=object if self.has_text else float)
+        for r, record in enumerate(records):
+            for field, pos in self.field_positions.items():
+                X[r, pos] = record[field]
+
+            amenities = record.get("amenities")
+            if amenities is None:
+                amenities = ""
+            elif not isinstance(amenities, str):
+                amenities = str(amenities)
+            for token in amenities.split(","):
+                pos = self.token_positions.get(token)
+                if pos is not None:
+                    X[r, pos] = 1
+        return X
+
+    def frame(self, records):
+        """matrix() wrapped in a DataFrame with the model's column names."""
+        frame = pd.DataFrame(self.matrix(records), columns=self.columns, copy=False)
+        if self.has_text:
+            frame = frame.infer_objects()
+        return frame
@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+
+def normalize_text(value):
+    """Normalize a categorical value the same way for rows and queries."""
+    return str(value).strip().casefold()
+
+
+def parse_price_column(series):
+    """Turn the raw `price` strings ("₹1,20,000", "95000") into floats."""
+    if pd.api.types.is_numeric_dtype(series):
+        # Already parsed (e.g. loaded from the property snapshot)
+        return pd.to_numeric(series, errors="coerce").astype(float)
+    price_clean = (
+        series
+        .astype(str)
+        .str.replace(",", "", regex=True)
+        .str.replace("₹", "", regex=True)
+        .str.strip()
+        .str.extract(r"([\d.]+)", expand=False)
+    )
+    return pd.to_numeric(price_clean, errors="coerce")
+
+
+class PropertyIndex:
+    """
+    Load-time columnar index over the residential listings frame.
+
+    Everything the search endpoint filters on is normalized once here:
+    city / location / property_type become integer codes, price / area /
+    bedrooms become float arrays, and rows are grouped into posting lists so
+    the exact-match and city lookups are dictionary hits instead of full
+    DataFrame scans. Row ids are positions into `df` (which uses a RangeIndex,
+    so they double as the KNN model's row ids).
+
+    `columns` (from build_columns) may be passed in precomputed, e.g. as
+    read-only memory maps shared by every worker.
+    """
+
+    # Version of build_columns' output, part of the memory-mapped store's key
+    LAYOUT = 1
+
+    def __init__(self, df, columns=None):
+        self.df = df
+        self.size = len(df)
+        # Plain arrays only, so they can live in core.mapped's shared store
+        self.columns = columns if columns is not None else self.build_columns(df)
+        columns = self.columns
+
+        self.city_codes = columns["city_codes"]
+        self.location_codes = columns["location_codes"]
+        self.type_codes = columns["type_codes"]
+        self.city_vocab = self._vocab(columns["city_vocab"])
+        self.location_vocab = self._vocab(columns["location_vocab"])
+        self.type_vocab = self._vocab(columns["type_vocab"])
+
+        self.price = columns["price"]
+        self.area = columns["area"]
+        self.bedrooms = columns["bedrooms"]
+
+        # (city, location, property_type, bedrooms) -> row ids, in file order.
+        # Rows without a numeric bedroom count can never match exactly.
+        offsets = columns["posting_offsets"]
+        self.postings = {
+            (int(c), int(l), int(t), float(b)): columns["posting_rows"][start:stop]
+            for c, l, t, b, start, stop in zip(
+                columns["posting_city"], columns["posting_location"],
+                columns["posting_type"], columns["posting_bedrooms"],
+                offsets[:-1], offsets[1:],
+            )
+        }
+        # city -> row ids sorted by price (unparseable prices last), so any
+        # budget window within a city is a contiguous slice. All cities share
+        # one array, `city_order`, and each gets a view of its block.
+        offsets = columns["city_offsets"]
+        self.city_order = columns["city_order"]
+        self.city_rows = {}
+        self.city_prices = {}
+        for c, start, stop in zip(columns["city_keys"], offsets[:-1], offsets[1:]):
+            self.city_rows[int(c)] = self.city_order[start:stop]
+            self.city_prices[int(c)] = columns["city_order_price"][start:stop]
+
+    @classmethod
+    def build_columns(cls, df):
+        """
+        Normalize `df` into the flat arrays PropertyIndex is built from.
+        Bump LAYOUT when the keys, dtypes or ordering change (see core.mapped).
+        """
+        city_codes, city_vocab = cls._encode(df["city"])
+        location_codes, location_vocab = cls._encode(df["location"])
+        type_codes, type_vocab = cls._encode(df["property_type"])
+        price = parse_price_column(df["price"]).to_numpy(dtype=float)
+        area = pd.to_numeric(df["area_sqft"], errors="coerce").to_numpy(dtype=float)
+        bedrooms = pd.to_numeric(df["bedrooms"], errors="coerce").to_numpy(dtype=float)
+
+        keys = pd.DataFrame({
+            "city": city_codes,
+            "location": location_codes,
+            "property_type": type_codes,
+            "bedrooms": bedrooms,
+        })
+        postings = keys.groupby(["city", "location", "property_type", "bedrooms"], sort=False).indices
+        posting_keys = np.array(list(postings), dtype=float).reshape(-1, 4)
+        posting_rows = list(postings.values())
+
+        city_groups = keys.groupby("city", sort=False).indices
+        city_rows = [rows[np.argsort(price[rows], kind="stable")] for rows in city_groups.values()]
+        city_order = cls._concat(city_rows)
+
+        return {
+            "city_codes": city_codes,
+            "location_codes": location_codes,
+            "type_codes": type_codes,
+            "city_vocab": city_vocab,
+            "location_vocab": location_vocab,
+            "type_vocab": type_vocab,
+            "price": price,
+            "area": area,
+            "bedrooms": bedrooms,
+            "posting_city": posting_keys[:, 0].astype(np.int32),
+            "posting_location": posting_keys[:, 1].astype(np.int32),
+            "posting_type": posting_keys[:, 2].astype(np.int32),
+            "posting_bedrooms": posting_keys[:, 3],
+            "posting_rows": cls._concat(posting_rows),
+            "posting_offsets": cls._offsets(posting_rows),
+            "city_keys": np.array(list(city_groups), dtype=np.int32),
+            "city_order": city_order,
+            "city_order_price": price[city_order],
+            "city_offsets": cls._offsets(city_rows),
+        }
+
+    @staticmethod
+    def _encode(series):
+        codes, uniques = pd.factorize(series.astype(str).str.strip().str.casefold())
+        return codes.astype(np.int32), np.asarray(uniques, dtype=str)
+
+    @staticmethod
+    def _vocab(values):
+        return {str(value): code for code, value in enumerate(values)}
+
+    @staticmethod
+    def _concat(groups):
+        return np.concatenate(groups).astype(np.intp) if groups else np.empty(0, dtype=np.intp)
+
+    @staticmethod
+    def _offsets(groups):
+        return np.concatenate([[0], np.cumsum([len(g) for g in groups])]).astype(np.intp)
+
+    # -------------------------------
+    # Lookups
+    # -------------------------------
+    def city_code(self, city):
+        return self.city_vocab.get(normalize_text(city))
+
+    def location_code(self, location):
+        return self.location_vocab.get(normalize_text(location))
+
+    def type_code(self, property_type):
+        return self.type_vocab.get(normalize_text(property_type))
+
+    def exact_rows(self, city, location, property_type, bedrooms):
+        """Row ids matching all four fields (case/whitespace-insensitive)."""
+        key = (
+            self.city_code(city),
+            self.location_code(location),
+            self.type_code(property_type),
+            float(bedrooms),
+        )
+        if None in key:
+            return np.empty(0, dtype=np.intp)
+        return self.postings.get(key, np.empty(0, dtype=np.intp))
+
+    def city_budget_window(self, city, min_price=None, max_price=None):
+        """
+        Return (city_code, start, stop) such that city_rows[city_code][start:stop]
+        are the rows with min_price <= price <= max_price. Without a budget the
+        window spans the whole city; with one, unparseable prices are excluded.
+        Returns None for an unknown city.
+        """
+        code = self.city_code(city)
+        if code is None:
+            return None
+        prices = self.city_prices[code]
+        if min_price is None or max_price is None:
+            return code, 0, len(prices)
+        start = int(np.searchsorted(prices, min_price, side="left"))
+        stop = int(np.searchsorted(prices, max_price, side="right"))
+        return code, start, max(start, stop)
+
+    def city_budget_rows(self, city, min_price=None, max_price=None):
+        """Row ids in `city` within the budget window (see city_budget_window)."""
+        window = self.city_budget_window(city, min_price, max_price)
+        if window is None:
+            return np.empty(0, dtype=np.intp)
+        code, start, stop = window
+        return self.city_rows[code][start:stop]
+
+    def rank_exact(self, rows, target_price, target_area, limit=10):
+        """Order exact matches by price distance, then area distance (NaN last)."""
+        price_dist = np.abs(self.price[rows] - target_price)
+        area_dist = np.abs(self.area[rows] - target_area)
+        order = np.lexsort((area_dist, price_dist))
+        return rows[order[:limit]]
+
+    def filter_rows(self, rows, location=None, property_type=None, bedrooms=None):
+        """Narrow `rows` by any of the given fields, keeping their order."""
+        mask = np.ones(len(rows), dtype=bool)
+        if location:
+            mask &= self.location_codes[rows] == self._code_or_missing(self.location_code(location))
+        if property_type:
+            mask &= self.type_codes[rows] == self._code_or_missing(self.type_code(property_type))
+        if bedrooms is not None and bedrooms != "":
+            mask &= self.bedrooms[rows] == float(bedrooms)
+        return rows[mask]
+
+    @staticmethod
+    def _code_or_missing(code):
+        return -2 if code is None else code
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.search import DATA_FILE
+from properties.snapshot import SNAPSHOT_DIR, SnapshotError, build_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate, clean and type-normalize residential_data.csv into a versioned "
+        "columnar snapshot that the search endpoints load at startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=DATA_FILE, help="CSV to compile")
+        parser.add_argument("--output", default=SNAPSHOT_DIR, help="snapshot directory")
+        parser.add_argument("--keep", type=int, default=2, help="versions to keep, including the new one")
+
+    def handle(self, *args, **options):
+        try:
+            manifest = build_snapshot(options["source"], options["output"], keep=options["keep"])
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        stats = manifest["stats"]
+        self.stdout.write(
+            f"Snapshot {manifest['version']}: {manifest['rows']} rows, "
+            f"{len(manifest['columns'])} columns in {manifest['build_seconds']:.3f}s"
+        )
+        for key, value in stats.items():
+            if key != "rows" and value:
+                self.stdout.write(f"  {key}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.export import export, verify
+
+# Outputs of float64 exports must match the pickles up to rounding
+RTOL = 1e-9
+# float32 only changes the neighbor matrix
+FLOAT32_ATOL = 1e-5
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the properties/ml models into the compact serving format (properties/ml/compact), "
+        "check every export against its pickle, and report size and load time of both formats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--float32", action="store_true", help="store the neighbor matrix as float32")
+        parser.add_argument("--keep", type=int, default=2, help="versions to keep, including the new one")
+
+    def handle(self, *args, **options):
+        manifest = export(float32=options["float32"], keep=options["keep"])
+        reports = verify(manifest)
+
+        self.stdout.write(f"Compact models {manifest['version']} (float32={manifest['float32']})")
+        self.stdout.write(f"  {'model':<32}{'pickle KiB':>11}{'compact KiB':>12}{'pickle s':>10}{'compact s':>10}"
+                          f"{'max diff':>11}")
+        failed = []
+        for name, r in reports.items():
+            self.stdout.write(
+                f"  {name:<32}{r['pickle_bytes'] / 1024:>11.1f}{r['compact_bytes'] / 1024:>12.1f}"
+                f"{r['pickle_load_seconds']:>10.4f}{r['compact_load_seconds']:>10.4f}{r['max_abs_diff']:>11.2e}"
+            )
+            if "neighbor_agreement" in r:
+                self.stdout.write(f"    neighbor agreement {r['neighbor_agreement']:.4f}")
+                ok = r["max_abs_diff"] <= (FLOAT32_ATOL if manifest["float32"] else 0)
+            else:
+                ok = r["max_rel_diff"] <= RTOL
+            if not ok:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                f"Compact export differs from the pickles: {', '.join(failed)}; "
+                f"remove {manifest['path']} from the compact directory to keep serving the pickles"
+            )
+        self.stdout.write(self.style.SUCCESS("Exports match the pickles"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from properties.search import DATA_FILE
+from properties.train import ESTIMATOR_CHOICES, MODEL_DIR, RENTS_FILE, train
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit the search regression and KNN, their encoders and the sale/rent estimate models, "
+        "publish them as one version of properties/ml, and report fit time, load time, size "
+        "and inference latency per model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sales-source", default=DATA_FILE, help="sale listings CSV")
+        parser.add_argument("--rents-source", default=RENTS_FILE, help="rent listings CSV")
+        parser.add_argument("--output", default=MODEL_DIR, help="model directory")
+        parser.add_argument("--estimator", default="forest", choices=sorted(ESTIMATOR_CHOICES),
+                            help="regressor for the sale/rent estimate models")
+        parser.add_argument("--jobs", type=int, default=1, help="model groups fitted in parallel")
+        parser.add_argument("--compress", type=int, default=3, help="joblib compression level (0-9)")
+        parser.add_argument("--sample-rows", type=int, default=1000, help="rows used to time inference")
+        parser.add_argument("--keep", type=int, default=2, help="versions to keep, including the new one")
+
+    def handle(self, *args, **options):
+        manifest = train(
+            options["sales_source"], options["rents_source"], options["output"],
+            estimator=options["estimator"], jobs=options["jobs"], compress=options["compress"],
+            sample_rows=options["sample_rows"], keep=options["keep"],
+        )
+        self.stdout.write(
+            f"Models {manifest['version']} ({manifest['estimator']}): fitted in {manifest['fit_seconds']:.3f}s, "
+            f"{manifest['total_seconds']:.3f}s in total"
+        )
+        self.stdout.write(f"  {'group':<12}{'fit s':>9}{'load s':>9}{'KiB':>10}{'batch us/row':>14}{'single ms':>11}")
+        for group, m in manifest["models"].items():
+            self.stdout.write(
+                f"  {group:<12}{m['fit_seconds']:>9.3f}{m['load_seconds']:>9.3f}{m['bytes'] / 1024:>10.1f}"
+                f"{m['batch_us_per_row']:>14.2f}{m['single_row_ms']:>11.3f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
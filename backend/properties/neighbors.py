@@ -0,0 +1,56 @@
+import numpy as np
+
+from core.neighbors import make_index
+
+
+class PartitionedNeighbors:
+    """
+    Per-city neighbor index over the fitted KNN training matrix.
+
+    `matrix` is the KNN training matrix reordered by
+    PropertyIndex.city_order, so each city is one contiguous block in the
+    same price order as city_rows and a city + budget window is a plain
+    position range of that block. Queries only score the rows
+    inside the window and always return the k closest of them, instead of
+    asking the global model for a few hundred neighbors and discarding most
+    of them. Each block is searched by the backend selected in
+    settings.NEIGHBOR_BACKEND (see core.neighbors).
+    """
+
+    def __init__(self, matrix, property_index, metric="euclidean", metric_params=None):
+        self.property_index = property_index
+        offsets = property_index.columns["city_offsets"]
+        # Views into `matrix`, no per-city copies
+        self.city_indexes = {
+            int(code): make_index(matrix[start:stop], metric=metric, metric_params=metric_params)
+            for code, start, stop in zip(property_index.columns["city_keys"], offsets[:-1], offsets[1:])
+        }
+
+    def kneighbors(self, X, window, n_neighbors):
+        """
+        Return (distances, row_ids) of the `n_neighbors` rows closest to the
+        single query `X` inside `window` (a PropertyIndex.city_budget_window),
+        nearest first.
+        """
+        return self.kneighbors_batch(X, [window], n_neighbors)[0]
+
+    def kneighbors_batch(self, X, windows, n_neighbors):
+        """
+        Batched kneighbors: row j of `X` is searched inside windows[j].
+        Queries in the same city are sent to that city's index together.
+        Returns a list of (distances, row_ids).
+        """
+        X = np.asarray(X)
+        results = [None] * len(windows)
+        by_city = {}
+        for j, (code, start, stop) in enumerate(windows):
+            by_city.setdefault(code, []).append(j)
+
+        for code, members in by_city.items():
+            rows = self.property_index.city_rows[code]
+            found = self.city_indexes[code].query(
+                X[members], n_neighbors, [windows[j][1:] for j in members],
+            )
+            for j, (dist, positions) in zip(members, found):
+                results[j] = (dist, rows[positions])
+        return results
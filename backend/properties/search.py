@@ -0,0 +1,468 @@
+import os
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from core.artifacts import file_fingerprint, registry
+from core.cache import LRUCache, make_key
+from core.compact import load_model
+from core.corpus import corpus_manifest
+from core.versions import MANIFEST_NAME
+from core.mapped import mapped_arrays
+from core.records import float_column, frame_records, int_column, text_column
+from core.timing import span
+from .index import PropertyIndex
+from .neighbors import PartitionedNeighbors
+from .snapshot import SNAPSHOT_MANIFEST, load_property_frame
+
+# -------------------------------
+# Paths
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(BASE_DIR, "properties", "data", "residential_data.csv")
+KNN_FILE = os.path.join(BASE_DIR, "properties", "ml", "knn_model.pkl")
+REG_FILE = os.path.join(BASE_DIR, "properties", "ml", "regression_model.pkl")
+OHE_FILE = os.path.join(BASE_DIR, "properties", "ml", "ohe_encoder.pkl")
+SCALER_FILE = os.path.join(BASE_DIR, "properties", "ml", "scaler.pkl")
+KNN_OHE_FILE = os.path.join(BASE_DIR, "properties", "ml", "ohe_encoder_knn.pkl")
+KNN_SCALER_FILE = os.path.join(BASE_DIR, "properties", "ml", "scaler_knn.pkl")
+AMENITIES_FILE = os.path.join(BASE_DIR, "properties", "ml", "amenities_encoder.pkl")
+# Written by `manage.py train_property_models`; its version of each file wins
+MODEL_MANIFEST = os.path.join(BASE_DIR, "properties", "ml", MANIFEST_NAME)
+# Written by `manage.py export_compact_models`; used instead of the pickles it was made from
+COMPACT_DIR = os.path.join(BASE_DIR, "properties", "ml", "compact")
+COMPACT_MANIFEST = os.path.join(COMPACT_DIR, MANIFEST_NAME)
+
+SEARCH_ARTIFACT = "properties.search"
+# Version of what build_arrays adds to PropertyIndex.build_columns (the KNN
+# matrix); bump when that changes so stale memory-mapped arrays are rebuilt
+SEARCH_ARRAYS_LAYOUT = 1
+# CSV rows plus residential sale listings, built by `manage.py build_corpus`
+SALE_CORPUS = "properties.sale"
+SALE_CORPUS_MANIFEST = corpus_manifest(SALE_CORPUS)
+
+# Exact matches returned when the (city, location, type, bedrooms) tuple exists
+EXACT_LIMIT = 10
+# Neighbors scored inside the city/budget window for the KNN fallback
+KNN_NEIGHBORS = 200
+# Budget window around max_price
+BUDGET_LOW, BUDGET_HIGH = 0.90, 1.02
+# Queries encoded and scored together by search_batch
+BATCH_CHUNK_SIZE = 500
+# Memo of regression estimates / KNN query vectors per popular input tuple
+MEMO_SIZE = getattr(settings, "SEARCH_MEMO_SIZE", 4096)
+MEMO_TTL = getattr(settings, "SEARCH_MEMO_TTL", 3600)
+
+
+class SearchError(Exception):
+    """A query that can't be answered; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class SearchQuery:
+    """One validated search_properties request."""
+
+    def __init__(self, city, location, property_type, bedrooms, area_sqft, amenities_list, max_budget):
+        self.city = city
+        self.location = location
+        self.property_type = property_type
+        self.bedrooms = bedrooms
+        self.area_sqft = area_sqft
+        self.amenities_list = amenities_list
+        self.max_budget = max_budget
+
+    @property
+    def regression_key(self):
+        return make_key(self.city, self.location, self.property_type, self.bedrooms, self.area_sqft)
+
+    def knn_key(self, regression_price):
+        budget = float(self.max_budget) if self.max_budget is not None else regression_price
+        return make_key(
+            self.city, self.location, self.property_type, self.bedrooms, self.area_sqft,
+            budget, tuple(sorted(set(self.amenities_list))),
+        )
+
+    @property
+    def budget_window(self):
+        if self.max_budget is None:
+            return None, None
+        return float(self.max_budget) * BUDGET_LOW, float(self.max_budget) * BUDGET_HIGH
+
+
+def parse_search_query(data):
+    """Validate a request body into a SearchQuery, raising SearchError(400)."""
+    city = data.get("city")
+    location = data.get("location")
+    property_type = data.get("property_type")
+    bedrooms = data.get("bedrooms")
+    area_sqft = data.get("area_sqft")
+    amenities = data.get("amenities", "")
+
+    # -------------------------------
+    # Budget clean
+    # -------------------------------
+    raw_budget = data.get("max_price")
+    max_budget = None
+    if raw_budget is not None and str(raw_budget).strip() != "":
+        rb = (
+            str(raw_budget)
+            .replace(",", "")
+            .replace("₹", "")
+            .strip()
+        )
+        max_budget = pd.to_numeric(rb, errors="coerce")
+        if pd.isna(max_budget):
+            raise SearchError("Invalid max_budget value")
+
+    if not all([city, location, property_type, bedrooms, area_sqft]):
+        raise SearchError("Missing required fields")
+
+    try:
+        bedrooms = float(bedrooms)
+        area_sqft = float(area_sqft)
+    except ValueError:
+        raise SearchError("Invalid numeric values for bedrooms/area_sqft")
+
+    amenities_list = [a.strip() for a in str(amenities).split(",") if a.strip()]
+    return SearchQuery(city, location, property_type, bedrooms, area_sqft, amenities_list, max_budget)
+
+
+def canonical_query(data):
+    """
+    Cache identity of a search request: every field in the form the pipeline
+    actually uses it (numbers as floats, amenities as a sorted set). City,
+    location and type stay verbatim because the encoders are case-sensitive.
+    Returns None for requests that don't validate.
+    """
+    try:
+        query = parse_search_query(data)
+    except Exception:
+        return None
+    return {
+        "city": query.city,
+        "location": query.location,
+        "property_type": query.property_type,
+        "bedrooms": query.bedrooms,
+        "area_sqft": query.area_sqft,
+        "amenities": sorted(set(query.amenities_list)),
+        "max_budget": None if query.max_budget is None else float(query.max_budget),
+    }
+
+
+class SearchEngine:
+    """
+    The search_properties pipeline, written over N queries at a time.
+
+    Regression and KNN encoding run once on the stacked inputs of all
+    queries, and the neighbor search computes one distance matrix per city
+    for every query in that city, so a batch of N queries costs a handful of
+    sklearn calls instead of N of each. A single request is a batch of one.
+
+    Regression estimates and KNN query vectors are memoized per input tuple.
+    The memos belong to the engine, and a model reload builds a new engine,
+    so they never outlive the models that filled them.
+    """
+
+    def __init__(self, df, property_index, neighbor_index, reg_model, ohe_reg, scaler_reg,
+                 ohe_knn, scaler_knn, amenities_encoder):
+        self.df = df
+        self.property_index = property_index
+        self.neighbor_index = neighbor_index
+        self.reg_model = reg_model
+        self.ohe_reg = ohe_reg
+        self.scaler_reg = scaler_reg
+        self.ohe_knn = ohe_knn
+        self.scaler_knn = scaler_knn
+        self.amenities_encoder = amenities_encoder
+        self.regression_memo = LRUCache("search.regression", maxsize=MEMO_SIZE, ttl=MEMO_TTL)
+        self.knn_memo = LRUCache("search.knn_vector", maxsize=MEMO_SIZE, ttl=MEMO_TTL)
+
+    # -------------------------------
+    # Entry points
+    # -------------------------------
+    def search(self, data):
+        """Answer one request body; returns the response payload or raises SearchError."""
+        result = self.search_batch([data])[0]
+        if isinstance(result, SearchError):
+            raise result
+        return result
+
+    def search_batch(self, items):
+        """
+        Answer many request bodies. Returns one entry per item, in order:
+        the response payload dict, or the SearchError for that item.
+        """
+        results = []
+        for start in range(0, len(items), BATCH_CHUNK_SIZE):
+            results.extend(self._search_chunk(items[start:start + BATCH_CHUNK_SIZE]))
+        return results
+
+    def _search_chunk(self, items):
+        results = [None] * len(items)
+        queries = {}
+        with span("parse"):
+            for i, data in enumerate(items):
+                try:
+                    queries[i] = parse_search_query(data or {})
+                except SearchError as e:
+                    results[i] = e
+                except Exception as e:
+                    results[i] = SearchError(f"Server error: {str(e)}", status=500)
+
+        # -------------------------------
+        # Regression prediction
+        # -------------------------------
+        prices = self._regression_prices(queries, results)
+
+        # -------------------------------
+        # Exact-match retrieval, then city + budget prefilter
+        # -------------------------------
+        knn_pending = {}
+        for i, query in queries.items():
+            if results[i] is not None:
+                continue
+            exact = self._exact_matches(query, prices[i])
+            if exact:
+                results[i] = {"regression_price": prices[i], "recommendations": exact}
+                continue
+
+            min_budget, budget_limit = query.budget_window
+            with span("prefilter"):
+                window = self.property_index.city_budget_window(query.city, min_budget, budget_limit)
+            if window is None or window[1] == window[2]:
+                results[i] = {"regression_price": prices[i], "recommendations": []}
+                continue
+            knn_pending[i] = window
+
+        # -------------------------------
+        # KNN over the window, then user filters
+        # -------------------------------
+        if knn_pending:
+            neighbors = self._knn_candidates(
+                {i: queries[i] for i in knn_pending}, prices, knn_pending, results,
+            )
+            for i, candidate_rows in neighbors.items():
+                query = queries[i]
+                rows = candidate_rows
+                if len(rows):
+                    with span("postfilter"):
+                        filtered_rows = self.property_index.filter_rows(
+                            rows,
+                            location=query.location,
+                            property_type=query.property_type,
+                            bedrooms=query.bedrooms,
+                        )
+                    if len(filtered_rows):
+                        rows = filtered_rows
+                results[i] = {"regression_price": prices[i], "recommendations": self.records(rows)}
+
+        return results
+
+    # -------------------------------
+    # Pipeline stages
+    # -------------------------------
+    def _regression_prices(self, queries, results):
+        prices = {}
+        if not queries:
+            return prices
+        ids = list(queries)
+        try:
+            prices.update(zip(ids, self._predict_regression([queries[i] for i in ids])))
+        except Exception:
+            # Retry one by one so a single bad query doesn't fail the batch
+            for i in ids:
+                try:
+                    prices[i] = self._predict_regression([queries[i]])[0]
+                except SearchError as e:
+                    results[i] = e
+                except Exception as e:
+                    results[i] = SearchError(f"Server error: {str(e)}", status=500)
+        return prices
+
+    def _predict_regression(self, queries):
+        keys = [q.regression_key for q in queries]
+        prices = [self.regression_memo.get(k, None) if k is not None else None for k in keys]
+        missing = [j for j, price in enumerate(prices) if price is None]
+        if missing:
+            computed = self._regression_uncached([queries[j] for j in missing])
+            for j, price in zip(missing, computed):
+                prices[j] = price
+                if keys[j] is not None:
+                    self.regression_memo.set(keys[j], price)
+        return prices
+
+    def _regression_uncached(self, queries):
+        with span("regression_encode"):
+            cat_features_reg = [[q.city, q.location, q.property_type] for q in queries]
+            cat_encoded_reg = self.ohe_reg.transform(cat_features_reg)
+            num_features_reg = np.array([[q.bedrooms, q.area_sqft] for q in queries], dtype=float)
+            num_scaled_reg = self.scaler_reg.transform(num_features_reg)
+            X_reg = np.hstack([cat_encoded_reg, num_scaled_reg])
+
+        try:
+            with span("regression_predict"):
+                return [float(p) for p in self.reg_model.predict(X_reg)]
+        except Exception as e:
+            raise SearchError(f"Regression inference failed: {str(e)}", status=500)
+
+    def _exact_matches(self, query, regression_price):
+        try:
+            with span("exact_match"):
+                exact_rows = self.property_index.exact_rows(
+                    query.city, query.location, query.property_type, query.bedrooms,
+                )
+                if not len(exact_rows):
+                    return []
+                target_price = float(query.max_budget) if query.max_budget is not None else float(regression_price)
+                top_rows = self.property_index.rank_exact(
+                    exact_rows, target_price, float(query.area_sqft), limit=EXACT_LIMIT,
+                )
+            return self.records(top_rows)
+        except Exception:
+            return []  # fallback to KNN
+
+    def knn_vectors(self, queries, prices):
+        """Encode {i: query} into KNN feature rows, in dict order."""
+        keys = [q.knn_key(prices[i]) for i, q in queries.items()]
+        rows = [self.knn_memo.get(k, None) if k is not None else None for k in keys]
+        missing = [j for j, row in enumerate(rows) if row is None]
+        if missing:
+            items = list(queries.items())
+            computed = self._knn_vectors_uncached(dict(items[j] for j in missing), prices)
+            for j, row in zip(missing, computed):
+                row.flags.writeable = False
+                rows[j] = row
+                if keys[j] is not None:
+                    self.knn_memo.set(keys[j], row)
+        return np.vstack(rows)
+
+    def _knn_vectors_uncached(self, queries, prices):
+        cat_features_knn = [[q.city, q.location, q.property_type] for q in queries.values()]
+        cat_encoded_knn = self.ohe_knn.transform(cat_features_knn)
+
+        num_features_knn = np.array([
+            [q.bedrooms, q.area_sqft, float(q.max_budget) if q.max_budget is not None else prices[i]]
+            for i, q in queries.items()
+        ], dtype=float)
+        num_scaled_knn = self.scaler_knn.transform(num_features_knn)
+        amenities_encoded = self.amenities_encoder.transform([q.amenities_list for q in queries.values()])
+        return np.hstack([cat_encoded_knn, num_scaled_knn, amenities_encoded])
+
+    def _knn_candidates(self, queries, prices, windows, results):
+        try:
+            with span("knn_encode"):
+                X_knn = self.knn_vectors(queries, prices)
+            with span("kneighbors"):
+                found = self.neighbor_index.kneighbors_batch(
+                    X_knn, [windows[i] for i in queries], n_neighbors=KNN_NEIGHBORS,
+                )
+        except Exception as e:
+            if len(queries) == 1:
+                i = next(iter(queries))
+                results[i] = SearchError(f"KNN inference failed: {str(e)}", status=500)
+                return {}
+            # Retry one by one so a single bad query doesn't fail the batch
+            candidates = {}
+            for i, query in queries.items():
+                candidates.update(self._knn_candidates({i: query}, prices, windows, results))
+            return candidates
+        return {i: rows for i, (_, rows) in zip(queries, found)}
+
+    # -------------------------------
+    # Output
+    # -------------------------------
+    def records(self, rows):
+        """Response records for the given row ids, in order."""
+        if not len(rows):
+            return []
+        with span("records"):
+            frame = self.df.iloc[rows]
+            frame = frame.assign(
+                bedrooms=int_column(frame["bedrooms"]),
+                area_sqft=int_column(frame["area_sqft"]),
+                price=float_column(self.property_index.price[rows]),
+                image=text_column(frame["image"]) if "image" in frame else None,
+            )
+            return frame_records(frame)
+
+
+# -------------------------------
+# Loading
+# -------------------------------
+def load_search_engine(data_file, knn_file, reg_file, ohe_file, scaler_file,
+                       knn_ohe_file, knn_scaler_file, amenities_file, snapshot_manifest=SNAPSHOT_MANIFEST,
+                       sale_corpus_manifest=SALE_CORPUS_MANIFEST, model_manifest=MODEL_MANIFEST,
+                       compact_manifest=COMPACT_MANIFEST):
+    # Imported here: corpus.py imports this module for the paths above
+    from .corpus import sale_corpus
+
+    def load(path, mmap_mode=None):
+        return load_model(path, os.path.dirname(compact_manifest), mmap_mode=mmap_mode)
+
+    # Load ML objects; the KNN training matrix is mapped, not read into memory
+    knn_model = load(knn_file, mmap_mode="r")
+
+    corpus = sale_corpus.load()
+    if corpus is not None:
+        # CSV rows plus user listings, encoded with the KNN's own encoders
+        df, features, _ = corpus
+        knn_matrix = features.toarray
+    else:
+        # From the build_property_snapshot output when it matches the CSV
+        df = load_property_frame(data_file, os.path.dirname(snapshot_manifest))
+        knn_matrix = lambda: np.asarray(knn_model._fit_X)
+
+    reg_model = load(reg_file)
+    ohe_reg = load(ohe_file)
+    scaler_reg = load(scaler_file)
+    ohe_knn = load(knn_ohe_file)
+    scaler_knn = load(knn_scaler_file)
+    amenities_encoder = load(amenities_file)
+
+    def build_arrays():
+        columns = PropertyIndex.build_columns(df)
+        # Training matrix with each city's rows contiguous and price-sorted
+        columns["knn_matrix"] = knn_matrix()[columns["city_order"]]
+        return columns
+
+    # Normalized codes, numeric columns, posting lists and the reordered KNN
+    # matrix: built by the first process for these files, then memory-mapped
+    # read-only so every worker shares one copy
+    fingerprint = file_fingerprint([data_file, knn_file, sale_corpus_manifest, model_manifest, compact_manifest])
+    arrays = mapped_arrays(SEARCH_ARTIFACT, fingerprint, build_arrays,
+                           layout=f"{PropertyIndex.LAYOUT}.{SEARCH_ARRAYS_LAYOUT}")
+    property_index = PropertyIndex(df, arrays)
+    neighbor_index = PartitionedNeighbors(
+        arrays["knn_matrix"], property_index,
+        metric=knn_model.effective_metric_,
+        metric_params=knn_model.effective_metric_params_,
+    )
+
+    return SearchEngine(
+        df, property_index, neighbor_index, reg_model, ohe_reg, scaler_reg,
+        ohe_knn, scaler_knn, amenities_encoder,
+    )
+
+
+# The dataset and the seven models are fitted together, so they are cached
+# and reloaded as one unit. The snapshot, corpus, model and compact export
+# manifests are watched too, so building any of them switches running
+# workers over to it.
+registry.register(
+    SEARCH_ARTIFACT,
+    [DATA_FILE, KNN_FILE, REG_FILE, OHE_FILE, SCALER_FILE, KNN_OHE_FILE, KNN_SCALER_FILE, AMENITIES_FILE,
+     SNAPSHOT_MANIFEST, SALE_CORPUS_MANIFEST, MODEL_MANIFEST, COMPACT_MANIFEST],
+    load_search_engine,
+)
+
+
+def get_search_engine():
+    return registry.get(SEARCH_ARTIFACT)
+
+
+def get_search_engine_versioned():
+    """(SearchEngine, fingerprint of the dataset + models it was built from)"""
+    return registry.get_versioned(SEARCH_ARTIFACT)
@@ -0,0 +1,127 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from core.columns import read_columns, write_columns
+from core.versions import MANIFEST_NAME, publish_version, sha256_file, source_info
+from core.versions import read_manifest as read_versions_manifest
+from .index import parse_price_column
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "properties", "data", "snapshot")
+# Points at the current version; rewritten atomically by each build
+SNAPSHOT_MANIFEST = os.path.join(SNAPSHOT_DIR, MANIFEST_NAME)
+SNAPSHOT_FORMAT = 1
+
+REQUIRED_COLUMNS = ["city", "location", "property_type", "bedrooms", "area_sqft", "price"]
+NUMERIC_COLUMNS = ["bedrooms", "area_sqft"]
+
+
+class SnapshotError(Exception):
+    """The source CSV can't be turned into a snapshot."""
+
+
+# -------------------------------
+# Build
+# -------------------------------
+def clean_frame(df):
+    """
+    Validate and type-normalize the raw listings frame.
+
+    Rows are never dropped or reordered: row ids double as the KNN model's
+    training rows. Bad values are coerced (numbers to NaN) and counted in
+    the returned stats instead. Prices are parsed to floats here, once.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise SnapshotError(f"Missing required columns: {', '.join(missing)}")
+    if df.empty:
+        raise SnapshotError("No rows")
+
+    df = df.copy()
+    stats = {"rows": len(df)}
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[col], errors="coerce")
+        stats[f"invalid_{col}"] = int(values.isna().sum() - df[col].isna().sum())
+        # Whole numbers stay int64 like read_csv gives them; gaps force float
+        if values.notna().all() and (values % 1 == 0).all():
+            values = values.astype(np.int64)
+        df[col] = values
+    price = parse_price_column(df["price"])
+    stats["invalid_price"] = int(price.isna().sum())
+    df["price"] = price
+    stats["missing_values"] = {c: int(n) for c, n in df.isna().sum().items() if n}
+    return df, stats
+
+
+def build_snapshot(data_file, snapshot_dir=SNAPSHOT_DIR, keep=2):
+    """
+    Compile `data_file` into `<snapshot_dir>/<version>/` (one .npy per column)
+    and point `<snapshot_dir>/manifest.json` at it. The version is derived
+    from the source contents, so rebuilding an unchanged CSV is a no-op
+    apart from refreshing the manifest. Returns the manifest.
+    """
+    start = time.perf_counter()
+    source = source_info(data_file)
+    try:
+        raw = pd.read_csv(data_file)
+    except Exception as e:
+        raise SnapshotError(f"Could not read {data_file}: {e}")
+    df, stats = clean_frame(raw)
+
+    def write(directory):
+        return {"columns": write_columns(df, directory), "build_seconds": round(time.perf_counter() - start, 4)}
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "rows": len(df),
+        "stats": stats,
+    }
+    return publish_version(snapshot_dir, source["sha256"][:12], write, manifest, keep=keep)
+
+
+# -------------------------------
+# Load
+# -------------------------------
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    return read_versions_manifest(snapshot_dir)
+
+
+def is_current(manifest, data_file):
+    """True if `manifest` was built from the present contents of `data_file`."""
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return False
+    source = manifest["source"]
+    st = os.stat(data_file)
+    if st.st_size != source["size"]:
+        return False
+    # Same size and mtime: trust it; only a touched file pays for a hash
+    return st.st_mtime_ns == source["mtime_ns"] or sha256_file(data_file) == source["sha256"]
+
+
+def read_snapshot(manifest, snapshot_dir=SNAPSHOT_DIR):
+    """Open the snapshot described by `manifest` as a ColumnFrame."""
+    directory = os.path.join(snapshot_dir, manifest["path"])
+    return read_columns(directory, manifest["columns"], manifest["rows"])
+
+
+def load_property_frame(data_file, snapshot_dir=SNAPSHOT_DIR):
+    """
+    The listings table: a ColumnFrame over the snapshot built by `manage.py
+    build_property_snapshot`, or a DataFrame read from `data_file` directly
+    when there is no snapshot or it was built from an older CSV.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is not None:
+        if is_current(manifest, data_file):
+            return read_snapshot(manifest, snapshot_dir)
+        logger.warning("Property snapshot %s is stale; reading %s instead", manifest["version"], data_file)
+    return pd.read_csv(data_file)
@@ -1,3 +1,310 @@
-from django.test import TestCase
+import functools
+import json
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import AsyncClient, SimpleTestCase, override_settings
+
+from core.offload import Overloaded
+from core.response_cache import ResponseCache
+from core.sample_data import city_table, synthetic_listings
+from .estimator import ESTIMATORS, Estimator, chunked
+from .index import PropertyIndex, normalize_text, parse_price_column
+from .neighbors import PartitionedNeighbors
+from .search import canonical_query
+from .train import fit_estimator
+from .views import estimate_batcher
+
+
+def dataframe_features(record, model):
+    """The per-request DataFrame path FeaturePlan replaced, kept as the reference."""
+    df = pd.DataFrame({key: [value] for key, value in record.items()})
+    amenities = df["amenities"].fillna("").str.get_dummies(sep=",")
+    df = pd.concat([df.drop(columns=["amenities"]), amenities], axis=1)
+    for col in model.feature_names_in_:
+        if col not in df.columns:
+            df[col] = 0
+    return df[model.feature_names_in_]
+
+
+class FeaturePlanTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        frame, _ = synthetic_listings(400, city_table(3, 4), seed=1)
+        cls.estimator = Estimator(fit_estimator(frame, "linear"))
+        cls.records = [
+            {"city": "City00", "location": "City00-Locality01", "property_type": "Villa",
+             "bedrooms": 3.0, "area_sqft": 1650.0, "amenities": "Gym,Pool,Lift"},
+            # Unknown city and token, a padded token (not stripped, like get_dummies)
+            {"city": "Nowhere", "location": "City01-Locality02", "property_type": "Apartment",
+             "bedrooms": 0, "area_sqft": 480.0, "amenities": "Sauna, Gym,Parking"},
+            {"city": "City02", "location": "City02-Locality03", "property_type": "Independent House",
+             "bedrooms": 2.0, "area_sqft": 900.0, "amenities": None},
+        ]
+
+    def test_matches_dataframe_path(self):
+        model = self.estimator.model
+        for record in self.records:
+            expected = dataframe_features(record, model)
+            actual = self.estimator.plan.frame([record])
+            self.assertEqual(list(actual.columns), list(expected.columns))
+            self.assertEqual(
+                actual.astype(object).values.tolist(), expected.astype(object).values.tolist(),
+            )
+            self.assertEqual(model.predict(actual)[0], model.predict(expected)[0])
+
+    def test_batch_matches_single_rows(self):
+        batch = self.estimator.predict(self.records)
+        single = [self.estimator.predict([record])[0] for record in self.records]
+        # One matrix product instead of three can differ in the last ulp
+        np.testing.assert_allclose(batch, single, rtol=1e-12)
+
+
+@override_settings(RESPONSE_CACHE={"BACKEND": "local", "MAX_ENTRIES": 16, "TIMEOUT": 60})
+class SearchResponseCacheTests(SimpleTestCase):
+    query = {
+        "city": "Pune", "location": "Baner", "property_type": "Apartment",
+        "bedrooms": "2", "area_sqft": 1000, "amenities": "Gym, Pool", "max_price": "₹50,00,000",
+    }
+
+    def test_equivalent_requests_share_a_key(self):
+        same = {**self.query, "bedrooms": 2.0, "area_sqft": "1000.0", "amenities": "Pool,Gym,,Gym ",
+                "max_price": "5000000"}
+        self.assertEqual(canonical_query(same), canonical_query(self.query))
+        # The encoders are case-sensitive, so the key is too
+        self.assertNotEqual(canonical_query({**self.query, "city": "pune"}), canonical_query(self.query))
+        self.assertNotEqual(canonical_query({**self.query, "max_price": ""}), canonical_query(self.query))
+        self.assertIsNone(canonical_query({**self.query, "bedrooms": "two"}))
+
+    def test_version_change_invalidates(self):
+        cache = ResponseCache("tests.search.version")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"n": len(calls)}
+
+        key = canonical_query(self.query)
+        self.assertEqual(cache.get_or_compute(key, "v1", compute), {"n": 1})
+        self.assertEqual(cache.get_or_compute(key, "v1", compute), {"n": 1})
+        self.assertEqual(cache.get_or_compute(key, "v2", compute), {"n": 2})
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_invalid_requests_and_errors_are_not_cached(self):
+        cache = ResponseCache("tests.search.errors")
+        cache.get_or_compute(None, "v1", dict)
+        self.assertEqual(cache.stats()["bypassed"], 1)
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compute(canonical_query(self.query), "v1", lambda: int("x"))
+        self.assertEqual(cache.get_or_compute(canonical_query(self.query), "v1", lambda: "ok"), "ok")
+
+    def test_many_computes_only_misses(self):
+        cache = ResponseCache("tests.search.many")
+        other = {**self.query, "bedrooms": 3}
+        cache.get_or_compute(canonical_query(self.query), "v1", lambda: "cached")
+        seen = []
+
+        def compute_many(positions):
+            seen.extend(positions)
+            return ["fresh", ValueError("bad")][:len(positions)]
+
+        keys = [canonical_query(self.query), canonical_query(other), None]
+        results = cache.get_or_compute_many(keys, "v1", compute_many)
+        self.assertEqual(seen, [1, 2])
+        self.assertEqual(results[:2], ["cached", "fresh"])
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(cache.get_or_compute(keys[1], "v1", lambda: "recomputed"), "fresh")
+
+
+class EstimateBatchTests(SimpleTestCase):
+    rows = [
+        {"listing_type": "sale", "city": "City00", "location": "City00-Locality01", "property_type": "Villa",
+         "bedrooms": 3, "area_sqft": 1650, "amenities": "Gym,Pool"},
+        {"listing_type": "boat", "city": "City01", "location": "City01-Locality00", "property_type": "Apartment",
+         "bedrooms": 2, "area_sqft": 900, "amenities": "Lift"},
+        {"listing_type": "rent", "city": "City01", "location": "City01-Locality02", "property_type": "Apartment",
+         "bedrooms": 2, "area_sqft": 900, "amenities": "Lift"},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        frame, price = synthetic_listings(300, city_table(2, 3), seed=3)
+        sale = Estimator(fit_estimator(frame, "linear"))
+        frame["price"] = price * 0.003
+        rent = Estimator(fit_estimator(frame, "linear"))
+        models = {"sale": (sale, ESTIMATORS["sale"][2]), "rent": (rent, ESTIMATORS["rent"][2])}
+        patcher = mock.patch("properties.estimator.get_estimator", lambda listing_type: models[listing_type])
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+    def setUp(self):
+        self.client = AsyncClient()
+
+    async def post_batch(self, body, content_type):
+        response = await self.client.post("/api/estimate-price/batch/", body, content_type=content_type)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        return [json.loads(line) for line in lines]
+
+    async def single(self, row):
+        response = await self.client.post("/api/estimate-price/", row, content_type="application/json")
+        return response.status_code, json.loads(response.content)
+
+    async def assert_matches_single_rows(self, results, rows):
+        for result, row in zip(results, rows):
+            status, single = await self.single(row)
+            if status == 200:
+                self.assertEqual({k: result[k] for k in single}, single)
+            else:
+                self.assertEqual(result["error"], single["error"])
+
+    async def test_json(self):
+        results = await self.post_batch(json.dumps(self.rows), "application/json")
+        self.assertEqual([r["index"] for r in results], [0, 1, 2])
+        self.assertIn("listing_type", results[1]["error"])
+        await self.assert_matches_single_rows(results, self.rows)
+
+    async def test_ndjson(self):
+        lines = [json.dumps(self.rows[0]), "{not json", "", json.dumps(self.rows[2]), "[1]"]
+        results = await self.post_batch("\n".join(lines) + "\n", "application/x-ndjson")
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3])
+        self.assertIn("Invalid JSON line", results[1]["error"])
+        self.assertEqual(results[3]["error"], "Each row must be an object")
+        await self.assert_matches_single_rows([results[0], results[2]], [self.rows[0], self.rows[2]])
+
+    async def test_csv(self):
+        columns = list(self.rows[0])
+        lines = [",".join(columns)] + [",".join(f'"{row[c]}"' for c in columns) for row in self.rows]
+        results = await self.post_batch("\n".join(lines) + "\n", "text/csv")
+        self.assertEqual([r["index"] for r in results], [0, 1, 2])
+        await self.assert_matches_single_rows(results, self.rows)
+
+    async def test_overloaded(self):
+        with mock.patch("properties.views.estimate_batcher.run_many", side_effect=Overloaded("full")):
+            response = await self.client.post(
+                "/api/estimate-price/batch/", json.dumps(self.rows), content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+    async def test_chunks_stream_in_order(self):
+        rows = self.rows * 3
+        run_many = estimate_batcher.run_many
+        calls = []
+
+        async def second_chunk_overloaded(items):
+            calls.append(len(items))
+            if len(calls) == 2:
+                raise Overloaded("full")
+            return await run_many(items)
+
+        with mock.patch("properties.views.chunked", functools.partial(chunked, chunk_size=4)), \
+                mock.patch.object(estimate_batcher, "run_many", second_chunk_overloaded):
+            results = await self.post_batch(json.dumps(rows), "application/json")
+        self.assertEqual(calls, [3, 2, 1])
+        self.assertEqual([r["index"] for r in results], list(range(9)))
+        self.assertEqual([r.get("status") for r in results[4:8]], [503] * 4)
+        await self.assert_matches_single_rows(results[:4] + results[8:], rows[:4] + rows[8:])
+
+
+def listings_fixture(rows=400, seed=4):
+    """Listings with raw price strings (a few unparseable), padded/lower-case cities and missing bedrooms."""
+    frame, price = synthetic_listings(rows, city_table(4, 3), seed=seed)
+    frame["price"] = [f"₹{int(p):,}" for p in price]
+    frame.loc[frame.index[::41], "price"] = "NA"
+    frame["bedrooms"] = frame["bedrooms"].astype(float)
+    frame.loc[frame.index[::37], "bedrooms"] = np.nan
+    return frame
+
+
+class PropertyIndexTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = listings_fixture()
+        cls.index = PropertyIndex(cls.df)
+        cls.city = cls.df["city"].map(normalize_text)
+        cls.price = parse_price_column(cls.df["price"])
+
+    def brute_exact(self, city, location, property_type, bedrooms):
+        df = self.df
+        mask = (
+            (self.city == normalize_text(city))
+            & (df["location"].map(normalize_text) == normalize_text(location))
+            & (df["property_type"].map(normalize_text) == normalize_text(property_type))
+            & (df["bedrooms"] == float(bedrooms))
+        )
+        return np.flatnonzero(mask.to_numpy())
+
+    def brute_budget(self, city, min_price=None, max_price=None):
+        mask = self.city == normalize_text(city)
+        if min_price is not None and max_price is not None:
+            mask &= (self.price >= min_price) & (self.price <= max_price)
+        return set(np.flatnonzero(mask.to_numpy()).tolist())
+
+    def test_exact_rows_match_a_full_scan(self):
+        keys = self.df[["city", "location", "property_type", "bedrooms"]].drop_duplicates().itertuples(index=False)
+        checked = 0
+        for city, location, property_type, bedrooms in keys:
+            if np.isnan(bedrooms):
+                continue
+            expected = self.brute_exact(city, location, property_type, bedrooms)
+            np.testing.assert_array_equal(self.index.exact_rows(city, location, property_type, bedrooms), expected)
+            # Case and padding don't matter
+            np.testing.assert_array_equal(
+                self.index.exact_rows(f"  {city.upper()} ", location.lower(), property_type, int(bedrooms)), expected,
+            )
+            checked += 1
+        self.assertGreater(checked, 50)
+        self.assertEqual(len(self.index.exact_rows("Atlantis", "City00-Locality00", "Villa", 2)), 0)
+        self.assertEqual(len(self.index.exact_rows("City00", "City00-Locality00", "Villa", 99)), 0)
+
+    def test_budget_windows_match_a_full_scan(self):
+        prices = self.price.dropna()
+        budgets = [(None, None), (prices.min(), prices.max()), (prices.quantile(0.2), prices.quantile(0.6)),
+                   (prices.median(), prices.median()), (0, prices.min() - 1)]
+        for city in ["City00", "City01", " city02 ", "CITY03"]:
+            for min_price, max_price in budgets:
+                rows = self.index.city_budget_rows(city, min_price, max_price)
+                self.assertEqual(set(rows.tolist()), self.brute_budget(city, min_price, max_price))
+                if min_price is not None:
+                    # Price-sorted, so any budget is a contiguous slice
+                    self.assertTrue(np.all(np.diff(self.index.price[rows]) >= 0))
+        # No rows in budget: an empty window, not a missing one
+        _, start, stop = self.index.city_budget_window("City00", 0, prices.min() - 1)
+        self.assertEqual(start, stop)
+        self.assertIsNone(self.index.city_budget_window("Atlantis", 0, 1e9))
+        self.assertEqual(len(self.index.city_budget_rows("Atlantis")), 0)
+
+    def test_partitioned_kneighbors_match_global_search(self):
+        from sklearn.neighbors import NearestNeighbors
+
+        rng = np.random.default_rng(5)
+        X = rng.normal(size=(len(self.df), 6))
+        neighbors = PartitionedNeighbors(X[self.index.columns["city_order"]], self.index)
+        everything = NearestNeighbors().fit(X)
+        prices = self.price.dropna()
+
+        queries, windows, allowed = [], [], []
+        for city in ["City00", "City01", "City02", "city03"]:
+            for budget in [(None, None), (prices.quantile(0.1), prices.quantile(0.7)), (0, prices.min() - 1)]:
+                queries.append(rng.normal(size=6))
+                windows.append(self.index.city_budget_window(city, *budget))
+                allowed.append(self.brute_budget(city, *budget))
+
+        all_dist, all_rows = everything.kneighbors(np.array(queries), n_neighbors=len(X))
+        for k in (1, 5, 500):
+            results = neighbors.kneighbors_batch(np.array(queries), windows, k)
+            for (dist, rows), ok, d_all, r_all in zip(results, allowed, all_dist, all_rows):
+                keep = [j for j, row in enumerate(r_all) if row in ok][:k]
+                np.testing.assert_array_equal(rows, r_all[keep])
+                np.testing.assert_allclose(dist, d_all[keep])
+            # A single query is a batch of one
+            dist, rows = neighbors.kneighbors(np.array(queries[:1]), windows[0], k)
+            np.testing.assert_array_equal(rows, results[0][1])
@@ -0,0 +1,234 @@
+"""
+Training for the properties app's models, run with `manage.py
+train_property_models`.
+
+Four groups of artifacts are fitted independently (in parallel with
+--jobs) and published together as one version of properties/ml:
+
+- regression: ohe_encoder.pkl, scaler.pkl, regression_model.pkl
+  (search_properties' price estimate)
+- knn: ohe_encoder_knn.pkl, scaler_knn.pkl, amenities_encoder.pkl,
+  knn_model.pkl (search_properties' neighbors)
+- sales / rents: residential_sales_model.pkl, residential_rents_model.pkl
+  (the estimate endpoints)
+
+Unparseable prices count as 0, as they did for the models shipped with
+the repo; with the default settings those are reproduced exactly. After
+writing, every group is loaded back and timed, so the manifest records fit
+time, load time, size on disk and per-row inference latency next to each
+other (see benchmarks/property_models.py to compare estimator choices).
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.neighbors import NearestNeighbors
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MultiLabelBinarizer, OneHotEncoder, StandardScaler
+
+from core.versions import publish_version, source_info
+from .estimator import Estimator
+from .features import INPUT_FIELDS
+from .search import DATA_FILE
+from .snapshot import clean_frame
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "properties", "ml")
+RENTS_FILE = os.path.join(BASE_DIR, "listproperties", "data", "rents.csv")
+TRAIN_FORMAT = 1
+
+CAT_COLS = ["city", "location", "property_type"]
+
+# Regressors for the sale/rent estimate models; "forest" is the shipped one
+ESTIMATOR_CHOICES = {
+    "forest": lambda: RandomForestRegressor(n_estimators=10, random_state=0),
+    "forest100": lambda: RandomForestRegressor(n_estimators=100, random_state=0),
+    "linear": LinearRegression,
+}
+
+GROUPS = {
+    "regression": ["ohe_encoder.pkl", "scaler.pkl", "regression_model.pkl"],
+    "knn": ["ohe_encoder_knn.pkl", "scaler_knn.pkl", "amenities_encoder.pkl", "knn_model.pkl"],
+    "sales": ["residential_sales_model.pkl"],
+    "rents": ["residential_rents_model.pkl"],
+}
+# Loaded with mmap_mode="r" by search.py, which needs an uncompressed file
+UNCOMPRESSED = {"knn_model.pkl"}
+
+
+def amenity_lists(frame):
+    return frame["amenities"].fillna("").apply(lambda x: [a.strip() for a in str(x).split(",") if a.strip()])
+
+
+# -------------------------------
+# Fitting
+# -------------------------------
+def fit_regression(df):
+    ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False).fit(df[CAT_COLS])
+    scaler = StandardScaler().fit(df[["bedrooms", "area_sqft"]])
+    X = np.hstack([ohe.transform(df[CAT_COLS]), scaler.transform(df[["bedrooms", "area_sqft"]])])
+    model = LinearRegression().fit(X, df["price"].fillna(0))
+    return {"ohe_encoder.pkl": ohe, "scaler.pkl": scaler, "regression_model.pkl": model}
+
+
+def fit_knn(df):
+    ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False).fit(df[CAT_COLS])
+    # Fitted on a plain array: search.py scales [bedrooms, area, budget] rows
+    numbers = df[["bedrooms", "area_sqft", "price"]].fillna(0).to_numpy(dtype=float)
+    scaler = StandardScaler().fit(numbers)
+    amenities = MultiLabelBinarizer().fit(amenity_lists(df))
+    X = np.hstack([ohe.transform(df[CAT_COLS]), scaler.transform(numbers), amenities.transform(amenity_lists(df))])
+    knn = NearestNeighbors(n_neighbors=10).fit(X)
+    return {
+        "ohe_encoder_knn.pkl": ohe, "scaler_knn.pkl": scaler,
+        "amenities_encoder.pkl": amenities, "knn_model.pkl": knn,
+    }
+
+
+def estimate_frame(df):
+    """The estimate models' training columns: INPUT_FIELDS plus one 0/1 column per amenity."""
+    amenities = df["amenities"].fillna("").str.get_dummies(sep=",")
+    return pd.concat([df[list(INPUT_FIELDS)], amenities], axis=1)
+
+
+def fit_estimator(df, estimator="forest"):
+    pipeline = Pipeline([
+        ("pre", ColumnTransformer(
+            [("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS)], remainder="passthrough",
+        )),
+        ("rf", ESTIMATOR_CHOICES[estimator]()),
+    ])
+    return pipeline.fit(estimate_frame(df), df["price"].fillna(0))
+
+
+def fit_group(group, frames, estimator):
+    """Fit one group; returns ({file name: object}, fit seconds). Runs in a worker process."""
+    start = time.perf_counter()
+    if group == "regression":
+        files = fit_regression(frames["sales"])
+    elif group == "knn":
+        files = fit_knn(frames["sales"])
+    else:
+        files = {GROUPS[group][0]: fit_estimator(frames[group], estimator)}
+    return files, time.perf_counter() - start
+
+
+# -------------------------------
+# Serving cost
+# -------------------------------
+def _per_row(fn, rows, repeat=5):
+    """(batch seconds per row, median seconds for a single row); `rows` is a frame or list."""
+    fn(rows[:1])  # first call pays for lazy initialization
+    start = time.perf_counter()
+    fn(rows)
+    batch = (time.perf_counter() - start) / len(rows)
+    singles = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(rows[i:i + 1])
+        singles.append(time.perf_counter() - start)
+    return batch, float(np.median(singles))
+
+
+def measure_group(group, directory, sample):
+    """Load a written group back and time its loading and inference."""
+    start = time.perf_counter()
+    loaded = {
+        name: joblib.load(os.path.join(directory, name), mmap_mode="r" if name in UNCOMPRESSED else None)
+        for name in GROUPS[group]
+    }
+    load_seconds = time.perf_counter() - start
+
+    if group == "regression":
+        def infer(rows):
+            X = np.hstack([
+                loaded["ohe_encoder.pkl"].transform(rows[CAT_COLS]),
+                loaded["scaler.pkl"].transform(rows[["bedrooms", "area_sqft"]]),
+            ])
+            return loaded["regression_model.pkl"].predict(X)
+    elif group == "knn":
+        def infer(rows):
+            X = np.hstack([
+                loaded["ohe_encoder_knn.pkl"].transform(rows[CAT_COLS]),
+                loaded["scaler_knn.pkl"].transform(rows[["bedrooms", "area_sqft", "price"]].fillna(0).to_numpy()),
+                loaded["amenities_encoder.pkl"].transform(amenity_lists(rows)),
+            ])
+            return loaded["knn_model.pkl"].kneighbors(X)
+    else:
+        # The request path: dict records through the compiled FeaturePlan
+        infer = Estimator(loaded[GROUPS[group][0]]).predict
+        sample = sample[list(INPUT_FIELDS) + ["amenities"]].to_dict("records")
+
+    batch, single = _per_row(infer, sample)
+    return {
+        "bytes": sum(os.path.getsize(os.path.join(directory, name)) for name in GROUPS[group]),
+        "load_seconds": round(load_seconds, 4),
+        "batch_us_per_row": round(batch * 1e6, 2),
+        "single_row_ms": round(single * 1e3, 3),
+    }
+
+
+# -------------------------------
+# Pipeline
+# -------------------------------
+def train(sales_file=DATA_FILE, rents_file=RENTS_FILE, model_dir=MODEL_DIR, estimator="forest",
+          jobs=1, compress=3, sample_rows=1000, keep=2):
+    """
+    Fit every group and publish `<model_dir>/<version>/` with
+    `<model_dir>/manifest.json` pointing at it (see core.versions). The
+    version hashes the inputs and settings, so retraining unchanged data
+    republishes the same version. Returns the manifest; "models" holds
+    the timings, sizes and latencies per group.
+    """
+    start = time.perf_counter()
+    sources = {"sales": source_info(sales_file), "rents": source_info(rents_file)}
+    frames = {
+        "sales": clean_frame(pd.read_csv(sales_file))[0],
+        "rents": clean_frame(pd.read_csv(rents_file))[0],
+    }
+
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = {group: pool.submit(fit_group, group, frames, estimator) for group in GROUPS}
+            fitted = {group: future.result() for group, future in futures.items()}
+    else:
+        fitted = {group: fit_group(group, frames, estimator) for group in GROUPS}
+    fit_seconds = time.perf_counter() - start
+
+    settings = {
+        "format": TRAIN_FORMAT, "estimator": estimator, "sklearn": sklearn.__version__,
+        "sources": {name: info["sha256"] for name, info in sources.items()},
+    }
+    version = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+    def write(directory):
+        files, models = {}, {}
+        for group, (objects, seconds) in fitted.items():
+            for name, obj in objects.items():
+                joblib.dump(obj, os.path.join(directory, name), compress=0 if name in UNCOMPRESSED else compress)
+                files[name] = {"group": group, "bytes": os.path.getsize(os.path.join(directory, name))}
+            sample = frames["rents" if group == "rents" else "sales"].head(sample_rows)
+            models[group] = {"fit_seconds": round(seconds, 4), **measure_group(group, directory, sample)}
+        return {"files": files, "models": models, "total_seconds": round(time.perf_counter() - start, 4)}
+
+    manifest = {
+        "format": TRAIN_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sources": sources,
+        "rows": {name: len(frame) for name, frame in frames.items()},
+        "estimator": estimator,
+        "sklearn": sklearn.__version__,
+        "jobs": jobs,
+        "fit_seconds": round(fit_seconds, 4),
+    }
+    return publish_version(model_dir, version, write, manifest, keep=keep)